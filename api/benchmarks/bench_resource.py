@@ -0,0 +1,34 @@
+from soze_api.color import Color
+from soze_api.resource import Led, Settings
+
+SETTINGS = Settings(Led.SETTINGS)
+VALUE = {
+    "mode": "fade",
+    "static": {"color": "#ff0000"},
+    "fade": {
+        "colors": ["#ff0000", "#00ff00", "#0000ff"],
+        "saved": {"rgb": ["#ff0000", "#00ff00", "#0000ff"]},
+        "fade_time": 5.0,
+    },
+}
+REDIS_VALUE = SETTINGS.to_redis(VALUE)
+
+
+def test_to_redis(benchmark):
+    benchmark(SETTINGS.to_redis, VALUE)
+
+
+def test_from_redis(benchmark):
+    benchmark(SETTINGS.from_redis, REDIS_VALUE)
+
+
+def test_merge(benchmark):
+    benchmark(SETTINGS.merge, REDIS_VALUE, {"mode": "static"})
+
+
+def test_color_unpack_hexcode(benchmark):
+    benchmark(Color.unpack, "#ff8000")
+
+
+def test_color_unpack_list(benchmark):
+    benchmark(Color.unpack, [255, 128, 0])
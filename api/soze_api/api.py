@@ -1,3 +1,4 @@
+import msgpack
 import os
 import redis
 from flask import Flask, jsonify, redirect, request, abort, make_response
@@ -11,6 +12,8 @@ app = Flask(__name__)
 # This will NOT initiate a connection to Redis yet
 redis_client = redis.from_url(os.environ["REDIS_HOST"])
 resources = {res.name: res for res in [Led(redis_client), Lcd(redis_client)]}
+# The reducer periodically publishes its stats here
+REDUCER_STATS_KEY = "reducer:stats"
 
 
 @app.before_first_request
@@ -72,6 +75,15 @@ def resource_status_route(resource_name, status):
     return jsonify(data)
 
 
+# Performance stats, as published by the reducer
+@app.route("/stats", methods=["GET"])
+def stats_route():
+    redis_value = redis_client.get(REDUCER_STATS_KEY)
+    if not redis_value:
+        return jsonify(message="No stats available"), 404
+    return jsonify(msgpack.loads(redis_value))
+
+
 @app.route("/xkcd")
 def xkcd():
     return redirect("https://c.xkcd.com/random/comic")
@@ -8,10 +8,13 @@ from .setting import (
     FloatSetting,
     ListSetting,
     DictSetting,
+    StructSetting,
 )
 
 
 STATUSES = ("normal", "sleep")
+# Reserved key in each settings blob, holding the version of that blob
+VERSION_KEY = "_version"
 
 
 class Settings:
@@ -118,14 +121,40 @@ class Resource:
         """
         return f"user:{self._name}:{status}"
 
+    def _get_version_redis_key(self):
+        """
+        Get the key that holds the latest settings version for this resource.
+        This is shared by all statuses, and only ever goes up.
+        """
+        return f"user:{self._name}:version"
+
     def _redis_get(self, status):
         redis_value = self._redis.get(self._get_redis_key(status))
         return msgpack.loads(redis_value) if redis_value else {}
 
     def _redis_set(self, status, val):
-        # Msgpack the value and push it to Redis
-        self._redis.set(self._get_redis_key(status), msgpack.dumps(val))
-        self._redis.publish(self._pub_channel, b"")
+        # Stamp the value with a new version. The pub carries the version too,
+        # so the reducer can skip fetching values it already has. The version
+        # is bumped in the same transaction as the write, so versions always
+        # go up in the order the values land in Redis. Otherwise, a reducer
+        # could see an older value's pub after a newer one's, and skip it.
+        version_key = self._get_version_redis_key()
+
+        def stamp(pipe):
+            version = int(pipe.get(version_key) or 0) + 1
+            pipe.multi()
+            pipe.set(version_key, version)
+            pipe.set(
+                self._get_redis_key(status),
+                msgpack.dumps({**val, VERSION_KEY: version}),
+            )
+            pipe.publish(
+                self._pub_channel,
+                msgpack.dumps({"status": status, "version": version}),
+            )
+
+        # Retries if someone else bumped the version while we were at it
+        self._redis.transaction(stamp, version_key)
 
     def get(self, status):
         # Convert the Redis values to user-friendly values using the settings
@@ -148,13 +177,56 @@ class Resource:
 
 class Led(Resource):
     SETTINGS = {
-        "mode": EnumSetting(["off", "static", "fade"], "off"),
+        "mode": EnumSetting(
+            [
+                "off",
+                "static",
+                "fade",
+                "sequence",
+                "rainbow",
+                "breathe",
+                "strobe",
+            ],
+            "off",
+        ),
         "static": {"color": ColorSetting()},
         "fade": {
             "colors": ListSetting(ColorSetting()),
             "saved": DictSetting(ListSetting(ColorSetting())),
             "fade_time": FloatSetting(5.0, 1.0, 30.0),
         },
+        "sequence": {
+            "keyframes": ListSetting(
+                StructSetting(
+                    {
+                        "color": ColorSetting(),
+                        "hold_time": FloatSetting(1.0, 0.0, 60.0),
+                        "transition_time": FloatSetting(1.0, 0.0, 60.0),
+                        "easing": EnumSetting(
+                            ["linear", "ease_in", "ease_out", "ease_in_out"],
+                            "linear",
+                        ),
+                    }
+                )
+            )
+        },
+        "rainbow": {"cycle_time": FloatSetting(10.0, 1.0, 300.0)},
+        "breathe": {
+            "color": ColorSetting(),
+            "period": FloatSetting(4.0, 0.5, 60.0),
+        },
+        "strobe": {
+            "color": ColorSetting(),
+            "frequency": FloatSetting(5.0, 0.5, 20.0),
+            "duty": FloatSetting(0.5, 0.05, 0.95),
+        },
+        # Output correction for the LED hardware, applied to every mode
+        "calibration": {
+            "gamma": FloatSetting(2.2, 1.0, 3.0),
+            "red": FloatSetting(1.0, 0.0, 1.0),
+            "green": FloatSetting(1.0, 0.0, 1.0),
+            "blue": FloatSetting(1.0, 0.0, 1.0),
+        },
     }
 
     def __init__(self, redis_client):
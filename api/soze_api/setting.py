@@ -142,3 +142,41 @@ class DictSetting(Setting):
         return {
             k: self._setting._convert_from_redis(v) for k, v in value.items()
         }
+
+
+class StructSetting(Setting):
+    """
+    A dict with a fixed set of fields, each with its own setting. Unlike a
+    plain dict of settings, this can be nested in a ListSetting. Missing
+    fields get their default values.
+    """
+
+    def __init__(self, fields):
+        self._fields = fields
+        super().__init__(
+            dict,
+            {name: field.default_value for name, field in fields.items()},
+        )
+
+    def _validate(self, value):
+        super()._validate(value)
+        for k, v in value.items():
+            try:
+                field = self._fields[k]
+            except KeyError:
+                raise SozeError(f"Unknown key: {k}")
+            field._validate(v)
+
+    def _convert_to_redis(self, value):
+        return {
+            name: field._convert_to_redis(value[name])
+            if name in value
+            else field.to_redis(field.default_value)
+            for name, field in self._fields.items()
+        }
+
+    def _convert_from_redis(self, value):
+        return {
+            name: field.from_redis(value.get(name))
+            for name, field in self._fields.items()
+        }
@@ -0,0 +1,57 @@
+import msgpack
+import unittest
+from unittest import mock
+
+import fakeredis
+
+from soze_api import resource
+from soze_api.resource import VERSION_KEY, Led
+
+
+class VersionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.pubsub = self.redis.pubsub()
+        self.pubsub.subscribe("a2r:led")
+        self.pubsub.get_message()
+
+    def get_pubs(self):
+        pubs = []
+        while True:
+            msg = self.pubsub.get_message()
+            if msg is None:
+                return pubs
+            pubs.append(msgpack.loads(msg["data"]))
+
+    def test_interleaved_writers(self):
+        a = Led(self.redis)
+        b = Led(self.redis)
+        dumps = msgpack.dumps
+        interrupted = False
+
+        def interleave(val):
+            # B writes in the middle of A's write, after A has picked a
+            # version but before A's transaction runs
+            nonlocal interrupted
+            if not interrupted and val.get("mode") == "static":
+                interrupted = True
+                b.update("normal", {"mode": "fade"})
+            return dumps(val)
+
+        with mock.patch.object(resource.msgpack, "dumps", interleave):
+            a.update("normal", {"mode": "static"})
+
+        self.assertTrue(interrupted)
+        # A retried on top of B's version, so the value in Redis has the
+        # latest version, and its pub comes last
+        stored = msgpack.loads(self.redis.get("user:led:normal"))
+        self.assertEqual("static", stored["mode"])
+        self.assertEqual(2, stored[VERSION_KEY])
+        self.assertEqual(b"2", self.redis.get("user:led:version"))
+        self.assertEqual(
+            [
+                {"status": "normal", "version": 1},
+                {"status": "normal", "version": 2},
+            ],
+            self.get_pubs(),
+        )
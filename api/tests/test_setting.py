@@ -1,6 +1,7 @@
 import unittest
 
 from soze_api import setting
+from soze_api.error import SozeError
 
 # TODO: Some of these are probably broken now
 
@@ -103,3 +104,38 @@ class DictSettingTestCase(unittest.TestCase):
     def test_from_redis(self):
         self.assertEqual({}, self.setting.from_redis(None))
         self.assertEqual({"k": False}, self.setting.from_redis(b'{"k": false}'))
+
+
+class StructSettingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.setting = setting.ListSetting(
+            setting.StructSetting(
+                {
+                    "color": setting.ColorSetting(),
+                    "time": setting.FloatSetting(1.0, 0.0, 10.0),
+                }
+            )
+        )
+
+    def test_to_redis(self):
+        self.assertEqual(
+            [{"color": 0xFF0000, "time": 2.0}, {"color": 0, "time": 1.0}],
+            self.setting.to_redis(
+                [{"color": "#ff0000", "time": 2.0}, {"color": "#000000"}]
+            ),
+        )
+
+        self.assertRaises(
+            SozeError, lambda: self.setting.to_redis([{"fake": 1.0}])
+        )
+        self.assertRaises(
+            SozeError, lambda: self.setting.to_redis([{"time": 11.0}])
+        )
+        self.assertRaises(SozeError, lambda: self.setting.to_redis([1.0]))
+
+    def test_from_redis(self):
+        self.assertEqual([], self.setting.from_redis(None))
+        self.assertEqual(
+            [{"color": "#ff0000", "time": 1.0}],
+            self.setting.from_redis([{"color": 0xFF0000}]),
+        )
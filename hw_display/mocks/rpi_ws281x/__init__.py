@@ -0,0 +1,25 @@
+from mock_core import make_logger
+
+logger = make_logger("rpi_ws281x")
+
+
+def Color(red, green, blue, white=0):
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+class PixelStrip:
+    def __init__(self, num, pin, *args, **kwargs):
+        self._pixels = [0] * num
+        logger.info(f"Strip of {num} pixels on pin {pin}")
+
+    def begin(self):
+        logger.info("Strip started")
+
+    def numPixels(self):
+        return len(self._pixels)
+
+    def setPixelColor(self, n, color):
+        self._pixels[n] = color
+
+    def show(self):
+        logger.debug(" ".join("{:06x}".format(p) for p in self._pixels))
@@ -10,6 +10,28 @@ parser.add_argument(
     default="redis://localhost:6379",
     help="URL for the Redis host",
 )
+parser.add_argument(
+    "--profile-dir",
+    default="/tmp",
+    help="Directory to write profiles to (profiling is started with SIGUSR1)",
+)
+parser.add_argument(
+    "--led-zones",
+    type=int,
+    default=1,
+    help="Number of LED zones. More than one means an addressable strip.",
+)
+parser.add_argument(
+    "--streams",
+    action="store_true",
+    help="Read updates from Redis streams, instead of pubsub."
+    " The reducer has to be using streams too.",
+)
 args = parser.parse_args()
 
-SozeDisplay(args.redis).run()
+SozeDisplay(
+    args.redis,
+    profile_dir=args.profile_dir,
+    led_zones=args.led_zones,
+    streams=args.streams,
+).run()
@@ -4,27 +4,44 @@ import time
 
 from . import logger
 from .led import Led
+from .led_strip import LedStrip
 from .lcd import Lcd
 from .keepalive import Keepalive
+from .profiler import SamplingProfiler
+from .stream import StreamReader
 
 # Potentially could read these from a config file
 KEEPALIVE_CONFIG = {"pin": 4}
 LED_CONFIG = {"hat_addr": 0x60, "pins": [3, 1, 2]}  # Pins are RGB
+# Used instead of the LED config when there's more than one LED zone
+LED_STRIP_CONFIG = {"pin": 18}
 LCD_CONFIG = {"serial_port": "/dev/ttyAMA0"}
 
 
 class SozeDisplay:
-    def __init__(self, redis_url):
+
+    # Seconds between checks for a profiling request in Redis
+    _PROFILE_CHECK_INTERVAL = 10
+
+    def __init__(self, redis_url, profile_dir, led_zones=1, streams=False):
         redis_client = redis.from_url(redis_url)
-        self._pubsub = redis_client.pubsub()
+        self._redis = redis_client
+        # With streams, there's no pubsub. Updates are read by the stream
+        # reader instead.
+        self._pubsub = None if streams else redis_client.pubsub()
+        self._profiler = SamplingProfiler(
+            profile_dir, redis_key="display:profile", name="display"
+        )
 
         self._keepalive = Keepalive(redis_client, **KEEPALIVE_CONFIG)
-        self._resources = [
-            self._keepalive,
-            Led(redis_client=redis_client, pubsub=self._pubsub, **LED_CONFIG),
-            Lcd(redis_client=redis_client, pubsub=self._pubsub, **LCD_CONFIG),
-        ]
-        self._threads = [self._keepalive]
+        led = self._make_led(led_zones)
+        lcd = Lcd(redis_client=redis_client, pubsub=self._pubsub, **LCD_CONFIG)
+        self._resources = [self._keepalive, led, lcd]
+        # Each of these applies its updates on its own thread
+        self._outputs = [led, lcd]
+        self._stream_reader = (
+            StreamReader(redis_client, [led, lcd]) if streams else None
+        )
         self._should_run = True
 
         # Register exit handlers
@@ -33,6 +50,24 @@ class SozeDisplay:
 
         signal.signal(signal.SIGINT, stop_handler)
         signal.signal(signal.SIGTERM, stop_handler)
+        # SIGUSR1 profiles the live process for a while
+        signal.signal(
+            signal.SIGUSR1, lambda sig, frame: self._profiler.start()
+        )
+
+    def _make_led(self, zones):
+        # One zone is a single RGB LED on the motor HAT, more than that is an
+        # addressable strip
+        if zones == 1:
+            return Led(
+                redis_client=self._redis, pubsub=self._pubsub, **LED_CONFIG
+            )
+        return LedStrip(
+            redis_client=self._redis,
+            pubsub=self._pubsub,
+            zones=zones,
+            **LED_STRIP_CONFIG,
+        )
 
     def run(self):
         logger.info("Starting...")
@@ -41,20 +76,47 @@ class SozeDisplay:
         try:
             # Start threads
             self._keepalive.start()
-            self._pubsub_thread = self._pubsub.run_in_thread()
+            for output in self._outputs:
+                output.start()
+            if self._stream_reader:
+                self._stream_reader.start()
+            else:
+                self._pubsub_thread = self._pubsub.run_in_thread()
 
-            # Thread.join blocks signals so we need this loop
+            # Thread.join blocks signals so we need this loop. We also use it
+            # to periodically check if profiling was requested.
+            ticks = 0
             while self._should_run:
                 time.sleep(1)
+                ticks += 1
+                if ticks % __class__._PROFILE_CHECK_INTERVAL == 0:
+                    self._check_profile()
         finally:
             self._stop()
             self._cleanup()
             logger.info("Stopped")
 
+    def _check_profile(self):
+        # This is just diagnostics, so a failure shouldn't stop the display
+        try:
+            p = self._redis.pipeline()
+            p.get(self._profiler.redis_key)
+            p.delete(self._profiler.redis_key)
+            profile_value, _ = p.execute()
+            self._profiler.check_redis(profile_value)
+        except Exception:
+            logger.exception("Failed to check for a profiling request")
+
     def _stop(self):
         logger.info("Stopping...")
         self._keepalive.stop()
-        self._pubsub_thread.stop()  # Will unsub from all channels
+        if self._stream_reader:
+            self._stream_reader.stop()
+        else:
+            self._pubsub_thread.stop()  # Will unsub from all channels
+        # Nothing is feeding the outputs anymore
+        for output in self._outputs:
+            output.stop()
 
     def _cleanup(self):
         logger.info("Cleaning up...")
@@ -11,16 +11,35 @@ class Keepalive(Resource):
 
     _KEEPALIVE_KEY = "reducer:keepalive"
     _KEEPALIVE_CHANNEL = "r2d:keepalive"
+    # Payloads are (is_alive, sequence number)
+    _PAYLOAD_FORMAT = "<?I"
+    _POLL_INTERVAL = 1.0  # Seconds between pin reads
+    # Seconds between pubs when the value isn't changing. This lets the
+    # reducer know we're still here.
+    _HEARTBEAT_INTERVAL = 5.0
+    # The key expires after a few missed heartbeats, so a reducer that starts
+    # after we die doesn't see a stale value
+    _KEY_TTL = 15
 
     def __init__(self, *args, pin, **kwargs):
         super().__init__(*args, **kwargs)
         self._pin = pin
         self._thread = Thread(name="Keepalive", target=self._run)
         self._shutdown = Event()
+        self._seq = 0
 
     def _read_val(self):
-        val = GPIO.input(self._pin)
-        return struct.pack("?", val)
+        return bool(GPIO.input(self._pin))
+
+    def _publish(self, val):
+        # The payload carries the value, so the reducer doesn't need to read
+        # it back. Store it too, so the reducer can get it on startup.
+        self._seq += 1
+        payload = struct.pack(__class__._PAYLOAD_FORMAT, val, self._seq)
+        p = self._redis.pipeline()
+        p.set(__class__._KEEPALIVE_KEY, payload, ex=__class__._KEY_TTL)
+        p.publish(__class__._KEEPALIVE_CHANNEL, payload)
+        p.execute()
 
     @property
     def should_run(self):
@@ -41,9 +60,18 @@ class Keepalive(Resource):
 
     def _run(self):
         logger.info("Keepalive started")
+        last_val = None
+        last_pub_time = 0.0
         while self.should_run:
-            # Update
-            self._redis.set(__class__._KEEPALIVE_KEY, self._read_val())
-            self._redis.publish(__class__._KEEPALIVE_CHANNEL, b"")
-            time.sleep(1)
+            # Only publish when the value changes, or for a heartbeat
+            val = self._read_val()
+            now = time.monotonic()
+            if (
+                val != last_val
+                or now - last_pub_time >= __class__._HEARTBEAT_INTERVAL
+            ):
+                self._publish(val)
+                last_val = val
+                last_pub_time = now
+            self._shutdown.wait(__class__._POLL_INTERVAL)
         logger.info("Keepalive stopped")
@@ -1,43 +1,116 @@
-import itertools
 import serial
+import struct
 
 from .resource import SubscriberResource
-from . import logger
+from .serial_writer import SerialWriter
 
 
-def chunks(l, n):
-    """
-    Split the given list into chunks of size n.
-    https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks
-    """
-    n = max(1, n)
-    return (l[i : i + n] for i in range(0, len(l), n))
+SIG_COMMAND = 0xFE
+CMD_CLEAR = 0x58
+CMD_BACKLIGHT_ON = 0x42
+CMD_BACKLIGHT_OFF = 0x46
+CMD_SIZE = 0xD1
+CMD_COLOR = 0xD0
+CMD_AUTOSCROLL_OFF = 0x52
+CMD_CURSOR_POS = 0x47
+CMD_CREATE_CHAR = 0x4E
 
+# Width, height, backlight, color, loaded glyph slot mask
+_SNAPSHOT_HEADER = struct.Struct("<BB?3sB")
 
-def format_bytes(data):
-    return " ".join("{:02x}".format(b) for b in data)
+
+def snapshot_to_commands(snapshot):
+    """
+    Convert an LCD snapshot from the reducer into the commands to draw it
+    from scratch. The snapshot is the width, height, backlight, color and a
+    bit mask of loaded glyph slots, then 8 bytes per loaded glyph, then one
+    byte per cell.
+    """
+    width, height, backlight, color, mask = _SNAPSHOT_HEADER.unpack_from(
+        snapshot
+    )
+    commands = bytearray(
+        [SIG_COMMAND, CMD_SIZE, width, height, SIG_COMMAND, CMD_CLEAR]
+    )
+    commands += bytes([SIG_COMMAND, CMD_AUTOSCROLL_OFF, SIG_COMMAND, CMD_COLOR])
+    commands += color
+    if backlight:
+        commands += bytes([SIG_COMMAND, CMD_BACKLIGHT_ON, 0])
+    else:
+        commands += bytes([SIG_COMMAND, CMD_BACKLIGHT_OFF])
+
+    offset = _SNAPSHOT_HEADER.size
+    for slot in range(8):
+        if mask & 1 << slot:
+            commands += bytes([SIG_COMMAND, CMD_CREATE_CHAR, slot])
+            commands += snapshot[offset : offset + 8]
+            offset += 8
+    for y in range(height):
+        # Position is 1-based
+        commands += bytes([SIG_COMMAND, CMD_CURSOR_POS, 1, y + 1])
+        commands += snapshot[offset + y * width : offset + (y + 1) * width]
+    return commands
 
 
 class Lcd(SubscriberResource):
 
     _COMMAND_QUEUE_KEY = "reducer:lcd_commands"
-    # Data is sent in chunks to prevent overflowing the backpack's buffer
-    _CHUNK_SIZE = 20  # Bytes per chunk
+    _RESYNC_CHANNEL = "d2r:lcd_resync"
+    _SNAPSHOT_KEY = "reducer:lcd_snapshot"
+    _BAUD_RATE = 9600
+    # Bytes that we can send ahead of the line without overflowing the
+    # backpack's buffer
+    _BUFFER_SIZE = 20
+    # A full-screen update takes a few hundred ms to write, so the LCD yields
+    # to the LEDs, where a late update shows up as a stutter
+    _NICENESS = 10
 
     def __init__(self, serial_port, *args, **kwargs):
-        super().__init__(*args, sub_channel="r2d:lcd", **kwargs)
+        super().__init__(
+            *args,
+            sub_channel="r2d:lcd",
+            stream_key="reducer:lcd_stream",
+            state_key=__class__._SNAPSHOT_KEY,
+            niceness=__class__._NICENESS,
+            **kwargs,
+        )
         # By deferring the port assignment until after construction, we prevent
         # the port from opening immediately, so that it can be opened manually
         self._ser = serial.Serial(
-            baudrate=9600,
+            baudrate=__class__._BAUD_RATE,
             bytesize=serial.EIGHTBITS,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
         )
         self._ser.port = serial_port
+        self._writer = SerialWriter(
+            self._ser,
+            baud_rate=__class__._BAUD_RATE,
+            buffer_size=__class__._BUFFER_SIZE,
+            name=self.name,
+        )
+
+    @property
+    def name(self):
+        return "LCD"
 
     def init(self):
         self._ser.open()
+        if self.uses_streams:
+            return  # The stream reader syncs us up
+
+        # The LCD could be showing anything (or nothing, if it just powered
+        # on), so draw the whole screen from the reducer's snapshot. The
+        # snapshot already covers everything in the queue, so drop that too.
+        p = self._redis.pipeline()
+        p.get(__class__._SNAPSHOT_KEY)
+        p.delete(__class__._COMMAND_QUEUE_KEY)
+        snapshot, _ = p.execute()
+        if snapshot:
+            self._writer.write(snapshot_to_commands(snapshot))
+        else:
+            # No snapshot yet, so ask the reducer for a keyframe
+            self._redis.publish(__class__._RESYNC_CHANNEL, b"")
 
     def cleanup(self):
         self._ser.close()
@@ -47,28 +120,19 @@ class Lcd(SubscriberResource):
         p.lrange(__class__._COMMAND_QUEUE_KEY, 0, -1)
         p.delete(__class__._COMMAND_QUEUE_KEY)
         data, _ = p.execute()
-        # Data is an array of bytes, convert that into one long list of ints
-        return list(itertools.chain.from_iterable(data))
-
-    def _write_data(self, data):
-        # Make sure the buffer is empty before writing to it
-        self._ser.flush()
-        num_written = self._ser.write(data)
-
-        # Make sure we wrote the expected number of bytes
-        if num_written != len(data):
-            logger.error(
-                f"Expected to send {len(data)} bytes ({format_bytes(data)}),"
-                f" but only sent {num_written} bytes"
-            )
-
-    def _on_pub(self, msg):
-        # list of ints representing the data to transfer
-        data_list = self._read_data()
-
-        # Break the data into chunks to prevent overflowing the buffer
-        data_chunks = chunks(data_list, __class__._CHUNK_SIZE)
-
-        # Write each individual chunk
-        for chunk in data_chunks:
-            self._write_data(chunk)
+        # Data is a list of byte strings, one per push from the reducer
+        return b"".join(data)
+
+    def _apply_state(self, state):
+        self._writer.write(snapshot_to_commands(state))
+
+    def _apply_entry(self, data):
+        self._writer.write(data)
+
+    def _on_overflow(self):
+        # Partial updates can't be skipped, so ask the reducer to redraw the
+        # whole screen. It drops its command queue too.
+        self._redis.publish(__class__._RESYNC_CHANNEL, b"")
+
+    def _apply_pub(self, msg):
+        self._writer.write(self._read_data())
@@ -1,3 +1,5 @@
+import struct
+
 from Adafruit_MotorHAT import Adafruit_MotorHAT
 
 from .resource import SubscriberResource
@@ -7,9 +9,18 @@ class Led(SubscriberResource):
 
     _COLOR_LENGTH = 3  # RGB
     _COLOR_KEY = "reducer:led_color"
+    # Updates carry spans of zones, as (first zone, number of zones)
+    # followed by the RGB bytes. We only have the one zone.
+    _SPAN_HEADER = struct.Struct("<HH")
 
     def __init__(self, hat_addr, pins, *args, **kwargs):
-        super().__init__(*args, sub_channel="r2d:led", **kwargs)
+        super().__init__(
+            *args,
+            sub_channel="r2d:led",
+            stream_key="reducer:led_stream",
+            state_key=__class__._COLOR_KEY,
+            **kwargs,
+        )
 
         if len(pins) != __class__._COLOR_LENGTH:
             raise ValueError(f"LED pins must be length 3 (RGB), got {pins}")
@@ -33,19 +44,35 @@ class Led(SubscriberResource):
         for pin in self._pins:
             self._hat.getMotor(pin).run(Adafruit_MotorHAT.RELEASE)
 
-    def _read_data(self):
-        data = self._redis.get(__class__._COLOR_KEY)
+    def _set_color(self, data):
         if len(data) != __class__._COLOR_LENGTH:
             raise ValueError(
                 f"Input data must be {__class__._COLOR_LENGTH} bytes (RGB),"
                 f" got {len(data)} bytes"
             )
-        return data
-
-    def _on_pub(self, msg):
-        data = self._read_data()
         # Color values are [0,255]. The HAT also expects values in this range,
         # but because of the way it is wired, 0 means full on and 255 means
         # full off. We need to invert the color values to correct for this.
         for pin, val in zip(self._pins, data):
             self._hat.getMotor(pin).setSpeed(255 - val)
+
+    def _apply_state(self, state):
+        self._set_color(state)
+
+    def _apply_entry(self, data):
+        self._apply_spans(data)
+
+    def _apply_pub(self, msg):
+        # Pubs carry the same spans as stream entries
+        self._apply_spans(msg["data"])
+
+    def _apply_spans(self, data):
+        header = __class__._SPAN_HEADER
+        offset = 0
+        while offset + header.size <= len(data):
+            zone, count = header.unpack_from(data, offset)
+            offset += header.size
+            if zone == 0 and count > 0:
+                self._set_color(data[offset : offset + __class__._COLOR_LENGTH])
+                return
+            offset += count * __class__._COLOR_LENGTH
@@ -0,0 +1,95 @@
+import struct
+
+from rpi_ws281x import Color, PixelStrip
+
+from .resource import SubscriberResource
+
+
+class LedStrip(SubscriberResource):
+    """
+    An addressable LED strip, with one zone per pixel. Each pub from the
+    reducer carries only the spans of zones that changed, so we keep our own
+    copy of the frame and patch it. Only the changed pixels are pushed to the
+    strip.
+    """
+
+    _FRAME_KEY = "reducer:led_color"
+    _ZONE_SIZE = 3  # RGB
+    # Each span is a header of (first zone, number of zones), followed by the
+    # RGB bytes for those zones
+    _SPAN_HEADER = struct.Struct("<HH")
+
+    def __init__(self, pin, zones, *args, **kwargs):
+        super().__init__(
+            *args,
+            sub_channel="r2d:led",
+            stream_key="reducer:led_stream",
+            state_key=__class__._FRAME_KEY,
+            **kwargs,
+        )
+        self._pin = pin
+        self._zones = zones
+        self._strip = None
+        self._frame = bytearray(zones * __class__._ZONE_SIZE)
+
+    @property
+    def name(self):
+        return "LED"
+
+    def init(self):
+        self._strip = PixelStrip(self._zones, self._pin)
+        self._strip.begin()
+        # Catch up on whatever the reducer has already written. With
+        # streams, the stream reader does this.
+        if not self.uses_streams:
+            self._apply_state(self._redis.get(__class__._FRAME_KEY) or b"")
+
+    def _apply_state(self, state):
+        self._patch(0, state)
+        self._show(range(self._zones))
+
+    def cleanup(self):
+        self._frame = bytearray(len(self._frame))
+        self._show(range(self._zones))
+
+    def _patch(self, zone, data):
+        """
+        Copy the given RGB bytes into our frame, starting at the given zone.
+        Returns the zones that were written. Anything past the end of our
+        strip is ignored, in case the reducer has more zones than we do.
+        """
+        count = min(len(data) // __class__._ZONE_SIZE, self._zones - zone)
+        if count <= 0:
+            return range(0)
+        start = zone * __class__._ZONE_SIZE
+        end = start + count * __class__._ZONE_SIZE
+        self._frame[start:end] = data[: end - start]
+        return range(zone, zone + count)
+
+    def _show(self, zones):
+        frame = self._frame
+        for zone in zones:
+            i = zone * __class__._ZONE_SIZE
+            self._strip.setPixelColor(
+                zone, Color(frame[i], frame[i + 1], frame[i + 2])
+            )
+        self._strip.show()
+
+    def _apply_entry(self, data):
+        self._apply_spans(data)
+
+    def _apply_pub(self, msg):
+        self._apply_spans(msg["data"])
+
+    def _apply_spans(self, data):
+        header = __class__._SPAN_HEADER
+        offset = 0
+        changed = []
+        while offset + header.size <= len(data):
+            zone, count = header.unpack_from(data, offset)
+            offset += header.size
+            size = count * __class__._ZONE_SIZE
+            changed.extend(self._patch(zone, data[offset : offset + size]))
+            offset += size
+        if changed:
+            self._show(changed)
@@ -1,5 +1,7 @@
 import abc
 
+from .worker import OutputWorker
+
 
 class Resource:
     """
@@ -17,11 +19,105 @@ class Resource:
 
 
 class SubscriberResource(Resource):
-    def __init__(self, *args, pubsub, sub_channel, **kwargs):
+    """
+    A Resource that gets updates from the reducer, either as pubs on a
+    channel or as entries on a stream. If no pubsub is given, we're using
+    streams, and a StreamReader has to feed us entries. Updates are only
+    queued up where they come in, and applied on our own worker thread.
+    """
+
+    # Max number of updates waiting to be applied
+    _QUEUE_SIZE = 64
+
+    def __init__(
+        self,
+        *args,
+        pubsub,
+        sub_channel,
+        stream_key,
+        state_key,
+        niceness=0,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self._pubsub = pubsub
-        self._pubsub.subscribe(**{sub_channel: self._on_pub})
+        self._stream_key = stream_key
+        # Key holding the reducer's full current state for this resource
+        self._state_key = state_key
+        self._worker = OutputWorker(
+            self.name,
+            maxsize=__class__._QUEUE_SIZE,
+            on_overflow=self._on_overflow,
+            niceness=niceness,
+        )
+        if pubsub is not None:
+            self._pubsub.subscribe(**{sub_channel: self._on_pub})
+
+    @property
+    def stream_key(self):
+        return self._stream_key
+
+    @property
+    def uses_streams(self):
+        return self._pubsub is None
+
+    def start(self):
+        self._worker.start()
+
+    def stop(self):
+        self._worker.stop()
 
-    @abc.abstractmethod
     def _on_pub(self, msg):
+        self._worker.put(self._apply_pub, msg)
+
+    def on_entry(self, data):
+        """
+        Queue up an entry from our stream.
+        """
+        self._worker.put(self._apply_entry, data)
+
+    def _on_overflow(self):
+        """
+        Called when updates are coming in faster than we can apply them, and
+        the queued ones have been dropped. By default, we catch up by
+        reloading the reducer's full state.
+        """
+        self._worker.put(self._reload)
+
+    def _reload(self):
+        state = self._redis.get(self._state_key)
+        # If the reducer hasn't written anything yet, there's nothing to
+        # catch up on
+        if state:
+            self._apply_state(state)
+
+    def sync(self):
+        """
+        Catch up to the reducer's current state, before reading from our
+        stream. The reducer writes its state in the same transaction as each
+        stream entry, so reading both together is consistent. The state is
+        queued up ahead of any later entries. Returns the (ID, sequence
+        number) of the last entry that the state covers.
+        """
+        p = self._redis.pipeline()
+        p.get(self._state_key)
+        p.xrevrange(self._stream_key, count=1)
+        state, entries = p.execute()
+        if state:
+            self._worker.put(self._apply_state, state)
+        if not entries:
+            return (b"0-0", None)
+        entry_id, fields = entries[0]
+        return (entry_id, int(fields[b"seq"]))
+
+    @abc.abstractmethod
+    def _apply_state(self, state):
+        pass
+
+    @abc.abstractmethod
+    def _apply_entry(self, data):
+        pass
+
+    @abc.abstractmethod
+    def _apply_pub(self, msg):
         pass
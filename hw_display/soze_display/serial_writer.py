@@ -0,0 +1,134 @@
+import time
+
+from . import logger
+
+
+def format_bytes(data):
+    return " ".join("{:02x}".format(b) for b in data)
+
+
+class SerialWriter:
+    """
+    Writes to a serial device as fast as the line can carry it, without ever
+    getting further ahead of the line than the device can buffer. Writes are
+    paced with a token bucket, where each token is one byte. The bucket
+    refills at the line's byte rate and holds as many bytes as the device's
+    buffer, so a small update goes out immediately and a big one streams at
+    the line rate. Pending data lives in one buffer, and is written out as
+    slices of it without copying.
+    """
+
+    # 8N1: a start bit, 8 data bits and a stop bit
+    _BITS_PER_BYTE = 10
+    # Seconds between logging stats
+    _LOG_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        ser,
+        baud_rate,
+        buffer_size,
+        name,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        The clock and sleep functions can be swapped out, e.g. for tests.
+        """
+        self._ser = ser
+        self._byte_rate = baud_rate / __class__._BITS_PER_BYTE
+        self._capacity = buffer_size
+        self._name = name
+
+        self._buffer = bytearray()
+        # Start with a full bucket, since the device's buffer is empty
+        self._tokens = buffer_size
+        self._clock = clock
+        self._sleep = sleep
+        self._last_refill = clock()
+
+        # Stats since they were last logged
+        self._bytes_written = 0
+        self._busy_time = 0.0
+        self._max_depth = 0
+        self._last_log = clock()
+
+    @property
+    def byte_rate(self):
+        """The max rate that the line can carry, in bytes/sec"""
+        return self._byte_rate
+
+    @property
+    def depth(self):
+        """The number of bytes waiting to be written"""
+        return len(self._buffer)
+
+    def write(self, data):
+        """
+        Write the given data, blocking until it's all been handed to the
+        port. Anything the port doesn't take stays in the buffer, and goes out
+        ahead of the next write.
+        """
+        self._buffer += data
+        self._max_depth = max(self._max_depth, len(self._buffer))
+
+        start = self._clock()
+        written = 0
+        with memoryview(self._buffer) as view:
+            while written < len(view):
+                size = self._wait_for_tokens(len(view) - written)
+                with view[written : written + size] as chunk:
+                    num_written = self._ser.write(chunk)
+                    if num_written != size:
+                        logger.error(
+                            f"{self._name}: Expected to send {size} bytes"
+                            f" ({format_bytes(chunk)}), but only sent"
+                            f" {num_written} bytes"
+                        )
+                written += num_written
+                if num_written < size:
+                    break
+        # The view has to be released before the buffer can be resized
+        del self._buffer[:written]
+
+        self._bytes_written += written
+        self._busy_time += self._clock() - start
+        self._log_stats()
+
+    def _wait_for_tokens(self, pending):
+        """
+        Wait until there are enough tokens to write the given number of
+        bytes, or a full bucket's worth if that's less. Takes the tokens and
+        returns the number of bytes to write.
+        """
+        size = min(pending, self._capacity)
+        self._refill()
+        if self._tokens < size:
+            self._sleep((size - self._tokens) / self._byte_rate)
+            self._refill()
+        self._tokens -= size
+        return size
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._last_refill) * self._byte_rate,
+        )
+        self._last_refill = now
+
+    def _log_stats(self):
+        now = self._clock()
+        if now - self._last_log < __class__._LOG_INTERVAL:
+            return
+        if self._bytes_written:
+            rate = self._bytes_written / max(self._busy_time, 1e-6)
+            logger.info(
+                f"{self._name}: Wrote {self._bytes_written} bytes at"
+                f" {rate:.0f} B/s (line max {self._byte_rate:.0f} B/s),"
+                f" max queue depth {self._max_depth} bytes"
+            )
+        self._bytes_written = 0
+        self._busy_time = 0.0
+        self._max_depth = len(self._buffer)
+        self._last_log = now
@@ -0,0 +1,78 @@
+import traceback
+from threading import Event, Thread
+
+import redis
+
+from . import logger
+
+
+class StreamReader:
+    """
+    Reads the reducer's streams for a set of resources, with one blocking
+    XREAD for all of them, and hands each entry to its resource. Each
+    resource first syncs to the reducer's current state, which tells us
+    which entry to read from. Entries are numbered, so if we missed any
+    (e.g. they were trimmed while we were behind, or the reducer restarted),
+    the resource syncs again.
+    """
+
+    # Milliseconds to block for, so we can check for shutdown
+    _BLOCK_TIME = 1000
+    # Max entries to read per stream at once
+    _BATCH_SIZE = 100
+    # Seconds to wait before retrying after a Redis error
+    _RETRY_INTERVAL = 1.0
+
+    def __init__(self, redis_client, resources):
+        self._redis = redis_client
+        # Redis gives us keys as bytes
+        self._resources = {res.stream_key.encode(): res for res in resources}
+        self._thread = Thread(name="Streams", target=self._run)
+        self._shutdown = Event()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._shutdown.set()
+        self._thread.join()
+
+    def _run(self):
+        logger.info("Stream reader started")
+        # Stream key => (ID, sequence number) of the last entry we've seen
+        positions = {
+            key: res.sync() for key, res in self._resources.items()
+        }
+        while not self._shutdown.is_set():
+            try:
+                result = self._redis.xread(
+                    {key: entry_id for key, (entry_id, _) in positions.items()},
+                    count=__class__._BATCH_SIZE,
+                    block=__class__._BLOCK_TIME,
+                )
+                for key, entries in result:
+                    positions[key] = self._handle_entries(
+                        self._resources[key], positions[key], entries
+                    )
+            except redis.RedisError:
+                logger.error(traceback.format_exc())
+                self._shutdown.wait(__class__._RETRY_INTERVAL)
+        logger.info("Stream reader stopped")
+
+    def _handle_entries(self, res, position, entries):
+        """
+        Pass the given entries to the resource, in order. Returns the new
+        position in the stream.
+        """
+        for entry_id, fields in entries:
+            _, last_seq = position
+            seq = int(fields[b"seq"])
+            if last_seq is not None and seq != last_seq + 1:
+                logger.warning(
+                    f"{res.name}: Missed stream entries ({last_seq}->{seq}),"
+                    " resyncing"
+                )
+                return res.sync()
+            res.on_entry(fields[b"data"])
+            position = (entry_id, seq)
+        return position
@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+import time
+import traceback
+
+from . import logger
+
+
+class OutputWorker:
+    """
+    Runs output jobs for one device on its own thread, so a slow device
+    can't hold up the others. Jobs wait in a bounded queue. If the queue
+    fills up, the device has fallen too far behind to catch up one job at a
+    time, so the queue is dropped and the overflow handler gets to queue up
+    a way to resync.
+    """
+
+    # Seconds to block for a job, so we can check for shutdown
+    _POLL_INTERVAL = 0.5
+    # Seconds between logging stats
+    _LOG_INTERVAL = 60.0
+
+    def __init__(self, name, maxsize, on_overflow, niceness=0):
+        """
+        niceness is added to the thread's nice value (Linux only), so devices
+        that can wait are scheduled after the ones that can't.
+        """
+        self._name = name
+        self._queue = queue.Queue(maxsize)
+        self._on_overflow = on_overflow
+        self._niceness = niceness
+        self._thread = threading.Thread(name=name, target=self._run)
+        self._shutdown = threading.Event()
+
+        # Stats since they were last logged
+        self._jobs_run = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._max_depth = 0
+        self._overflows = 0
+        self._last_log = time.monotonic()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._shutdown.set()
+        self._thread.join()
+
+    def put(self, func, *args):
+        """
+        Queue up a call to the given function on the worker thread. Never
+        blocks.
+        """
+        job = (time.monotonic(), func, args)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._overflows += 1
+            logger.warning(f"{self._name}: Output queue is full, dropping it")
+            self.clear()
+            self._on_overflow()
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    def clear(self):
+        """
+        Drop all queued jobs.
+        """
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _run(self):
+        logger.info(f"{self._name} worker started")
+        if self._niceness:
+            try:
+                os.setpriority(
+                    os.PRIO_PROCESS, threading.get_native_id(), self._niceness
+                )
+            except (AttributeError, OSError):
+                logger.warning(
+                    f"{self._name}: Couldn't lower the worker's priority"
+                )
+        while not self._shutdown.is_set():
+            try:
+                enqueued_at, func, args = self._queue.get(
+                    timeout=__class__._POLL_INTERVAL
+                )
+            except queue.Empty:
+                continue
+            try:
+                func(*args)
+            except Exception:
+                logger.error(traceback.format_exc())
+            # Latency covers the time in the queue plus the output itself
+            latency = time.monotonic() - enqueued_at
+            self._jobs_run += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+            self._log_stats()
+        logger.info(f"{self._name} worker stopped")
+
+    def _log_stats(self):
+        now = time.monotonic()
+        if now - self._last_log < __class__._LOG_INTERVAL:
+            return
+        logger.info(
+            f"{self._name}: Ran {self._jobs_run} jobs, latency"
+            f" {self._total_latency / self._jobs_run * 1000:.1f}ms avg"
+            f" / {self._max_latency * 1000:.1f}ms max, max queue depth"
+            f" {self._max_depth}, {self._overflows} overflows"
+        )
+        self._jobs_run = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._max_depth = self._queue.qsize()
+        self._overflows = 0
+        self._last_log = now
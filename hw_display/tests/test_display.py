@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fakeredis
+
+# The hardware mocks log to files in here
+os.makedirs("mock_logs", exist_ok=True)
+
+from soze_display import display  # noqa: E402
+
+
+class SozeDisplayTestCase(unittest.TestCase):
+    def setUp(self):
+        redis_client = fakeredis.FakeRedis()
+        with mock.patch.object(
+            display.redis, "from_url", return_value=redis_client
+        ):
+            self.display = display.SozeDisplay(
+                "redis://test", profile_dir="/tmp"
+            )
+
+    def test_stop(self):
+        thread = threading.Thread(target=self.display.run)
+        thread.start()
+        workers = [output._worker._thread for output in self.display._outputs]
+        # Wait for everything to start up, then stop it like a signal would
+        for _ in range(50):
+            if all(worker.is_alive() for worker in workers):
+                break
+            time.sleep(0.1)
+        self.assertTrue(all(worker.is_alive() for worker in workers))
+        self.display._should_run = False
+        thread.join(10.0)
+
+        self.assertFalse(thread.is_alive())
+        # The workers were joined before the hardware was cleaned up
+        self.assertFalse(any(worker.is_alive() for worker in workers))
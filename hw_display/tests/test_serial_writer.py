@@ -0,0 +1,96 @@
+import unittest
+
+from soze_display.serial_writer import SerialWriter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeSerial:
+    def __init__(self, clock, max_write=None):
+        self._clock = clock
+        self._max_write = max_write
+        # (time, data) for each write
+        self.writes = []
+
+    def write(self, data):
+        data = bytes(data)[: self._max_write]
+        self.writes.append((self._clock(), data))
+        return len(data)
+
+
+class SerialWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ser = FakeSerial(self.clock)
+        # 9600 baud is 960 bytes/sec
+        self.writer = self.make_writer(self.ser)
+
+    def make_writer(self, ser):
+        return SerialWriter(
+            ser,
+            baud_rate=9600,
+            buffer_size=20,
+            name="Test",
+            clock=self.clock,
+            sleep=self.clock.sleep,
+        )
+
+    def test_burst(self):
+        # A full bucket goes out right away, in one write
+        self.writer.write(b"x" * 20)
+        self.assertEqual([(0.0, b"x" * 20)], self.ser.writes)
+        self.assertEqual([], self.clock.sleeps)
+        self.assertEqual(0, self.writer.depth)
+
+    def test_rate_limit(self):
+        data = bytes(range(100))
+        self.writer.write(data)
+        # The first chunk is the burst, then each chunk waits for a bucket's
+        # worth of line time
+        self.assertEqual([20] * 5, [len(d) for _, d in self.ser.writes])
+        self.assertEqual(data, b"".join(d for _, d in self.ser.writes))
+        for (t1, _), (t2, _) in zip(self.ser.writes, self.ser.writes[1:]):
+            self.assertAlmostEqual(20 / 960, t2 - t1)
+        # Which is as fast as the line can carry it
+        self.assertAlmostEqual(80 / 960, self.clock.now)
+
+    def test_refill(self):
+        self.writer.write(b"x" * 20)
+        # Half a bucket of line time refills half a bucket
+        self.clock.now += 10 / 960
+        self.writer.write(b"y" * 20)
+        self.assertEqual(1, len(self.clock.sleeps))
+        self.assertAlmostEqual(10 / 960, self.clock.sleeps[0])
+
+        # The bucket never holds more than the device can buffer, no matter
+        # how long we've been idle
+        self.clock.now += 60.0
+        self.clock.sleeps.clear()
+        self.writer.write(b"z" * 40)
+        self.assertEqual(1, len(self.clock.sleeps))
+        self.assertAlmostEqual(20 / 960, self.clock.sleeps[0])
+
+    def test_short_write(self):
+        ser = FakeSerial(self.clock, max_write=5)
+        writer = self.make_writer(ser)
+        with self.assertLogs("soze_display", "ERROR"):
+            writer.write(b"abcdefgh")
+        self.assertEqual(3, writer.depth)
+
+        # The leftovers go out ahead of the next write
+        writer.write(b"ij")
+        self.assertEqual(
+            [b"abcde", b"fghij"], [data for _, data in ser.writes]
+        )
+        self.assertEqual(0, writer.depth)
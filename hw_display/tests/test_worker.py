@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from soze_display.resource import SubscriberResource
+from soze_display.worker import OutputWorker
+
+
+class FakeResource(SubscriberResource):
+    def __init__(self):
+        super().__init__(
+            redis_client=None,
+            pubsub=None,
+            sub_channel="test",
+            stream_key="test:stream",
+            state_key="test:state",
+        )
+        self.applied = threading.Event()
+        self.entries = []
+
+    @property
+    def name(self):
+        return "Test"
+
+    def _apply_state(self, state):
+        pass
+
+    def _apply_entry(self, data):
+        self.entries.append((threading.current_thread().name, data))
+        self.applied.set()
+
+    def _apply_pub(self, msg):
+        pass
+
+
+class OutputWorkerTestCase(unittest.TestCase):
+    def test_handoff(self):
+        res = FakeResource()
+        # Entries are only queued up by whoever reads them...
+        res.on_entry(b"data")
+        self.assertEqual([], res.entries)
+        # ...and applied on the resource's own thread
+        res.start()
+        try:
+            self.assertTrue(res.applied.wait(5.0))
+        finally:
+            res.stop()
+        self.assertEqual([("Test", b"data")], res.entries)
+
+    def test_overflow(self):
+        overflows = []
+        worker = OutputWorker(
+            "Test", maxsize=2, on_overflow=lambda: overflows.append(True)
+        )
+        applied = []
+        with self.assertLogs("soze_display", "WARNING"):
+            for i in range(3):
+                worker.put(applied.append, i)
+        # The queue was dropped, so the handler could resync
+        self.assertEqual([True], overflows)
+        worker.start()
+        worker.stop()
+        self.assertEqual([], applied)
+
+    def test_stop(self):
+        worker = OutputWorker("Test", maxsize=2, on_overflow=None)
+        worker.start()
+        worker.stop()
+        self.assertFalse(worker._thread.is_alive())
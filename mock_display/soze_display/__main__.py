@@ -14,9 +14,15 @@ def main(stdscr):
         default="redis://localhost:6379",
         help="URL for the Redis host",
     )
+    parser.add_argument(
+        "--streams",
+        action="store_true",
+        help="Read updates from Redis streams, instead of pubsub."
+        " The reducer has to be using streams too.",
+    )
     args = parser.parse_args()
 
-    SozeDisplay(args.redis).run()
+    SozeDisplay(args.redis, streams=args.streams).run()
 
 
 curses.wrapper(main)
@@ -4,6 +4,7 @@ import itertools
 import logging.config
 import redis
 import signal
+import struct
 import time
 import traceback
 from threading import Event, Thread
@@ -59,19 +60,129 @@ CMD_SAVE_CUSTOM_CHAR = 0xC1
 CMD_LOAD_CHAR_BANK = 0xC0
 
 
+# Width, height, backlight, color, loaded glyph slot mask
+_SNAPSHOT_HEADER = struct.Struct("<BB?3sB")
+# LED spans are (first zone, number of zones), followed by the RGB bytes
+_SPAN_HEADER = struct.Struct("<HH")
+# Chars in the LCD's ROM that don't match up with Unicode
+_ROM_CHARS = {0xFF: "█"}
+# Quadrant block chars, indexed by which quadrants are filled:
+# top-left, top-right, bottom-left, bottom-right (from high to low bit)
+_QUADRANT_CHARS = " ▗▖▄▝▐▞▟▘▚▌▙▀▜▛█"
+
+
 def format_bytes(data):
     return " ".join("{:02x}".format(b) for b in data)
 
 
+def snapshot_to_commands(snapshot):
+    """
+    Convert an LCD snapshot from the reducer into the commands to draw it
+    from scratch. The snapshot is the width, height, backlight, color and a
+    bit mask of loaded glyph slots, then 8 bytes per loaded glyph, then one
+    byte per cell.
+    """
+    width, height, backlight, color, mask = _SNAPSHOT_HEADER.unpack_from(
+        snapshot
+    )
+    commands = bytearray(
+        [SIG_COMMAND, CMD_SIZE, width, height, SIG_COMMAND, CMD_CLEAR]
+    )
+    commands += bytes([SIG_COMMAND, CMD_AUTOSCROLL_OFF, SIG_COMMAND, CMD_COLOR])
+    commands += color
+    if backlight:
+        commands += bytes([SIG_COMMAND, CMD_BACKLIGHT_ON, 0])
+    else:
+        commands += bytes([SIG_COMMAND, CMD_BACKLIGHT_OFF])
+
+    offset = _SNAPSHOT_HEADER.size
+    for slot in range(8):
+        if mask & 1 << slot:
+            commands += bytes([SIG_COMMAND, CMD_CREATE_CHAR, slot])
+            commands += snapshot[offset : offset + 8]
+            offset += 8
+    for y in range(height):
+        # Position is 1-based
+        commands += bytes([SIG_COMMAND, CMD_CURSOR_POS, 1, y + 1])
+        commands += snapshot[offset + y * width : offset + (y + 1) * width]
+    return bytes(commands)
+
+
+def bitmap_to_char(char_bytes):
+    """
+    @brief      Approximates a 5x8 custom char bitmap as a quadrant block char.
+                A quadrant is filled if more than half of its pixels are. The
+                middle column is left out, so each quadrant is 2x4.
+
+    @param      char_bytes  The bitmap, as 8 5-bit rows
+
+    @return     The block char
+    """
+    index = 0
+    for rows in (char_bytes[:4], char_bytes[4:]):
+        for shift in (3, 0):  # Left columns, then right columns
+            pixels = sum(bin(row >> shift & 0b11).count("1") for row in rows)
+            index = index << 1 | (pixels > 4)
+    return _QUADRANT_CHARS[index]
+
+
 class Resource:
-    def __init__(self, redis_client, pubsub, dimensions, sub_channel):
+    """
+    @brief      Gets updates from the reducer, either as pubs on a channel or
+                as entries on a stream. If no pubsub is given, we're using
+                streams, and a StreamReader has to feed us entries.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        pubsub,
+        dimensions,
+        sub_channel,
+        stream_key,
+        state_key,
+    ):
         self._redis = redis_client
         self._pubsub = pubsub
-        self._pubsub.subscribe(**{sub_channel: self._on_pub})
+        self._stream_key = stream_key
+        self._state_key = state_key
+        if pubsub is not None:
+            self._pubsub.subscribe(**{sub_channel: self._on_pub})
 
         x, y, width, height = dimensions
         self._window = curses.newwin(height, width, y, x)
 
+    @property
+    def stream_key(self):
+        return self._stream_key
+
+    def sync(self):
+        """
+        @brief      Catches up to the reducer's current state, before reading
+                    from our stream.
+
+        @return     The (ID, sequence number) of the last entry that the state
+                    covers
+        """
+        p = self._redis.pipeline()
+        p.get(self._state_key)
+        p.xrevrange(self._stream_key, count=1)
+        state, entries = p.execute()
+        if state:
+            self._apply_state(state)
+        if not entries:
+            return (b"0-0", None)
+        entry_id, fields = entries[0]
+        return (entry_id, int(fields[b"seq"]))
+
+    @abc.abstractmethod
+    def _apply_state(self, state):
+        pass
+
+    @abc.abstractmethod
+    def on_entry(self, data):
+        pass
+
     @abc.abstractmethod
     def _on_pub(self, msg):
         pass
@@ -79,26 +190,67 @@ class Resource:
 
 class Led(Resource):
     """
-    @brief      A mocked version of the LED handler.
+    @brief      A mocked version of the LED handler. If the LED has multiple
+                zones (e.g. an addressable strip), each zone is drawn as a
+                block.
     """
 
     _COLOR_KEY = "reducer:led_color"
+    _ZONE_SIZE = 3  # RGB
 
     def __init__(self, *args, **kwargs):
         super().__init__(
-            dimensions=(0, 0, 50, 1), sub_channel="r2d:led", *args, **kwargs
+            dimensions=(0, 0, 50, 1),
+            sub_channel="r2d:led",
+            stream_key="reducer:led_stream",
+            state_key=__class__._COLOR_KEY,
+            *args,
+            **kwargs,
         )
-        self._set_color(BLACK)
+        self._set_frame(bytes(BLACK))
 
     def _on_pub(self, msg):
-        # Fetch the correct color from Redis and set it
-        color = Color.from_bytes(self._redis.get(__class__._COLOR_KEY))
-        self._set_color(color)
-
-    def _set_color(self, color):
-        curses_color = curses.color_pair(color.to_term_color())
+        # Fetch the whole frame from Redis and draw it. We don't need to
+        # bother with only the changed spans here.
+        self._set_frame(self._redis.get(__class__._COLOR_KEY))
+
+    def _apply_state(self, state):
+        self._set_frame(state)
+
+    def on_entry(self, data):
+        # Stream entries only have the spans of zones that changed, so patch
+        # them into our copy of the frame
+        frame = bytearray(self._frame)
+        offset = 0
+        while offset + _SPAN_HEADER.size <= len(data):
+            zone, count = _SPAN_HEADER.unpack_from(data, offset)
+            offset += _SPAN_HEADER.size
+            start = zone * __class__._ZONE_SIZE
+            end = start + count * __class__._ZONE_SIZE
+            if end > len(frame):
+                frame += bytes(end - len(frame))
+            frame[start:end] = data[offset : offset + end - start]
+            offset += end - start
+        self._set_frame(bytes(frame))
+
+    def _set_frame(self, frame):
+        self._frame = frame
+        colors = [
+            Color.from_bytes(frame[i : i + __class__._ZONE_SIZE])
+            for i in range(0, len(frame), __class__._ZONE_SIZE)
+        ]
         self._window.clear()
-        self._window.addstr(f"LED Color: {color}", curses_color)
+        if len(colors) == 1:
+            color = colors[0]
+            curses_color = curses.color_pair(color.to_term_color())
+            self._window.addstr(f"LED Color: {color}", curses_color)
+        else:
+            self._window.addstr("LED: ")
+            _, width = self._window.getmaxyx()
+            # Leave room for the label, and curses needs the last cell free
+            for color in colors[: width - 6]:
+                curses_color = curses.color_pair(color.to_term_color())
+                self._window.addstr("█", curses_color)
         self._window.noutrefresh()
 
 
@@ -111,6 +263,8 @@ class Lcd(Resource):
     """
 
     _COMMAND_QUEUE_KEY = "reducer:lcd_commands"
+    _RESYNC_CHANNEL = "d2r:lcd_resync"
+    _SNAPSHOT_KEY = "reducer:lcd_snapshot"
 
     def command(code, num_args=0):
         def inner(func):
@@ -124,27 +278,46 @@ class Lcd(Resource):
 
     def __init__(self, *args, **kwargs):
         super().__init__(
-            dimensions=(0, 1, 0, 0), sub_channel="r2d:lcd", *args, **kwargs
+            dimensions=(0, 1, 0, 0),
+            sub_channel="r2d:lcd",
+            stream_key="reducer:lcd_stream",
+            state_key=__class__._SNAPSHOT_KEY,
+            *args,
+            **kwargs,
         )
 
-        # Unfortunately this has to be hardcoded
-        self._custom_chars = {
-            0: {
-                0x00: "▗",  # Half-bottom right
-                0x01: "▖",  # Half-bottom left
-                0x02: "▄",  # Half-bottom
-                0x03: "▜",  # Full-bottom right
-                0x04: "▛",  # Full-bottom left
-                0xFF: "█",  # Full
-            }
-        }
-        self._current_char_bank = self._custom_chars[0]
+        # Custom chars follow whatever bitmaps the reducer uploads. Banks
+        # are what's saved in EEPROM, code => char for what's loaded now.
+        self._char_banks = {}
+        self._custom_chars = {}
+        # What's on the screen, (x, y) => char code, so cells can be redrawn
+        # when their custom char changes
+        self._cells = {}
 
         self._width, self._height = 20, 4
         self._cursor_x, self._cursor_y = 0, 0
 
+        # With streams, the stream reader syncs us up
+        if self._pubsub is not None:
+            self._load_snapshot()
+
+    def _load_snapshot(self):
+        # Draw the whole screen from the reducer's snapshot. The snapshot
+        # already covers everything in the queue, so drop that too.
+        p = self._redis.pipeline()
+        p.get(__class__._SNAPSHOT_KEY)
+        p.delete(__class__._COMMAND_QUEUE_KEY)
+        snapshot, _ = p.execute()
+        if snapshot:
+            self._process_data([snapshot_to_commands(snapshot)])
+        else:
+            # No snapshot yet, so ask the reducer for the whole screen. We're
+            # already subscribed, so we'll get it.
+            self._redis.publish(__class__._RESYNC_CHANNEL, b"")
+
     @command(CMD_CLEAR)
     def _clear(self):
+        self._cells.clear()
         self._window.clear()
         self._window.border()
         self._window.noutrefresh()
@@ -197,15 +370,23 @@ class Lcd(Resource):
     def _cursor_back(self, n=1):
         self._set_cursor_pos(self._cursor_x - n, self._cursor_y)
 
+    @command(CMD_CREATE_CHAR, 9)  # code + 8 char bytes
+    def _create_char(self, code, *char_bytes):
+        self._custom_chars[code] = bitmap_to_char(char_bytes)
+        # The LCD redraws every cell that uses the char, so we have to too
+        for (x, y), cell_code in self._cells.items():
+            if cell_code == code:
+                self._draw_cell(x, y, code)
+        self._window.noutrefresh()
+
     @command(CMD_SAVE_CUSTOM_CHAR, 10)  # bank + code + 8 char bytes
     def _save_custom_char(self, bank, code, *char_bytes):
-        # We can't do anything with the custom chars, so don't saving them
-        # self._custom_chars[bank][code] = char_bytes
-        pass
+        self._char_banks.setdefault(bank, {})[code] = char_bytes
 
     @command(CMD_LOAD_CHAR_BANK, 1)
     def _load_char_bank(self, bank):
-        self._current_char_bank = self._custom_chars[bank]
+        for code, char_bytes in self._char_banks.get(bank, {}).items():
+            self._create_char(code, *char_bytes)
 
     @command(CMD_AUTOSCROLL_ON)
     def _autoscroll_on(self):
@@ -215,18 +396,20 @@ class Lcd(Resource):
     def _autoscroll_off(self):
         pass  # TODO
 
-    def _write_str(self, s):
-        self._window.addstr(self._cursor_y, self._cursor_x, s)
+    def _draw_cell(self, x, y, code):
+        try:
+            char = self._custom_chars[code]
+        except KeyError:
+            char = _ROM_CHARS.get(code, chr(code))
+        self._window.addstr(y, x, char)
+
+    def _write_byte(self, code):
+        self._cells[(self._cursor_x, self._cursor_y)] = code
+        self._draw_cell(self._cursor_x, self._cursor_y, code)
         self._window.noutrefresh()
-        self._cursor_fwd(len(s))
+        self._cursor_fwd()
 
     def _process_data(self, data):
-        def decode_byte(b):
-            try:
-                return self._current_char_bank[b]
-            except KeyError:
-                return chr(b)
-
         # Data is a list of bytes objects, of varying lengths. Build a flat
         # iterator of ints so we can process each command one at a time.
         byte_buffer = itertools.chain.from_iterable(data)
@@ -250,7 +433,13 @@ class Lcd(Resource):
             else:
                 # Data is just text, read one byte from the buffer and write
                 # it to screen
-                self._write_str(decode_byte(first_byte))
+                self._write_byte(first_byte)
+
+    def _apply_state(self, state):
+        self._process_data([snapshot_to_commands(state)])
+
+    def on_entry(self, data):
+        self._process_data([data])
 
     def _on_pub(self, msg):
         try:
@@ -268,9 +457,17 @@ class Lcd(Resource):
 
 
 class Keepalive(Thread):
+    """
+    @brief      A mocked keepalive, which is always alive. Since the value
+                never changes, this only sends heartbeats.
+    """
 
     _KEEPALIVE_KEY = "reducer:keepalive"
     _KEEPALIVE_CHANNEL = "r2d:keepalive"
+    # Payloads are (is_alive, sequence number)
+    _PAYLOAD_FORMAT = "<?I"
+    _HEARTBEAT_INTERVAL = 5.0
+    _KEY_TTL = 15
 
     def __init__(self, redis_client, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -286,23 +483,85 @@ class Keepalive(Thread):
 
     def run(self):
         logger.info("Keepalive started")
+        seq = 0
         while self.should_run:
-            # Update
-            self._redis.set(__class__._KEEPALIVE_KEY, b"\x01")
-            self._redis.publish(__class__._KEEPALIVE_CHANNEL, b"")
-            time.sleep(1)
+            seq += 1
+            payload = struct.pack(__class__._PAYLOAD_FORMAT, True, seq)
+            p = self._redis.pipeline()
+            p.set(__class__._KEEPALIVE_KEY, payload, ex=__class__._KEY_TTL)
+            p.publish(__class__._KEEPALIVE_CHANNEL, payload)
+            p.execute()
+            self._shutdown.wait(__class__._HEARTBEAT_INTERVAL)
         logger.info("Keepalive stopped")
 
 
+class StreamReader(Thread):
+    """
+    @brief      Reads the reducer's streams for a set of resources, with one
+                blocking XREAD for all of them. Each resource syncs to the
+                reducer's current state first, and again if we miss any
+                entries.
+    """
+
+    _BLOCK_TIME = 1000  # Milliseconds
+    _BATCH_SIZE = 100
+
+    def __init__(self, redis_client, resources, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._redis = redis_client
+        # Redis gives us keys as bytes
+        self._resources = {res.stream_key.encode(): res for res in resources}
+        self._shutdown = Event()
+
+    def stop(self):
+        self._shutdown.set()
+
+    def run(self):
+        logger.info("Stream reader started")
+        # Stream key => (ID, sequence number) of the last entry we've seen
+        positions = {key: res.sync() for key, res in self._resources.items()}
+        while not self._shutdown.is_set():
+            try:
+                result = self._redis.xread(
+                    {key: entry_id for key, (entry_id, _) in positions.items()},
+                    count=__class__._BATCH_SIZE,
+                    block=__class__._BLOCK_TIME,
+                )
+                for key, entries in result:
+                    res = self._resources[key]
+                    for entry_id, fields in entries:
+                        _, last_seq = positions[key]
+                        seq = int(fields[b"seq"])
+                        if last_seq is not None and seq != last_seq + 1:
+                            logger.warning(
+                                f"Missed {key} entries ({last_seq}->{seq})"
+                            )
+                            positions[key] = res.sync()
+                            break
+                        res.on_entry(fields[b"data"])
+                        positions[key] = (entry_id, seq)
+            except Exception:
+                logger.error(traceback.format_exc())
+                self._shutdown.wait(1.0)
+        logger.info("Stream reader stopped")
+
+
 class SozeDisplay:
-    def __init__(self, redis_url):
+    def __init__(self, redis_url, streams=False):
         redis_client = redis.from_url(redis_url)
-        self._pubsub = redis_client.pubsub()
+        # With streams, there's no pubsub. Updates are read by the stream
+        # reader instead.
+        self._pubsub = None if streams else redis_client.pubsub()
 
         self._should_run = True
         self._keepalive = Keepalive(redis_client)
-        Led(redis_client, self._pubsub)
-        Lcd(redis_client, self._pubsub)
+        led = Led(redis_client, self._pubsub)
+        lcd = Lcd(redis_client, self._pubsub)
+        self._stream_reader = (
+            StreamReader(redis_client, [led, lcd], name="Streams")
+            if streams
+            else None
+        )
 
         # Curses init
         curses.curs_set(0)  # Hide the cursor
@@ -324,7 +583,10 @@ class SozeDisplay:
         try:
             # Start threads
             self._keepalive.start()
-            self._pubsub_thread = self._pubsub.run_in_thread()
+            if self._stream_reader:
+                self._stream_reader.start()
+            else:
+                self._pubsub_thread = self._pubsub.run_in_thread()
 
             # Constantly refresh curses, wait for Ctrl+c
             while self._should_run:
@@ -340,5 +602,8 @@ class SozeDisplay:
         self._should_run = False
 
     def _stop_threads(self):
-        self._pubsub_thread.stop()  # Will unsub from all channels
+        if self._stream_reader:
+            self._stream_reader.stop()
+        else:
+            self._pubsub_thread.stop()  # Will unsub from all channels
         self._keepalive.stop()
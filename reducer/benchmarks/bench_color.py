@@ -0,0 +1,29 @@
+from soze_reducer.core.color import Color
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+
+
+def test_add(benchmark):
+    benchmark(RED.__add__, BLUE)
+
+
+def test_mul(benchmark):
+    benchmark(RED.__mul__, 0.5)
+
+
+def test_blend(benchmark):
+    benchmark(RED.blend, BLUE, 0.25)
+
+
+def test_fade_step(benchmark):
+    # This is what FadeMode used to do on every tick, before lerp
+    benchmark(lambda: RED * 0.75 + BLUE * 0.25)
+
+
+def test_bytes(benchmark):
+    benchmark(bytes, RED)
+
+
+def test_lerp(benchmark):
+    benchmark(RED.lerp, BLUE, 0.25)
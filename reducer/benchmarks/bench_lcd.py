@@ -0,0 +1,85 @@
+import itertools
+import time
+
+import redis
+
+from soze_reducer.core.color import Color
+from soze_reducer.core.keepalive import Keepalive
+from soze_reducer.lcd import helper
+from soze_reducer.lcd.framebuffer import FrameBuffer
+from soze_reducer.lcd.glyphs import GlyphAllocator
+from soze_reducer.lcd.lcd import Lcd
+from soze_reducer.lcd.mode_clock import ClockMode
+
+# The clock, with its glyphs mapped to char codes
+CLOCK_TEXT, _ = GlyphAllocator().allocate(ClockMode().get_text({}))
+# A full screen of text that differs from the clock in every cell
+FULL_TEXT = "\n".join(["abcdefghijklmnopqrst"] * 4)
+
+
+def make_pipe():
+    # Commands are queued on a pipeline without connecting, until it's
+    # executed. We never execute it, so no Redis server is needed.
+    return redis.Redis().pipeline(transaction=True)
+
+
+def make_lcd():
+    lcd = Lcd(redis_client=None, keepalive=Keepalive(redis_client=None))
+    lcd.init(make_pipe())
+    return lcd
+
+
+def test_clock_get_text(benchmark):
+    # Most ticks land in the same second as the last one
+    benchmark(ClockMode().get_text, {})
+
+
+def test_clock_get_text_new_minute(benchmark):
+    # Worst case, every tick is in a new minute and re-renders everything
+    mode = ClockMode()
+    minutes = itertools.count(time.time(), 60)
+    benchmark(lambda: mode.get_text({}, next(minutes)))
+
+
+def test_make_big_text(benchmark):
+    benchmark(lambda: list(helper.make_big_text(" 12:34")))
+
+
+def test_glyphs_allocate(benchmark):
+    # The glyphs are already loaded, so this is just the mapping
+    glyphs = GlyphAllocator()
+    text = ClockMode().get_text({})
+    glyphs.allocate(text)
+    benchmark(glyphs.allocate, text)
+
+
+def test_framebuffer_unchanged(benchmark):
+    fb = FrameBuffer(20, 4)
+    cells = fb.render(CLOCK_TEXT)
+    fb.update(cells)
+    benchmark(fb.update, cells)
+
+
+def test_framebuffer_full(benchmark):
+    # Alternate between two screens so there's always a full diff to encode
+    fb = FrameBuffer(20, 4)
+    screens = [fb.render(CLOCK_TEXT), fb.render(FULL_TEXT)]
+
+    def update():
+        screens.reverse()
+        fb.update(screens[0])
+
+    benchmark(update)
+
+
+def test_set_text(benchmark):
+    # Alternate between two screens so there's always a full diff to encode
+    lcd = make_lcd()
+    texts = [CLOCK_TEXT, FULL_TEXT]
+
+    def apply():
+        pipe = make_pipe()
+        texts.reverse()
+        lcd._apply_values(pipe, Color(0, 0, 255), texts[0])
+
+    benchmark(apply)
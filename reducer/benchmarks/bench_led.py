@@ -0,0 +1,93 @@
+import msgpack
+import redis
+
+from soze_reducer.core.color import Color
+from soze_reducer.core.keepalive import Keepalive
+from soze_reducer.led.calibration import Calibration
+from soze_reducer.led.led import Led
+from soze_reducer.led.mode_breathe import BreatheMode
+from soze_reducer.led.mode_fade import FadeMode
+from soze_reducer.led.mode_rainbow import RainbowMode
+from soze_reducer.led.mode_sequence import SequenceMode
+from soze_reducer.led.mode_strobe import StrobeMode
+
+SETTINGS = {
+    "mode": "fade",
+    "fade": {"colors": [0xFF0000, 0x00FF00, 0x0000FF], "fade_time": 5.0},
+}
+LONG_SETTINGS = {
+    "mode": "fade",
+    "fade": {"colors": list(range(0, 0xFFFFFF, 0xFFFF)), "fade_time": 5.0},
+}
+
+# A long lighting program, which should cost the same per tick as a short one
+SEQUENCE_SETTINGS = {
+    "mode": "sequence",
+    "sequence": {
+        "keyframes": [
+            {
+                "color": color,
+                "hold_time": 0.5,
+                "transition_time": 1.0,
+                "easing": "ease_in_out",
+            }
+            for color in range(0, 0xFFFFFF, 0x3FFF)
+        ]
+    },
+}
+
+
+def test_fade_get_color(benchmark):
+    benchmark(FadeMode().get_color, SETTINGS)
+
+
+def test_fade_get_color_long(benchmark):
+    benchmark(FadeMode().get_color, LONG_SETTINGS)
+
+
+def test_sequence_get_color(benchmark):
+    benchmark(SequenceMode().get_color, SEQUENCE_SETTINGS)
+
+
+def test_rainbow_get_color(benchmark):
+    settings = {"mode": "rainbow", "rainbow": {"cycle_time": 10.0}}
+    benchmark(RainbowMode().get_color, settings)
+
+
+def test_breathe_get_color(benchmark):
+    settings = {
+        "mode": "breathe",
+        "breathe": {"color": 0xFF8000, "period": 4.0},
+    }
+    benchmark(BreatheMode().get_color, settings)
+
+
+def test_strobe_get_color(benchmark):
+    settings = {
+        "mode": "strobe",
+        "strobe": {"color": 0xFFFFFF, "frequency": 5.0, "duty": 0.5},
+    }
+    benchmark(StrobeMode().get_color, settings)
+
+
+def test_calibration_apply(benchmark):
+    settings = {"calibration": {"gamma": 2.2, "red": 1.0, "green": 0.8}}
+    benchmark(Calibration().apply, settings, Color(255, 128, 0))
+
+
+def test_rainbow_strip_frame(benchmark):
+    # A 100-zone strip, with every zone changing on every frame
+    keepalive = Keepalive(redis_client=None)
+    led = Led(redis_client=None, keepalive=keepalive, zones=100)
+    led.set_settings(
+        keepalive.status,
+        msgpack.dumps({"mode": "rainbow", "rainbow": {"cycle_time": 1.0}}),
+    )
+    pipe = redis.Redis().pipeline(transaction=True)
+
+    def update():
+        pipe.reset()
+        led.update(pipe)
+        led.wake()
+
+    benchmark(update)
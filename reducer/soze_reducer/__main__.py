@@ -1,5 +1,6 @@
 import argparse
 
+from soze_reducer.core.async_reducer import AsyncSozeReducer
 from soze_reducer.core.reducer import SozeReducer
 
 
@@ -10,6 +11,34 @@ parser.add_argument(
     default="redis://localhost:6379",
     help="URL for the Redis host",
 )
+parser.add_argument(
+    "--async",
+    dest="use_async",
+    action="store_true",
+    help="Run everything on one asyncio event loop, instead of threads",
+)
+parser.add_argument(
+    "--profile-dir",
+    default="/tmp",
+    help="Directory to write profiles to (profiling is started with SIGUSR1)",
+)
+parser.add_argument(
+    "--led-zones",
+    type=int,
+    default=1,
+    help="Number of independently colored LED zones, e.g. pixels on a strip",
+)
+parser.add_argument(
+    "--streams",
+    action="store_true",
+    help="Send updates to the display on Redis streams, instead of pubsub",
+)
 args = parser.parse_args()
 
-SozeReducer(args.redis).run()
+reducer_class = AsyncSozeReducer if args.use_async else SozeReducer
+reducer_class(
+    args.redis,
+    profile_dir=args.profile_dir,
+    led_zones=args.led_zones,
+    streams=args.streams,
+).run()
@@ -0,0 +1,209 @@
+import asyncio
+import signal
+import time
+import traceback
+
+import redis.asyncio
+
+from soze_reducer import logger
+from soze_reducer.led.led import Led
+from soze_reducer.lcd.lcd import Lcd
+from .frame import Frame, get_sleep_time
+from .keepalive import Keepalive
+from .profiler import SamplingProfiler
+from .stats import ReducerStats
+from .status import STATUSES
+
+
+class AsyncSozeReducer:
+    """
+    An alternative to SozeReducer that runs everything as tasks on a single
+    asyncio event loop, instead of one thread for pubsub plus one thread for
+    frames. The resources themselves are shared with the threaded runtime,
+    but all Redis I/O is done here.
+    """
+
+    def __init__(self, redis_url, profile_dir, led_zones=1, streams=False):
+        self._redis = redis.asyncio.from_url(redis_url)
+        self._keepalive = Keepalive(redis_client=self._redis)
+        self._resources = [
+            Led(
+                redis_client=self._redis,
+                keepalive=self._keepalive,
+                zones=led_zones,
+                streams=streams,
+            ),
+            Lcd(
+                redis_client=self._redis,
+                keepalive=self._keepalive,
+                streams=streams,
+            ),
+        ]
+        self._stats = ReducerStats(self._resources)
+        self._profiler = SamplingProfiler(
+            profile_dir, redis_key="reducer:profile", name="reducer"
+        )
+        # These can't be created until the event loop is running
+        self._shutdown = None
+        self._wakeup = None
+
+    def run(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self._shutdown = asyncio.Event()
+        # Set whenever a resource needs an update before the next scheduled
+        # one, e.g. after a settings change
+        self._wakeup = asyncio.Event()
+        for res in self._resources:
+            res.register_wake_listener(self._wakeup.set)
+
+        # Register exit handlers
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._shutdown.set)
+        # SIGUSR1 profiles the live process for a while
+        loop.add_signal_handler(signal.SIGUSR1, self._profiler.start)
+
+        # Get the current keepalive value, then load settings for the first
+        # time. The listener has to go after the first keepalive update,
+        # because settings aren't available for it until after that.
+        self._keepalive.update(await self._redis.get(self._keepalive.redis_key))
+        await self._load_all_settings()
+        for res in self._resources:
+            if res.state_key:
+                res.restore_state(await self._redis.get(res.state_key))
+        self._keepalive.register_listener(self._on_status_change)
+
+        # One task to listen for Redis pubs, and one task to compute derived
+        # state for all resources, one frame at a time
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(
+            **{self._keepalive.sub_channel: self._on_keepalive_pub},
+            **{
+                res.sub_channel: self._make_settings_handler(res)
+                for res in self._resources
+            },
+            **{
+                channel: handler
+                for res in self._resources
+                for channel, handler in res.get_handlers().items()
+            },
+        )
+        pubsub_task = asyncio.create_task(
+            pubsub.run(exception_handler=self._on_pubsub_error)
+        )
+        frame_task = asyncio.create_task(self._loop())
+        logger.info("Started tasks")
+
+        try:
+            # Periodically check if the keepalive has gone stale, and
+            # publish stats
+            while not self._shutdown.is_set():
+                try:
+                    await asyncio.wait_for(self._shutdown.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    self._keepalive.check_timeout()
+                    if self._stats.is_publish_due():
+                        await self._publish_stats()
+        finally:
+            # Stop all tasks. Let the resources clean up before we disconnect.
+            self._wakeup.set()
+            await frame_task
+            pubsub_task.cancel()
+            try:
+                await pubsub_task
+            except asyncio.CancelledError:
+                pass
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await self._redis.close()
+
+    async def _publish_stats(self):
+        # Also check if profiling was requested, all in one round trip. This
+        # is just diagnostics, so a failure shouldn't stop the reducer.
+        try:
+            p = self._redis.pipeline()
+            p.set(self._stats.redis_key, self._stats.to_redis())
+            p.get(self._profiler.redis_key)
+            p.delete(self._profiler.redis_key)
+            _, profile_value, _ = await p.execute()
+            self._profiler.check_redis(profile_value)
+        except Exception:
+            logger.exception("Failed to publish stats")
+
+    async def _load_settings(self, res, statuses):
+        redis_values = await self._redis.mget(
+            [res.get_user_redis_key(status) for status in statuses]
+        )
+        for status, redis_value in zip(statuses, redis_values):
+            res.set_settings(status, redis_value)
+
+    async def _load_all_settings(self):
+        # We grab every status up front, so that a status change doesn't
+        # need a Redis read
+        await asyncio.gather(
+            *(self._load_settings(res, STATUSES) for res in self._resources)
+        )
+
+    def _make_settings_handler(self, res):
+        async def handler(msg):
+            statuses = res.get_stale_statuses(msg)
+            if statuses:
+                await self._load_settings(res, statuses)
+
+        return handler
+
+    def _on_keepalive_pub(self, msg):
+        # The payload carries the value, so there's nothing to read
+        self._keepalive.update(msg["data"])
+
+    def _on_status_change(self, status):
+        for res in self._resources:
+            res.apply_status(status)
+
+    def _on_pubsub_error(self, e, pubsub):
+        logger.error(
+            "".join(traceback.format_exception(type(e), e, e.__traceback__))
+        )
+
+    async def _commit(self, func):
+        # Queue up all the writes for this frame, then send them in one go
+        frame = Frame(self._redis)
+        func(frame)
+        if len(frame):
+            start_time = time.perf_counter()
+            try:
+                replies = await frame.commit()
+            except redis.RedisError:
+                # The resources will redo their writes on a later frame
+                logger.exception("Failed to commit frame")
+                frame.handle_error()
+                return
+            self._stats.record_redis_call(time.perf_counter() - start_time)
+            frame.handle_replies(replies)
+
+    async def _loop(self):
+        try:
+            logger.info("Starting frame task")
+            await self._commit(lambda frame: frame.init(self._resources))
+            while not self._shutdown.is_set():
+                # Clear before updating, so that a wakeup that arrives during
+                # the update triggers another one
+                self._wakeup.clear()
+                await self._commit(lambda frame: frame.update(self._resources))
+
+                # Sleep until a resource is due or we get woken up
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), get_sleep_time(self._resources)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            await self._commit(lambda frame: frame.cleanup(self._resources))
+        except Exception:
+            logger.error(traceback.format_exc())
+        finally:
+            logger.info("Stopped frame task")
+            for res in self._resources:
+                logger.info(f"{res.name}: {res.output}")
@@ -1,8 +1,5 @@
-def _coerce(r, g, b):
-    def helper(val):
-        return min(max(int(val), 0), 255)
-
-    return (helper(r), helper(g), helper(b))
+def _clamp(val):
+    return min(max(int(val), 0), 255)
 
 
 def _check(val):
@@ -14,28 +11,81 @@ def _check(val):
 
 
 class Color:
+    """
+    An immutable RGB color. The channels are packed into a single 24-bit int,
+    so each color is one small object. Colors are created on every LED frame,
+    so results of arithmetic skip the range checks (they're already in
+    range), and common colors are interned.
+    """
+
+    __slots__ = ("_value",)
+    # Packed value => shared instance
+    _INTERNED = {}
+
     def __init__(self, red, green, blue):
-        self._r = _check(red)
-        self._g = _check(green)
-        self._b = _check(blue)
+        _set_value(self, _check(red) << 16 | _check(green) << 8 | _check(blue))
+
+    @classmethod
+    def _unchecked(cls, value):
+        """
+        Make a color from a packed 24-bit value, without any checks. Only use
+        this when the value is known to be valid.
+        """
+        try:
+            return cls._INTERNED[value]
+        except KeyError:
+            color = object.__new__(cls)
+            _set_value(color, value)
+            return color
+
+    @classmethod
+    def _intern(cls, color):
+        cls._INTERNED[color._value] = color
+        return color
 
     @classmethod
     def from_hexcode(cls, hex_val):
-        return cls(
-            (hex_val >> 16) & 0xFF, (hex_val >> 8) & 0xFF, hex_val & 0xFF
-        )
+        if not isinstance(hex_val, int):
+            raise TypeError(f"Hexcode must be int, but was {type(hex_val)}")
+        return cls._unchecked(hex_val & 0xFFFFFF)
 
     @property
     def red(self):
-        return self._r
+        return self._value >> 16
 
     @property
     def green(self):
-        return self._g
+        return self._value >> 8 & 0xFF
 
     @property
     def blue(self):
-        return self._b
+        return self._value & 0xFF
+
+    def lerp(self, other, t):
+        """
+        @brief      Linearly interpolate from this color to another one. This
+                    is equivalent to self * (1 - t) + other * t, but only
+                    makes one object.
+
+        @param      self   The object
+        @param      other  The color to interpolate towards
+        @param      t      How far to go towards the other color [0, 1]
+
+        @return     The interpolated color, as a new Color object
+        """
+        if t < 0 or 1 < t:
+            raise ValueError(f"t must be in range [0, 1], but was {t}")
+        s = 1.0 - t
+        a = self._value
+        b = other._value
+        # Round each channel (the +0.5), rather than truncating it. Otherwise
+        # float error could knock a channel down a level, even when lerping
+        # a color with itself.
+        return Color._unchecked(
+            int((a >> 16) * s + (b >> 16) * t + 0.5) << 16
+            | int((a >> 8 & 0xFF) * s + (b >> 8 & 0xFF) * t + 0.5) << 8
+            | int((a & 0xFF) * s + (b & 0xFF) * t + 0.5)
+        )
 
     def blend(self, other, bias=0.5):
         """
@@ -49,27 +99,25 @@ class Color:
         """
         if bias < 0 or 1 < bias:
             raise ValueError(f"Bias must be in range [0, 1], but was {bias}")
-        other_bias = 1.0 - bias
+        return other.lerp(self, bias)
 
-        def mix(this, other):
-            return int(this * bias + other * other_bias)
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
-        return Color(
-            mix(self.red, other.red),
-            mix(self.green, other.green),
-            mix(self.blue, other.blue),
-        )
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (Color.from_hexcode, (self._value,))
 
     def __eq__(self, other):
-        return (
-            isinstance(other, Color)
-            and self.red == other.red
-            and self.green == other.green
-            and self.blue == other.blue
-        )
+        return isinstance(other, Color) and self._value == other._value
+
+    def __hash__(self):
+        return hash(self._value)
 
     def __bytes__(self):
-        return bytes([self.red, self.green, self.blue])
+        return self._value.to_bytes(3, "big")
 
     def __str__(self):
         return f"({self.red}, {self.green}, {self.blue})"
@@ -83,12 +131,13 @@ class Color:
                 "unsupported operand type(s) for +:"
                 f" '{type(self)}' and '{type(other)}'"
             )
-        r, g, b = _coerce(
-            self.red + other.red,
-            self.green + other.green,
-            self.blue + other.blue,
+        a = self._value
+        b = other._value
+        return Color._unchecked(
+            min((a >> 16) + (b >> 16), 255) << 16
+            | min((a >> 8 & 0xFF) + (b >> 8 & 0xFF), 255) << 8
+            | min((a & 0xFF) + (b & 0xFF), 255)
         )
-        return Color(r, g, b)
 
     def __mul__(self, coeff):
         if not isinstance(coeff, int) and not isinstance(coeff, float):
@@ -96,10 +145,17 @@ class Color:
                 "unsupported operand type(s) for *:"
                 f" '{type(self)}' and '{type(coeff)}'"
             )
-        r, g, b = _coerce(
-            self.red * coeff, self.green * coeff, self.blue * coeff
+        a = self._value
+        return Color._unchecked(
+            _clamp((a >> 16) * coeff) << 16
+            | _clamp((a >> 8 & 0xFF) * coeff) << 8
+            | _clamp((a & 0xFF) * coeff)
         )
-        return Color(r, g, b)
 
 
-BLACK = Color(0, 0, 0)
+# Slots can only be written through their descriptor, since __setattr__ is
+# blocked
+_set_value = Color._value.__set__
+
+BLACK = Color._intern(Color(0, 0, 0))
+WHITE = Color._intern(Color(255, 255, 255))
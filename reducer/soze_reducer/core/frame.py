@@ -0,0 +1,87 @@
+import time
+
+from soze_reducer import logger
+
+
+class Frame:
+    """
+    Collects the writes and publishes from every resource for one tick, so
+    they can all be flushed to Redis in a single transaction. That makes each
+    frame one round trip, and the display sees the LED and LCD updates for
+    the same instant together.
+    """
+
+    def __init__(self, redis_client):
+        self._pipe = redis_client.pipeline(transaction=True)
+        # Resources that queued commands this frame, so they can see the
+        # replies
+        self._resources = []
+
+    def __len__(self):
+        # The number of queued commands
+        return len(self._pipe)
+
+    def init(self, resources):
+        for res in resources:
+            self._run(res, res.init)
+
+    def update(self, resources):
+        # Only update the resources that are actually due
+        now = time.monotonic()
+        for res in resources:
+            if res.is_due(now):
+                self._run(res, res.update)
+
+    def cleanup(self, resources):
+        for res in resources:
+            self._run(res, res.cleanup)
+
+    def _run(self, res, func):
+        """
+        Have the resource queue up its commands for this frame. If it fails,
+        the other resources still get to go, and whatever it queued before
+        failing is dropped, so the frame can still be committed.
+        """
+        start = len(self._pipe)
+        try:
+            func(self._pipe)
+        except Exception:
+            logger.exception(f"{res.name}: Update failed")
+            del self._pipe.command_stack[start:]
+            res.handle_error()
+        else:
+            self._resources.append(res)
+
+    def commit(self):
+        """
+        Flush everything in this frame to Redis. With an asyncio client, this
+        returns a coroutine that has to be awaited. An empty frame doesn't hit
+        Redis at all.
+        """
+        return self._pipe.execute()
+
+    def handle_replies(self, replies):
+        """
+        Pass the replies from commit to every resource that queued commands
+        in this frame.
+        """
+        for res in self._resources:
+            res.handle_replies(replies)
+
+    def handle_error(self):
+        """
+        Let every resource that queued commands in this frame know that the
+        frame couldn't be committed.
+        """
+        for res in self._resources:
+            res.handle_error()
+
+
+def get_sleep_time(resources):
+    """
+    Get the number of seconds until the next resource is due for an update, or
+    None if none of them have an update scheduled.
+    """
+    now = time.monotonic()
+    times = (res.get_time_until_due(now) for res in resources)
+    return min((t for t in times if t is not None), default=None)
@@ -1,22 +1,35 @@
 import struct
-from enum import Enum
+import time
+from threading import Lock
 
 from soze_reducer import logger
 from .resource import RedisSubscriber
-
-
-class Status(Enum):
-    NORMAL = "normal"
-    SLEEP = "sleep"
+from .status import Status
 
 
 class Keepalive(RedisSubscriber):
+    """
+    Tracks whether the display (and therefore the PC) is alive. The display
+    publishes its keepalive value directly in the pub payload, whenever it
+    changes plus on a slow heartbeat. It also stores the latest payload in a
+    key that expires, so we can get the current value on startup. If we don't
+    hear from the display for too long, it's considered dead.
+    """
 
     _KEEPALIVE_KEY = "reducer:keepalive"
+    # Payloads are (is_alive, sequence number)
+    _PAYLOAD_FORMAT = "<?I"
+    # The display sends a heartbeat every 5 seconds. If we miss a few of
+    # those in a row, assume it's gone.
+    _TIMEOUT = 15.0
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, sub_channel="r2d:keepalive", **kwargs)
         self._alive = False
+        self._seq = None
+        self._last_seen = None  # Monotonic time of the last payload
+        # State can be changed by pubs and timeouts, from different threads
+        self._lock = Lock()
         # List of functions to call after a status change
         self._listeners = []
 
@@ -25,18 +38,62 @@ class Keepalive(RedisSubscriber):
         status = Status.NORMAL if self._alive else Status.SLEEP
         return status.value
 
+    @property
+    def redis_key(self):
+        return __class__._KEEPALIVE_KEY
+
     def register_listener(self, listener):
         self._listeners.append(listener)
 
-    def _on_pub(self, msg):
-        # struct.unpack returns a 1-tuple, we want to get the only field
-        is_alive, = struct.unpack(
-            "?", self._redis.get(__class__._KEEPALIVE_KEY)
-        )
+    def subscribe(self, pubsub):
+        super().subscribe(pubsub)
+        # Get the current value, in case the display is already running
+        self.update(self._redis.get(__class__._KEEPALIVE_KEY))
 
+    def update(self, payload):
+        """
+        Update our state from the given keepalive payload, which comes from
+        either a pub or the keepalive key. None means there is no value (i.e.
+        the key expired), which is treated as dead.
+        """
+        if not payload:
+            self._set_alive(False)
+            return
+
+        is_alive, seq = struct.unpack(__class__._PAYLOAD_FORMAT, payload)
+        with self._lock:
+            # If the sequence goes backwards, the display restarted
+            if self._seq is not None and seq <= self._seq:
+                logger.info(f"Keepalive sequence reset ({self._seq}->{seq})")
+            self._seq = seq
+            self._last_seen = time.monotonic()
+        self._set_alive(is_alive)
+
+    def check_timeout(self):
+        """
+        Check if we've gone too long without hearing from the display. If so,
+        it's considered dead. This should be called periodically.
+        """
+        with self._lock:
+            timed_out = (
+                self._last_seen is not None
+                and time.monotonic() - self._last_seen > __class__._TIMEOUT
+            )
+            if timed_out:
+                self._last_seen = None
+        if timed_out:
+            logger.info("Keepalive timed out")
+            self._set_alive(False)
+
+    def _set_alive(self, is_alive):
         # If the value changed, update our state, log it, then call listeners
-        if is_alive != self._alive:
+        with self._lock:
+            if is_alive == self._alive:
+                return
             self._alive = is_alive
             logger.info(f"Keepalive went {'up' if is_alive else 'down'}")
             for listener in self._listeners:
                 listener(self.status)
+
+    def _on_pub(self, msg):
+        self.update(msg["data"])
@@ -24,6 +24,14 @@ class Mode(metaclass=abc.ABCMeta):
     def name(self):
         return self._name
 
+    def get_next_update(self, settings):
+        """
+        Get the number of seconds until this mode's output will next change.
+        None means the output won't change until the settings do. By default,
+        modes are assumed to change constantly.
+        """
+        return 0
+
     @abc.abstractclassmethod
     def _get_modes(cls):
         pass
@@ -0,0 +1,47 @@
+class OutputTracker:
+    """
+    Tracks the last values that a resource emitted, so that frames that
+    wouldn't change anything can be suppressed instead of being written and
+    published again.
+    """
+
+    def __init__(self):
+        self._last_values = None
+        self._emitted = 0
+        self._suppressed = 0
+
+    @property
+    def emitted(self):
+        return self._emitted
+
+    @property
+    def suppressed(self):
+        return self._suppressed
+
+    def submit(self, values):
+        """
+        @brief      Submits a new frame of values, and checks if it differs from
+                    the last emitted frame. If it does, it becomes the new last
+                    frame.
+
+        @param      values  The tuple of derived values for this frame
+
+        @return     True if the values should be emitted, False if they should
+                    be suppressed
+        """
+        if values == self._last_values:
+            self._suppressed += 1
+            return False
+        self._last_values = values
+        self._emitted += 1
+        return True
+
+    def invalidate(self):
+        """
+        @brief      Forgets the last emitted frame, so the next one is always
+                    emitted.
+        """
+        self._last_values = None
+
+    def __str__(self):
+        return f"{self.emitted} emitted, {self.suppressed} suppressed"
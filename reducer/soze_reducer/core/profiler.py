@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from soze_reducer import logger
+
+
+class SamplingProfiler:
+    """
+    A sampling profiler that can be turned on at runtime, without restarting
+    the process. While running, it grabs the stack of every other thread at a
+    fixed interval. After the given duration, it writes the samples to a file
+    in collapsed-stack format (one line per unique stack, with frames
+    separated by semicolons and followed by a sample count) and turns itself
+    off. The output can be fed straight into flamegraph.pl or speedscope.
+
+    The reducer and the display are deployed as separate packages, so each
+    has its own copy of this file. Keep them identical, apart from the
+    logger import.
+    """
+
+    _DEFAULT_DURATION = 10.0
+    _INTERVAL = 0.005  # Seconds between samples
+
+    def __init__(self, output_dir, redis_key, name):
+        """
+        The profiler is started by setting redis_key, and its output files
+        are named after name.
+        """
+        self._output_dir = output_dir
+        self._redis_key = redis_key
+        self._name = name
+        self._thread = None
+
+    @property
+    def redis_key(self):
+        """
+        Setting this key to a number of seconds will start the profiler, next
+        time the runtime checks it.
+        """
+        return self._redis_key
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None):
+        """
+        @brief      Starts profiling in the background, if not already running.
+                    This is safe to call from a signal handler.
+
+        @param      duration  Number of seconds to profile for
+
+        @return     True if profiling was started, False if it was already
+                    running
+        """
+        if self.is_running:
+            logger.warning("Profiler is already running")
+            return False
+        self._thread = threading.Thread(
+            name="Profiler",
+            target=self._run,
+            args=(duration or __class__._DEFAULT_DURATION,),
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def check_redis(self, redis_value):
+        """
+        @brief      Starts profiling if the given value of the control key
+                    (which the caller should delete after reading) is set.
+
+        @param      redis_value  The raw value of the control key, or None
+        """
+        if redis_value is None:
+            return
+        try:
+            duration = float(redis_value)
+        except ValueError:
+            logger.error(f"Invalid profile duration: {redis_value!r}")
+            return
+        self.start(duration)
+
+    def _run(self, duration):
+        logger.info(f"Profiling for {duration} seconds")
+        own_ident = threading.get_ident()
+        samples = Counter()
+        end_time = time.monotonic() + duration
+        while time.monotonic() < end_time:
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    name = thread_names.get(ident, str(ident))
+                    samples[_collapse_stack(name, frame)] += 1
+            time.sleep(__class__._INTERVAL)
+
+        path = os.path.join(
+            self._output_dir,
+            f"{self._name}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed",
+        )
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Wrote {sum(samples.values())} samples to {path}")
+
+
+def _collapse_stack(thread_name, frame):
+    # Collapsed stacks go from the root down, so build it backwards
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        frames.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ";".join(reversed(frames))
@@ -1,34 +1,53 @@
 import redis
 import signal
 import time
+import traceback
+from threading import Event, Thread
 
 from soze_reducer import logger
 from soze_reducer.led.led import Led
 from soze_reducer.lcd.lcd import Lcd
+from .frame import Frame, get_sleep_time
 from .keepalive import Keepalive
+from .profiler import SamplingProfiler
+from .stats import ReducerStats
 
 
 class SozeReducer:
-    def __init__(self, redis_url):
+    def __init__(self, redis_url, profile_dir, led_zones=1, streams=False):
         self._redis = redis.from_url(redis_url)
         self._pubsub = self._redis.pubsub()
         self._pubsub_thread = None  # Will be populated during run
+        self._frame_thread = Thread(name="Frame", target=self._loop)
+        self._shutdown = Event()
+        # Set whenever a resource needs an update before the next scheduled
+        # one, e.g. after a settings change
+        self._wakeup = Event()
 
-        self._keepalive = Keepalive(
-            redis_client=self._redis, pubsub=self._pubsub
-        )
+        self._keepalive = Keepalive(redis_client=self._redis)
         self._resources = [
             Led(
                 redis_client=self._redis,
-                pubsub=self._pubsub,
                 keepalive=self._keepalive,
+                zones=led_zones,
+                streams=streams,
             ),
             Lcd(
                 redis_client=self._redis,
-                pubsub=self._pubsub,
                 keepalive=self._keepalive,
+                streams=streams,
             ),
         ]
+        for res in self._resources:
+            res.register_wake_listener(self._wakeup.set)
+        self._stats = ReducerStats(self._resources)
+        self._profiler = SamplingProfiler(
+            profile_dir, redis_key="reducer:profile", name="reducer"
+        )
+        # Subscribe everything to its channel. The resources will also load
+        # their initial settings here.
+        for sub in [self._keepalive, *self._resources]:
+            sub.subscribe(self._pubsub)
         self._should_run = True
 
         # Register exit handlers
@@ -37,25 +56,83 @@ class SozeReducer:
 
         signal.signal(signal.SIGINT, stop_handler)
         signal.signal(signal.SIGTERM, stop_handler)
+        # SIGUSR1 profiles the live process for a while
+        signal.signal(
+            signal.SIGUSR1, lambda sig, frame: self._profiler.start()
+        )
 
     def run(self):
         # Start the helper threads
         try:
-            # One thread to listen for Redis pubs, and one thread for each
-            # resource to periodically compute derived state
+            # One thread to listen for Redis pubs, and one thread to compute
+            # derived state for all resources, one frame at a time
             self._pubsub_thread = self._pubsub.run_in_thread()
-            for res in self._resources:
-                res.thread.start()
+            self._frame_thread.start()
             logger.info("Started threads")
 
-            # Thread.join blocks signals so we need this loop
+            # Thread.join blocks signals so we need this loop. We also use it
+            # to periodically check if the keepalive has gone stale, and to
+            # publish stats.
             while self._should_run:
                 time.sleep(1)
+                self._keepalive.check_timeout()
+                if self._stats.is_publish_due():
+                    self._publish_stats()
         finally:
             # Stop all threads
             self._stop()
 
+    def _publish_stats(self):
+        # Also check if profiling was requested, all in one round trip. This
+        # is just diagnostics, so a failure shouldn't stop the reducer.
+        try:
+            p = self._redis.pipeline()
+            p.set(self._stats.redis_key, self._stats.to_redis())
+            p.get(self._profiler.redis_key)
+            p.delete(self._profiler.redis_key)
+            _, profile_value, _ = p.execute()
+            self._profiler.check_redis(profile_value)
+        except Exception:
+            logger.exception("Failed to publish stats")
+
     def _stop(self):
         self._pubsub_thread.stop()  # This will unsub from all channels
-        for res in self._resources:
-            res.stop()
+        self._shutdown.set()
+        self._wakeup.set()
+        self._frame_thread.join()
+
+    def _commit(self, func):
+        # Queue up all the writes for this frame, then send them in one go
+        frame = Frame(self._redis)
+        func(frame)
+        if len(frame):
+            start_time = time.perf_counter()
+            try:
+                replies = frame.commit()
+            except redis.RedisError:
+                # The resources will redo their writes on a later frame
+                logger.exception("Failed to commit frame")
+                frame.handle_error()
+                return
+            self._stats.record_redis_call(time.perf_counter() - start_time)
+            frame.handle_replies(replies)
+
+    def _loop(self):
+        try:
+            logger.info("Starting frame thread")
+            self._commit(lambda frame: frame.init(self._resources))
+            while not self._shutdown.is_set():
+                # Clear before updating, so that a wakeup that arrives during
+                # the update triggers another one
+                self._wakeup.clear()
+                self._commit(lambda frame: frame.update(self._resources))
+
+                # Sleep until a resource is due or we get woken up
+                self._wakeup.wait(get_sleep_time(self._resources))
+            self._commit(lambda frame: frame.cleanup(self._resources))
+        except Exception:
+            logger.error(traceback.format_exc())
+        finally:
+            logger.info("Stopped frame thread")
+            for res in self._resources:
+                logger.info(f"{res.name}: {res.output}")
@@ -1,17 +1,28 @@
 import abc
 import msgpack
 import time
-import traceback
-from threading import Event, Thread
 
-from soze_reducer import logger
+from .output import OutputTracker
+from .stats import ResourceStats
+from .status import STATUSES
 
 
 class RedisSubscriber(metaclass=abc.ABCMeta):
-    def __init__(self, redis_client, pubsub, sub_channel):
+    def __init__(self, redis_client, sub_channel):
         self._redis = redis_client
-        self._pubsub = pubsub
-        self._pubsub.subscribe(**{sub_channel: self._on_pub})
+        self._sub_channel = sub_channel
+
+    @property
+    def sub_channel(self):
+        return self._sub_channel
+
+    def subscribe(self, pubsub):
+        """
+        Subscribe to our channel on the given (synchronous) pubsub. Only
+        needed for the threaded runtime, the async runtime handles its own
+        subscriptions.
+        """
+        pubsub.subscribe(**{self._sub_channel: self._on_pub})
 
     @abc.abstractmethod
     def _on_pub(self, msg):
@@ -21,6 +32,12 @@ class RedisSubscriber(metaclass=abc.ABCMeta):
 class ReducerResource(RedisSubscriber):
 
     _MODE_KEY = "mode"
+    # Reserved key in each settings blob, holding the version of that blob
+    _VERSION_KEY = "_version"
+    # Streams are trimmed to roughly this many entries
+    _STREAM_MAXLEN = 1000
+    # Seconds to wait before updating again after an error
+    _RETRY_INTERVAL = 1.0
 
     def __init__(
         self,
@@ -28,9 +45,11 @@ class ReducerResource(RedisSubscriber):
         name,
         settings_key,
         pub_channel,
+        stream_key,
         mode_class,
         pause=0.1,
         keepalive,
+        streams=False,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -38,55 +57,197 @@ class ReducerResource(RedisSubscriber):
         self._name = name
         self._settings_key = settings_key
         self._pub_channel = pub_channel
+        self._stream_key = stream_key
+        self._streams = streams
+        # Sequence number of the last stream entry we sent, so the display
+        # can tell if it missed any
+        self._stream_seq = 0
         self._mode_class = mode_class
         self._pause = pause
 
         # Other assorted properties
         self._keepalive = keepalive
-        self._thread = Thread(name=f"{self.name}-Thread", target=self._loop)
-        self._shutdown = Event()
+        # Monotonic time of the next scheduled update, or None if there isn't
+        # one. We start off due for an update.
+        self._next_update_time = 0.0
+        # Set whenever the values need to be recomputed before the next
+        # scheduled update, e.g. after a settings change
+        self._woken = False
+        # List of functions to call after a wakeup
+        self._wake_listeners = []
+        self._output = OutputTracker()
+        # The pause is our frame budget, so a longer update is an overrun
+        self._stats = ResourceStats(budget=pause)
         self._mode = None
         # Dict representing settings for one resource/status combo
         self._settings = None
-
-        # Register _load_settings to be called after a status change
-        self._keepalive.register_listener(self._load_settings)
-
-        # Load settings from Redis for the first time
-        self._load_settings(self._keepalive.status)
+        # Decoded settings for every status, as status:(version, settings)
+        self._settings_cache = {}
 
     @property
     def name(self):
         return self._name
 
     @property
-    def thread(self):
-        return self._thread
+    def output(self):
+        return self._output
 
     @property
-    def should_run(self):
-        return not self._shutdown.is_set()
+    def stats(self):
+        return self._stats
+
+    @property
+    def sleep_time(self):
+        """
+        The number of seconds until the current values will next change, or
+        None if they won't change until the settings or status do. A mode
+        that changes constantly is updated once per pause, to cap the update
+        rate. A mode that knows when it will next change (e.g. a strobe edge)
+        is updated right then, even if that's sooner than the pause.
+        """
+        next_update = self._get_next_update()
+        if next_update is None:
+            return None
+        return next_update if next_update > 0 else self._pause
+
+    def is_due(self, now):
+        """
+        Check if we're due for an update at the given monotonic time.
+        """
+        return self._woken or (
+            self._next_update_time is not None
+            and now >= self._next_update_time
+        )
 
-    def stop(self):
-        if self.should_run:
-            self._shutdown.set()
+    def get_time_until_due(self, now):
+        """
+        Get the number of seconds from the given monotonic time until we're
+        due for an update, or None if no update is scheduled.
+        """
+        if self._woken:
+            return 0.0
+        if self._next_update_time is None:
+            return None
+        return max(self._next_update_time - now, 0.0)
+
+    def register_wake_listener(self, listener):
+        self._wake_listeners.append(listener)
 
-    def _get_user_redis_key(self, status):
+    def wake(self):
+        """
+        Mark us as due for an update, so that values are recomputed
+        immediately instead of at the next scheduled update. Wake listeners
+        are called so the runtime can react.
+        """
+        self._woken = True
+        for listener in self._wake_listeners:
+            listener()
+
+    @property
+    def state_key(self):
+        """
+        The Redis key where we persist our output state across restarts, or
+        None if we don't.
+        """
+        return None
+
+    def restore_state(self, redis_value):
+        """
+        Restore our output state from the raw value of our state key (None if
+        the key doesn't exist). This is called once, before init.
+        """
+        pass
+
+    def get_handlers(self):
+        """
+        Get handlers for any channels we listen on besides our settings
+        channel, as channel:func. The funcs take the pub message. They can't
+        do any Redis I/O, so they work in either runtime.
+        """
+        return {}
+
+    def subscribe(self, pubsub):
+        super().subscribe(pubsub)
+        handlers = self.get_handlers()
+        if handlers:
+            pubsub.subscribe(**handlers)
+        if self.state_key:
+            self.restore_state(self._redis.get(self.state_key))
+
+        # Register apply_status to be called after a status change
+        self._keepalive.register_listener(self.apply_status)
+
+        # Load settings from Redis for the first time. We grab every status
+        # up front, so that a status change doesn't need a Redis read.
+        for status in STATUSES:
+            self._load_settings(status)
+
+    def get_user_redis_key(self, status):
         return f"user:{self._settings_key}:{status}"
 
+    def get_stale_statuses(self, msg):
+        """
+        Get the statuses whose cached settings are out of date, according to
+        the given settings pub. The pub should carry the status and version
+        of the settings that changed. If it doesn't, all statuses are assumed
+        to be stale.
+        """
+        try:
+            pub = msgpack.loads(msg["data"])
+            status, version = pub["status"], pub["version"]
+        except (ValueError, TypeError, KeyError):
+            return list(STATUSES)
+
+        try:
+            cached_version, _ = self._settings_cache[status]
+        except KeyError:
+            return [status]
+        # Versions only go up, so anything other than what we have is newer.
+        # That includes a lower version, which means the API's counter was
+        # reset (e.g. Redis was flushed), and we'd otherwise ignore every
+        # write until it caught back up.
+        return [status] if version != cached_version else []
+
     def _on_pub(self, msg):
-        self._load_settings(self._keepalive.status)
+        for status in self.get_stale_statuses(msg):
+            self._load_settings(status)
 
     def _load_settings(self, status):
         """
-        Load settings for the current status from Redis. This should be called
-        after any change to the settings for any status of this resource, or
-        after a change to the status.
+        Load settings for the given status from Redis. This should be called
+        after any change to the settings for that status of this resource.
+        """
+        self.set_settings(
+            status, self._redis.get(self.get_user_redis_key(status))
+        )
+
+    def set_settings(self, status, redis_value):
+        """
+        Cache the settings for the given status from the given raw Redis
+        value, which is a msgpacked dict (or None if the key doesn't exist).
+        If that's the current status, the settings are also applied.
+
+        Returns True if the settings were applied, False if not.
         """
+        settings = msgpack.loads(redis_value) if redis_value else {}
+        version = settings.pop(__class__._VERSION_KEY, 0)
+        self._settings_cache[status] = (version, settings)
 
-        # Pull our value from the user state and unpack it
-        redis_value = self._redis.get(self._get_user_redis_key(status))
-        self._settings = msgpack.loads(redis_value) if redis_value else {}
+        if status != self._keepalive.status:
+            return False
+        self._apply_settings(settings)
+        return True
+
+    def apply_status(self, status):
+        """
+        Switch to the cached settings for the given status. This should be
+        called after any change to the status.
+        """
+        _, settings = self._settings_cache[status]
+        self._apply_settings(settings)
+
+    def _apply_settings(self, settings):
+        self._settings = settings
 
         try:
             new_mode = self._settings[__class__._MODE_KEY]
@@ -98,35 +259,101 @@ class ReducerResource(RedisSubscriber):
                 # Make a new mode object
                 self._mode = self._mode_class.get_by_name(new_mode)()
 
-    def publish(self, msg=b""):
-        self._redis.publish(self._pub_channel, msg)
+        # The new settings could change our values, so recompute them now
+        self.wake()
+
+    def publish(self, pipe, msg=b""):
+        """
+        Send the given message to the display. Normally that's a pub on our
+        channel. If we're using streams, it's an entry on our stream instead,
+        which the display reads at its own pace, so nothing is lost while
+        it's disconnected. Entries are numbered, so the display can tell if
+        it missed any (e.g. because they were trimmed).
+        """
+        if self._streams:
+            self._stream_seq += 1
+            pipe.xadd(
+                self._stream_key,
+                {"seq": self._stream_seq, "data": msg},
+                maxlen=__class__._STREAM_MAXLEN,
+                approximate=True,
+            )
+        else:
+            pipe.publish(self._pub_channel, msg)
+
+    def init(self, pipe):
+        """
+        Queue up any writes needed before the first update onto the given
+        pipeline.
+        """
+        self._after_init(pipe)
+
+    def cleanup(self, pipe):
+        """
+        Queue up any writes needed after the last update onto the given
+        pipeline.
+        """
+        self._before_stop(pipe)
+
+    def update(self, pipe):
+        """
+        Recompute our values, and queue up the writes to apply them onto the
+        given pipeline. The caller is responsible for executing the pipeline.
+        """
+        start_time = time.perf_counter()
+        # Clear this first, so that a wakeup that arrives during the update
+        # triggers another one
+        self._woken = False
 
-    def _update(self):
         # Calculate real values if settings are available,
         # otherwise use defaults
         values = (
             self._get_values() if self._settings else self._get_default_values()
         )
-        # Apply the values. If something was updated, do a publish.
-        self._apply_values(*values)
+        # Apply the values, but only if they changed since the last frame.
+        # Otherwise we'd be writing and publishing the same thing again.
+        if self._output.submit(values):
+            self._apply_values(pipe, *values)
 
-    def _loop(self):
-        try:
-            logger.info(f"Starting {self.name} thread")
-            self._after_init()
-            while self.should_run:
-                self._update()
-                time.sleep(self._pause)
-            self._before_stop()
-        except Exception:
-            logger.error(traceback.format_exc())
-        finally:
-            logger.info(f"Stopped {self.name} thread")
-
-    def _after_init(self):
+        # Schedule the next update for whenever the values will change
+        sleep_time = self.sleep_time
+        self._next_update_time = (
+            time.monotonic() + sleep_time if sleep_time is not None else None
+        )
+        self._stats.record_tick(time.perf_counter() - start_time)
+
+    def handle_replies(self, replies):
+        """
+        Called with the replies from Redis, after a frame that we queued
+        commands in has been committed. The replies are in the same order
+        as all the commands in the frame's pipeline.
+        """
+        pass
+
+    def handle_error(self):
+        """
+        Called when our update failed, or when a frame that we queued
+        commands in couldn't be committed. What we think Redis has could be
+        wrong now, so forget our last output, and try again in a bit. Not
+        right away, in case the problem sticks around.
+        """
+        self._output.invalidate()
+        self._next_update_time = time.monotonic() + __class__._RETRY_INTERVAL
+        self._stats.count("errors")
+
+    def _get_next_update(self):
+        """
+        Get the number of seconds until the current values will next change,
+        or None if they won't change until the settings or status do.
+        """
+        if self._settings:
+            return self._mode.get_next_update(self._settings)
+        return None  # Default values never change
+
+    def _after_init(self, pipe):
         pass
 
-    def _before_stop(self):
+    def _before_stop(self, pipe):
         pass
 
     @abc.abstractmethod
@@ -145,8 +372,8 @@ class ReducerResource(RedisSubscriber):
         pass
 
     @abc.abstractmethod
-    def _apply_values(self, *values):
-        """Apply the current values to Redis. If this returns True, then a pub
-        will occur after this.
+    def _apply_values(self, pipe, *values):
+        """Apply the current values to Redis, by queueing writes (and a
+        publish) onto the given pipeline.
         """
         pass
@@ -0,0 +1,144 @@
+import bisect
+import msgpack
+import time
+
+# Upper bounds (in seconds) of the histogram buckets. Anything above the last
+# bound goes into an overflow bucket.
+BUCKET_BOUNDS = (
+    0.0005,
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+)
+
+
+class Histogram:
+    """
+    A histogram of durations, with fixed buckets. Recording a value is just a
+    bisect and a few additions, so it's cheap enough to do on every tick.
+    """
+
+    def __init__(self):
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    @property
+    def count(self):
+        return self._count
+
+    def record(self, value):
+        self._counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self._count += 1
+        self._sum += value
+        if value > self._max:
+            self._max = value
+
+    def to_dict(self):
+        return {
+            "counts": list(self._counts),
+            "count": self._count,
+            "sum": self._sum,
+            "max": self._max,
+        }
+
+
+class ResourceStats:
+    """
+    Instrumentation for a single resource's updates.
+    """
+
+    def __init__(self, budget):
+        # If an update takes longer than this, it's an overrun
+        self._budget = budget
+        self._ticks = Histogram()
+        self._overruns = 0
+        # Resource-specific totals, by name
+        self._counters = {}
+
+    @property
+    def ticks(self):
+        return self._ticks
+
+    @property
+    def overruns(self):
+        return self._overruns
+
+    def record_tick(self, duration):
+        self._ticks.record(duration)
+        if duration > self._budget:
+            self._overruns += 1
+
+    @property
+    def counters(self):
+        return self._counters
+
+    def count(self, name, amount=1):
+        """
+        Add to one of the resource-specific counters.
+        """
+        self._counters[name] = self._counters.get(name, 0) + amount
+
+    def to_dict(self):
+        return {
+            "ticks": self._ticks.to_dict(),
+            "overruns": self._overruns,
+            "counters": dict(self._counters),
+        }
+
+
+class ReducerStats:
+    """
+    Instrumentation for the whole reducer. The runtime records Redis latency
+    here, and periodically publishes a snapshot of everything to Redis, where
+    the API can read it.
+    """
+
+    _REDIS_KEY = "reducer:stats"
+    # Seconds between snapshots
+    _PUBLISH_INTERVAL = 10.0
+
+    def __init__(self, resources):
+        self._resources = resources
+        self._redis_latency = Histogram()
+        self._last_publish_time = time.monotonic()
+
+    @property
+    def redis_key(self):
+        return __class__._REDIS_KEY
+
+    def record_redis_call(self, duration):
+        self._redis_latency.record(duration)
+
+    def is_publish_due(self):
+        now = time.monotonic()
+        if now - self._last_publish_time < __class__._PUBLISH_INTERVAL:
+            return False
+        self._last_publish_time = now
+        return True
+
+    def snapshot(self):
+        resources = {}
+        for res in self._resources:
+            resources[res.name] = {
+                **res.stats.to_dict(),
+                "emitted": res.output.emitted,
+                "suppressed": res.output.suppressed,
+            }
+        return {
+            "time": time.time(),
+            "bounds": list(BUCKET_BOUNDS),
+            "redis": self._redis_latency.to_dict(),
+            "resources": resources,
+        }
+
+    def to_redis(self):
+        return msgpack.dumps(self.snapshot())
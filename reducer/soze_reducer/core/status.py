@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class Status(Enum):
+    NORMAL = "normal"
+    SLEEP = "sleep"
+
+
+STATUSES = tuple(status.value for status in Status)
@@ -0,0 +1,181 @@
+from .helper import CMD_CLEAR, CMD_CURSOR_POS, SIG_COMMAND
+
+# Bytes needed to move the cursor, or to clear the screen
+_CURSOR_POS_COST = 4
+_CLEAR_COST = 2
+_BLANK = ord(" ")
+
+
+class FrameBuffer:
+    """
+    @brief      A copy of what's on the LCD, as one byte per cell, plus where
+                the LCD's cursor is (if we know). Text updates are encoded as
+                the shortest command sequence we can find that turns the
+                current screen into the new one, because every byte costs
+                about 1ms on the serial line.
+    """
+
+    def __init__(self, width, height):
+        self._width = width
+        self._height = height
+        self._cells = bytearray([_BLANK]) * (width * height)
+        # 0-based (x, y) of the cursor, or None if we don't know
+        self._cursor = None
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def cells(self):
+        return bytes(self._cells)
+
+    def clear(self):
+        """
+        @brief      Record that the screen was cleared.
+        """
+        self._cells[:] = bytes([_BLANK]) * len(self._cells)
+        self._cursor = None
+
+    def restore(self, cells):
+        """
+        @brief      Record that the screen has the given cells (e.g. from a
+                    snapshot), with the cursor somewhere unknown.
+
+        @param      cells  The cells, as bytes
+        """
+        if len(cells) != len(self._cells):
+            raise ValueError(
+                f"Expected {len(self._cells)} cells, got {len(cells)}"
+            )
+        self._cells[:] = cells
+        self._cursor = None
+
+    def move_cursor(self, x=None, y=None):
+        """
+        @brief      Record that the cursor was moved. If no position is given,
+                    the cursor is assumed to be somewhere unknown.
+
+        @param      x     The 0-based x position of the cursor
+        @param      y     The 0-based y position of the cursor
+        """
+        self._cursor = (x, y) if x is not None else None
+
+    def render(self, text):
+        """
+        @brief      Lay out the given text as cells for the screen. Lines are
+                    padded or cut to the screen width, and missing lines are
+                    blank.
+
+        @param      text  The text, with lines separated by newlines
+
+        @return     The cells, as bytes
+        """
+        cells = bytearray()
+        lines = text.splitlines()[: self._height]
+        for line in lines:
+            # Latin-1 maps each char to the byte with the same value, which is
+            # what the LCD wants (including the custom chars in [0, 7])
+            cells += line[: self._width].ljust(self._width).encode("latin-1")
+        cells += bytes([_BLANK]) * (self._width * (self._height - len(lines)))
+        return bytes(cells)
+
+    def update(self, cells):
+        """
+        @brief      Encode the commands that turn the screen into the given
+                    cells, and record the new cells as what's on the screen.
+                    This picks whichever is shorter between a diff against
+                    the current screen and a clear followed by a diff against
+                    a blank screen.
+
+        @param      cells  The new cells (see render)
+
+        @return     A tuple of (command bytes, bytes saved), where bytes saved
+                    is compared to repositioning the cursor for every run of
+                    changed cells
+        """
+        data, cursor = self._encode(self._cells, cells, self._cursor)
+        # A redraw has to write at least every non-blank cell, so only bother
+        # encoding one if it could possibly be shorter
+        if _CLEAR_COST + len(cells) - cells.count(_BLANK) < len(data):
+            blank = bytes([_BLANK]) * len(cells)
+            redraw, redraw_cursor = self._encode(blank, cells, None)
+            if _CLEAR_COST + len(redraw) < len(data):
+                data = bytes([SIG_COMMAND, CMD_CLEAR]) + redraw
+                cursor = redraw_cursor
+        self._cursor = cursor
+
+        saved = self._get_naive_cost(self._cells, cells) - len(data)
+        self._cells[:] = cells
+        return data, saved
+
+    def _get_spans(self, old_row, new_row):
+        """
+        @brief      Get the spans of cells that need to be written to turn the
+                    old row into the new one, as (start, end) pairs. Runs of
+                    changed cells that are close enough together are merged,
+                    since rewriting a few unchanged cells is cheaper than
+                    moving the cursor over them.
+        """
+        spans = []
+        start = None
+        end = None
+        for x in range(self._width):
+            if old_row[x] == new_row[x]:
+                continue
+            if start is not None and x - end >= _CURSOR_POS_COST:
+                spans.append((start, end))
+                start = None
+            if start is None:
+                start = x
+            end = x + 1
+        if start is not None:
+            spans.append((start, end))
+        return spans
+
+    def _encode(self, old, new, cursor):
+        """
+        @brief      Encode the commands to turn the old cells into the new
+                    ones, starting with the cursor at the given position.
+
+        @return     A tuple of (command bytes, where the cursor ends up)
+        """
+        data = bytearray()
+        width = self._width
+        for y in range(self._height):
+            row_start = y * width
+            old_row = old[row_start : row_start + width]
+            new_row = new[row_start : row_start + width]
+            if old_row == new_row:
+                continue
+            for start, end in self._get_spans(old_row, new_row):
+                if cursor != (start, y):
+                    # The LCD's coords are 1-based
+                    data += bytes(
+                        [SIG_COMMAND, CMD_CURSOR_POS, start + 1, y + 1]
+                    )
+                data += new_row[start:end]
+                # Don't count on the cursor wrapping at the end of the row
+                cursor = (end, y) if end < width else None
+        return bytes(data), cursor
+
+    def _get_naive_cost(self, old, new):
+        """
+        @brief      Get the number of bytes it would take to update the screen
+                    by moving the cursor to every run of changed cells.
+        """
+        cost = 0
+        in_run = False
+        for x, (c1, c2) in enumerate(zip(old, new)):
+            if c1 == c2 or x % self._width == 0:
+                in_run = False
+            if c1 != c2:
+                if not in_run:
+                    cost += _CURSOR_POS_COST
+                    in_run = True
+                cost += 1
+        return cost
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+
+# The LCD has 8 slots of character RAM, which show up as char codes [0, 7]
+NUM_SLOTS = 8
+# Glyphs are 5x8, represented as 8 5-bit rows
+_GLYPH_HEIGHT = 8
+_GLYPH_WIDTH = 5
+# Each glyph gets a char in Unicode's private use area, so modes can put it
+# in their text like any other char
+_GLYPH_CHAR_BASE = 0xE000
+
+# Glyph char => (rows, fallback char)
+_GLYPHS = {}
+# Rows => glyph char, so each bitmap is only defined once
+_GLYPH_CHARS = {}
+
+
+def define_glyph(rows, fallback=" "):
+    """
+    @brief      Defines a custom glyph, which can be used in LCD text. The
+                glyph is only loaded onto the LCD while it's being shown.
+                Defining the same bitmap twice gives the same char.
+
+    @param      rows      The glyph bitmap, as 8 5-bit rows
+    @param      fallback  The char to show instead if there's no room for the
+                          glyph on the LCD
+
+    @return     The char that stands for the glyph
+    """
+    rows = tuple(rows)
+    if len(rows) != _GLYPH_HEIGHT:
+        raise ValueError(
+            f"Glyph must have {_GLYPH_HEIGHT} rows, but had {len(rows)}"
+        )
+    if any(row < 0 or row >> _GLYPH_WIDTH for row in rows):
+        raise ValueError(
+            f"Glyph rows must be {_GLYPH_WIDTH}-bit ints, but were {rows}"
+        )
+
+    try:
+        return _GLYPH_CHARS[rows]
+    except KeyError:
+        char = chr(_GLYPH_CHAR_BASE + len(_GLYPHS))
+        _GLYPHS[char] = (rows, fallback)
+        _GLYPH_CHARS[rows] = char
+        return char
+
+
+class GlyphAllocator:
+    """
+    @brief      Maps glyphs onto the LCD's character RAM slots. Glyphs stay in
+                their slots for as long as possible, and when a slot is
+                needed, the least recently shown glyph is evicted. A glyph
+                is only uploaded when it's not already in a slot, so a
+                steady screen costs no uploads at all.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        @brief      Forgets what's in every slot, e.g. because the LCD may have
+                    been power cycled.
+        """
+        # Slot => glyph char, or None if the slot's contents are unknown
+        self._slots = [None] * NUM_SLOTS
+        # Glyph char => slot, from least to most recently shown
+        self._lru = OrderedDict()
+        # Glyph ordinal => the char code (or fallback) it's shown as, for
+        # str.translate
+        self._table = {}
+
+    def get_slots(self):
+        """
+        @brief      Gets the glyph in each slot.
+
+        @return     A list with the rows for each slot, or None if the slot's
+                    contents are unknown
+        """
+        return [
+            None if char is None else _GLYPHS[char][0] for char in self._slots
+        ]
+
+    def restore(self, slots):
+        """
+        @brief      Sets what's in every slot, e.g. from a snapshot.
+
+        @param      slots  A list with the rows for each slot, or None if the
+                           slot's contents are unknown
+        """
+        self.reset()
+        for slot, rows in enumerate(slots):
+            if rows is None:
+                continue
+            char = define_glyph(rows)
+            # A glyph should only be in one slot, treat any copies as unknown
+            if char not in self._lru:
+                self._slots[slot] = char
+                self._lru[char] = slot
+                self._table[ord(char)] = chr(slot)
+
+    def get_loaded(self):
+        """
+        @brief      Gets every glyph that we've loaded onto the LCD.
+
+        @return     A list of (slot, rows)
+        """
+        return [
+            (slot, _GLYPHS[char][0])
+            for slot, char in enumerate(self._slots)
+            if char is not None
+        ]
+
+    def allocate(self, text):
+        """
+        @brief      Finds slots for all the glyphs in the given text.
+
+        @param      text  The text, which may contain glyph chars
+
+        @return     A tuple of (text, uploads), where the text has its glyph
+                    chars replaced with their char codes, and uploads is a
+                    list of (slot, rows) that need to be loaded onto the LCD
+                    before the text is shown
+        """
+        # Sorted so the slots are assigned in a consistent order
+        glyphs = sorted(char for char in set(text) if char in _GLYPHS)
+        if not glyphs:
+            return text, []
+
+        uploads = []
+        missing = []
+        for char in glyphs:
+            if char in self._lru:
+                self._lru.move_to_end(char)
+            else:
+                missing.append(char)
+
+        for char in missing:
+            slot = self._take_slot(glyphs)
+            if slot is None:
+                # Every slot is in use for this text
+                self._table[ord(char)] = _GLYPHS[char][1]
+                continue
+            rows = _GLYPHS[char][0]
+            self._slots[slot] = char
+            self._lru[char] = slot
+            self._table[ord(char)] = chr(slot)
+            uploads.append((slot, rows))
+
+        return text.translate(self._table), uploads
+
+    def _take_slot(self, glyphs):
+        """
+        @brief      Gets a slot to load a new glyph into. Empty slots are used
+                    first, then the least recently shown glyph that isn't in
+                    the given glyphs is evicted.
+
+        @return     The slot, or None if none are available
+        """
+        try:
+            return self._slots.index(None)
+        except ValueError:
+            pass
+        for char, slot in self._lru.items():
+            if char not in glyphs:
+                del self._lru[char]
+                del self._table[ord(char)]
+                return slot
+        return None
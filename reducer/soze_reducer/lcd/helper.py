@@ -1,11 +1,10 @@
-import itertools
-from collections import defaultdict
 from enum import Enum
 
-# Custom chars (e.g. the small blocks used to make big chars) are defined here
-# Each character box is 5x8, represented as 8 5-bit lines
-CUSTOM_CHARS = {
-    0x00: [
+from .glyphs import define_glyph
+
+# Custom glyphs for the small blocks used to make big chars
+HBR = define_glyph(  # Half-bottom right
+    [
         0b00000,
         0b00000,
         0b00000,
@@ -14,8 +13,10 @@ CUSTOM_CHARS = {
         0b01111,
         0b01111,
         0b11111,
-    ],
-    0x01: [
+    ]
+)
+HBL = define_glyph(  # Half-bottom left
+    [
         0b00000,
         0b00000,
         0b00000,
@@ -24,8 +25,10 @@ CUSTOM_CHARS = {
         0b11110,
         0b11110,
         0b11111,
-    ],
-    0x02: [
+    ]
+)
+BOT = define_glyph(  # Half-bottom
+    [
         0b00000,
         0b00000,
         0b00000,
@@ -34,8 +37,10 @@ CUSTOM_CHARS = {
         0b11111,
         0b11111,
         0b11111,
-    ],
-    0x03: [
+    ]
+)
+FBR = define_glyph(  # Full-bottom right
+    [
         0b11111,
         0b11111,
         0b11111,
@@ -44,8 +49,10 @@ CUSTOM_CHARS = {
         0b01111,
         0b01111,
         0b00011,
-    ],
-    0x04: [
+    ]
+)
+FBL = define_glyph(  # Full-bottom left
+    [
         0b11111,
         0b11111,
         0b11111,
@@ -54,15 +61,8 @@ CUSTOM_CHARS = {
         0b11110,
         0b11110,
         0b11000,
-    ],
-}
-
-# Aliases for the small characters used to make big characters
-HBR = "\x00"  # Half-bottom right
-HBL = "\x01"  # Half-bottom left
-BOT = "\x02"  # Half-bottom
-FBR = "\x03"  # Full-bottom right
-FBL = "\x04"  # Full-bottom left
+    ]
+)
 FUL = "\xff"  # Full rectangle
 EMT = " "  # Empty (space)
 
@@ -125,37 +125,3 @@ def make_big_text(text):
     big_chars = (BIG_CHARS[c] for c in text)
     line_tuples = zip(*big_chars)
     return (" ".join(t) for t in line_tuples)  # Put a space between characters
-
-
-def diff_text(lines1, lines2):
-    """
-    @brief      Diffs the given lists of strings, producing a dict of (x,y):str
-                tuples of the text from lines2 where they differed. Adjacent
-                differing characters are included together in the same string.
-                If one list is longer then the other, the shorter list is padded
-                with empty strings. If one line is longer than its counterpart,
-                the shorter string is padded with spaces. See unit tests for
-                examples.
-
-    @param      lines1  The first list of strings
-    @param      lines2  The second list of strings (this one takes priority)
-
-    @return     A dict of (x,y):str tuples representing the changes
-    """
-    diff = defaultdict(
-        lambda: []
-    )  # List of chars is more efficient for building up
-    for y, (line1, line2) in enumerate(
-        itertools.zip_longest(lines1, lines2, fillvalue="")
-    ):
-        pos = None
-        for x, (c1, c2) in enumerate(
-            itertools.zip_longest(line1, line2, fillvalue=" ")
-        ):
-            if c1 != c2:
-                if pos is None:
-                    pos = (x, y)
-                diff[pos].append(c2)
-            else:
-                pos = None
-    return {k: "".join(v) for k, v in diff.items()}
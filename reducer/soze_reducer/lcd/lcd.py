@@ -1,5 +1,8 @@
 import itertools
+from collections import deque
+from contextlib import contextmanager
 
+from soze_reducer import logger
 from soze_reducer.core.color import BLACK
 from soze_reducer.core.resource import ReducerResource
 from .helper import (
@@ -13,6 +16,7 @@ from .helper import (
     CMD_CLEAR,
     CMD_COLOR,
     CMD_CONTRAST,
+    CMD_CREATE_CHAR,
     CMD_CURSOR_BACK,
     CMD_CURSOR_FWD,
     CMD_CURSOR_HOME,
@@ -23,11 +27,12 @@ from .helper import (
     CMD_SPLASH_TEXT,
     CMD_UNDERLINE_CURSOR_OFF,
     CMD_UNDERLINE_CURSOR_ON,
-    CUSTOM_CHARS,
     SIG_COMMAND,
     CursorMode,
-    diff_text,
 )
+from .framebuffer import FrameBuffer
+from .glyphs import GlyphAllocator
+from .snapshot import Snapshot, pack_snapshot, unpack_snapshot
 from .mode import LcdMode
 
 
@@ -36,6 +41,15 @@ class Lcd(ReducerResource):
     _DEFAULT_WIDTH = 20
     _DEFAULT_HEIGHT = 4
     _COMMAND_QUEUE_KEY = "reducer:lcd_commands"
+    # Everything that's on the LCD, as of the last command we queued
+    _SNAPSHOT_KEY = "reducer:lcd_snapshot"
+    # The display publishes here when it wants a keyframe, e.g. on startup
+    _RESYNC_CHANNEL = "d2r:lcd_resync"
+    # Caps on the command queue. If the display falls this far behind (e.g.
+    # it's not running), the backlog is replaced with a keyframe. 1KB is
+    # about a second of the LCD's serial link.
+    _MAX_QUEUE_LENGTH = 32
+    _MAX_QUEUE_BYTES = 1024
 
     def __init__(self, *args, **kwargs):
         super().__init__(
@@ -44,6 +58,7 @@ class Lcd(ReducerResource):
             settings_key="lcd",
             sub_channel="a2r:lcd",
             pub_channel="r2d:lcd",
+            stream_key="reducer:lcd_stream",
             mode_class=LcdMode,
             **kwargs,
         )
@@ -51,13 +66,146 @@ class Lcd(ReducerResource):
         self._width = __class__._DEFAULT_WIDTH
         self._height = __class__._DEFAULT_HEIGHT
         self._color = None
-        self._lines = None
+        self._backlight = False
+        # What's currently on the screen
+        self._framebuffer = FrameBuffer(self._width, self._height)
+        # What's in the LCD's custom char slots
+        self._glyphs = GlyphAllocator()
         # Used to queue up bytes and send them to Redis in bulk
         self._command_queue = None
+        # Sizes of the entries we've pushed onto the Redis queue, newest last
+        self._queue_sizes = deque(maxlen=__class__._MAX_QUEUE_LENGTH)
+        # Index of our last push's reply in the frame's replies, if we pushed
+        self._push_reply_index = None
+        # Set when the display needs a keyframe
+        self._resync = False
+        # Set if we picked up where the last run left off, from the snapshot
+        self._restored = False
 
-    def _after_init(self):
+    @property
+    def state_key(self):
+        return __class__._SNAPSHOT_KEY
+
+    def restore_state(self, redis_value):
+        if not redis_value:
+            return
+        try:
+            snapshot = unpack_snapshot(redis_value)
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid LCD snapshot: {e}")
+            return
+        if (snapshot.width, snapshot.height) != (self.width, self.height):
+            return  # The LCD was reconfigured, start from scratch
+
+        self._color = snapshot.color
+        self._backlight = snapshot.backlight
+        self._glyphs.restore(snapshot.glyphs)
+        self._framebuffer.restore(snapshot.cells)
+        self._restored = True
+
+    def _get_snapshot(self):
+        return Snapshot(
+            width=self.width,
+            height=self.height,
+            backlight=self._backlight,
+            color=self._color or BLACK,
+            glyphs=self._glyphs.get_slots(),
+            cells=self._framebuffer.cells,
+        )
+
+    def get_handlers(self):
+        return {__class__._RESYNC_CHANNEL: self._on_resync_pub}
+
+    def _on_resync_pub(self, msg):
+        self.request_resync()
+
+    def request_resync(self):
+        """
+        @brief      Replace whatever is in the command queue with a keyframe at
+                    the next update.
+        """
+        self._resync = True
+        self.wake()
+
+    def update(self, pipe):
+        if self._resync:
+            self._resync = False
+            self._queue_keyframe(pipe)
+        super().update(pipe)
+
+    def handle_replies(self, replies):
+        if self._push_reply_index is None:
+            return
+        # RPUSH replies with the length of the queue, which is made up of
+        # our last n pushes
+        length = replies[self._push_reply_index]
+        self._push_reply_index = None
+        if (
+            length > __class__._MAX_QUEUE_LENGTH
+            or sum(itertools.islice(reversed(self._queue_sizes), length))
+            > __class__._MAX_QUEUE_BYTES
+        ):
+            self.stats.count("queue_overflows")
+            self.request_resync()
+
+    def handle_error(self):
+        super().handle_error()
+        # Our commands may have been dropped partway, so the screen could be
+        # out of sync with the framebuffer. Redraw it at the next update,
+        # which is already scheduled.
+        self._push_reply_index = None
+        self._resync = True
+
+    def _queue_keyframe(self, pipe):
+        """
+        @brief      Drop the command queue, and replace it with the commands
+                    to draw the whole screen from scratch.
+        """
+        pipe.delete(__class__._COMMAND_QUEUE_KEY)
+        self._queue_sizes.clear()
+        cells = self._framebuffer.cells
+        color = self._color or BLACK
+        with self._transaction(pipe):
+            self.set_size(self.width, self.height, True)
+            self.clear()
+            self.set_autoscroll(False)
+            self._color = None  # Force the color to be sent
+            self.set_color(color)
+            if self._backlight:
+                self.on()
+            else:
+                self.off()
+            # Whatever glyphs we think are loaded could have been dropped
+            for code, char_bytes in self._glyphs.get_loaded():
+                self.set_char(code, char_bytes)
+            data, _ = self._framebuffer.update(cells)
+            if data:
+                self._queue_bytes(data)
+        self.stats.count("keyframes")
+
+    def _after_init(self, pipe):
+        if self._restored:
+            # We carry on from the snapshot, without touching the screen.
+            # The snapshot covers whatever the last run left in the queue: a
+            # running display drains the queue on every pub, and a starting
+            # one draws the snapshot and drops the queue. We don't know the
+            # sizes of those entries though, so they wouldn't count towards
+            # the queue's caps. Drop them instead.
+            self._restored = False
+            pipe.delete(__class__._COMMAND_QUEUE_KEY)
+            self._queue_sizes.clear()
+            # The backlight is probably off if we stopped cleanly
+            with self._transaction(pipe):
+                if not self._backlight:
+                    self.on()
+            return
+
+        # Anything left in the queue is from before a restart, and we're
+        # about to redraw everything anyway
+        pipe.delete(__class__._COMMAND_QUEUE_KEY)
+        self._queue_sizes.clear()
         # Initiate a transaction. Only one Redis push will occur, at the end.
-        with self:
+        with self._transaction(pipe):
             self.set_size(self.width, self.height, True)
             self.set_color(BLACK)
 
@@ -65,16 +213,15 @@ class Lcd(ReducerResource):
             self.set_autoscroll(False)  # Fugg that
             self.on()
 
-            # Register custom characters
-            for index, char in CUSTOM_CHARS.items():
-                self.create_char(0, index, char)
-            self.load_char_bank(0)
+            # Custom chars are loaded as they're needed, and the LCD could
+            # have anything in its slots right now
+            self._glyphs.reset()
 
-    def _before_stop(self):
+    def _before_stop(self, pipe):
         """
         @brief      Turns the LCD off and clears it.
         """
-        with self:
+        with self._transaction(pipe):
             self.off()
             self.clear()
 
@@ -87,9 +234,9 @@ class Lcd(ReducerResource):
             self._mode.get_text(self._settings),
         )
 
-    def _apply_values(self, color, text):
+    def _apply_values(self, pipe, color, text):
         # Initiate a transaction. Only one Redis push will occur, at the end.
-        with self:
+        with self._transaction(pipe):
             self.set_color(color)
             self.set_text(text)
 
@@ -123,6 +270,7 @@ class Lcd(ReducerResource):
         @brief      Clears all text on the screen.
         """
         self._send_command(CMD_CLEAR)
+        self._framebuffer.clear()
 
     def on(self):
         """
@@ -132,6 +280,7 @@ class Lcd(ReducerResource):
         # The ON command takes an arg for how long to stay on,
         # but it's actually ignored.
         self._send_command(CMD_BACKLIGHT_ON, 0)
+        self._backlight = True
 
     def off(self):
         """
@@ -139,6 +288,7 @@ class Lcd(ReducerResource):
                     and color are saved.
         """
         self._send_command(CMD_BACKLIGHT_OFF)
+        self._backlight = False
 
     def set_size(self, width, height, force_update=False):
         """
@@ -151,7 +301,7 @@ class Lcd(ReducerResource):
         if force_update or self.width != width or self.height != height:
             self._width, self._height = width, height
             self._send_command(CMD_SIZE, width, height)
-            self._lines = [""] * height  # Resize the text buffer
+            self._framebuffer = FrameBuffer(width, height)
 
     def set_splash_text(self, splash_text):
         """
@@ -224,6 +374,7 @@ class Lcd(ReducerResource):
         @brief      Moves the cursor to the (1,1) position.
         """
         self._send_command(CMD_CURSOR_HOME)
+        self._framebuffer.move_cursor(0, 0)
 
     def set_cursor_pos(self, x, y):
         """
@@ -234,6 +385,7 @@ class Lcd(ReducerResource):
         @param      y     The y position of the cursor
         """
         self._send_command(CMD_CURSOR_POS, x, y)
+        self._framebuffer.move_cursor(x - 1, y - 1)
 
     def move_cursor_forward(self):
         """
@@ -241,6 +393,7 @@ class Lcd(ReducerResource):
                     of the screen, it will wrap to (1,1).
         """
         self._send_command(CMD_CURSOR_FWD)
+        self._framebuffer.move_cursor()  # Could have wrapped
 
     def move_cursor_back(self):
         """
@@ -248,6 +401,7 @@ class Lcd(ReducerResource):
                     will wrap to the end of the screen.
         """
         self._send_command(CMD_CURSOR_BACK)
+        self._framebuffer.move_cursor()  # Could have wrapped
 
     def create_char(self, bank, code, char_bytes):
         """
@@ -256,6 +410,16 @@ class Lcd(ReducerResource):
         """
         self._send_command(CMD_SAVE_CUSTOM_CHAR, bank, code, *char_bytes)
 
+    def set_char(self, code, char_bytes):
+        """
+        @brief      Loads a custom character into the LCD's character RAM,
+                    with the given alias (code) and given pattern. Unlike
+                    create_char, this doesn't write to the EEPROM, so it's
+                    safe to do often. Any text already on screen that uses
+                    the code will change to the new pattern.
+        """
+        self._send_command(CMD_CREATE_CHAR, code, *char_bytes)
+
     def load_char_bank(self, bank):
         """
         @brief      Loads the custom character bank with the given index.
@@ -265,48 +429,59 @@ class Lcd(ReducerResource):
     def set_text(self, text):
         """
         @brief      Sets the text on the LCD. Only the characters on the LCD
-                    that need to change will be updated.
+                    that need to change will be updated, using as few bytes
+                    as possible.
 
         @param      text  The text for the LCD, with lines separated by a
-                        newline character
+                        newline character. Can contain custom glyphs (see
+                        glyphs.define_glyph).
         """
+        # Load any glyphs that aren't on the LCD yet, before they're shown
+        text, uploads = self._glyphs.allocate(text)
+        for code, char_bytes in uploads:
+            self.set_char(code, char_bytes)
+        self.stats.count("glyph_uploads", len(uploads))
 
-        def encode_str(s):
-            # UTF-8 encodes 128+ as two bytes but we use ord to get just one
-            # byte, [0, 255]
-            return bytes(ord(c) for c in s)
-
-        lines = [
-            line[: self.width] for line in text.splitlines()[: self.height]
-        ]
-        diff = diff_text(self._lines, lines)
-
-        # Build a list of bytes we want to write
-        for (x, y), s in diff.items():
-            text_bytes = encode_str(s)
-            # Move the cursor to the right spot (the LCD coords are 1-based),
-            # then add the text at that location
-            self.set_cursor_pos(x + 1, y + 1)
-            self._queue_bytes(text_bytes)
+        data, saved = self._framebuffer.update(
+            self._framebuffer.render(text)
+        )
+        if data:
+            self._queue_bytes(data)
+        self.stats.count("text_bytes", len(data))
+        self.stats.count("text_bytes_saved", saved)
 
-        self._lines = lines
+    @contextmanager
+    def _transaction(self, pipe):
+        """
+        @brief      Queues up all commands sent within the block, then pushes
+                    them onto the given pipeline as one entry at the end.
 
-    def __enter__(self):
+        @param      pipe  The Redis pipeline to push the commands onto
+        """
         # Initialize a command queue
         if self._command_queue is not None:
             raise ValueError("Command queue already exists")
         self._command_queue = []
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        # If we exited cleanly, push the queued bytes to Redis
+        # If we exit cleanly, push the queued bytes to Redis
         try:
-            if not exc_type:
-                # Squash all the queued bytes into one long bytes object
-                to_push = bytes(
-                    itertools.chain.from_iterable(self._command_queue)
+            yield
+            # Squash all the queued bytes into one long bytes object
+            to_push = bytes(itertools.chain.from_iterable(self._command_queue))
+            if to_push:
+                if self._streams:
+                    # The stream entry carries the commands, and trimming
+                    # keeps it bounded
+                    self.publish(pipe, to_push)
+                else:
+                    self._push_reply_index = len(pipe)
+                    pipe.rpush(__class__._COMMAND_QUEUE_KEY, to_push)
+                    self._queue_sizes.append(len(to_push))
+                    self.publish(pipe)
+                # Keep the snapshot in line with the commands
+                pipe.set(
+                    __class__._SNAPSHOT_KEY,
+                    pack_snapshot(self._get_snapshot()),
                 )
-                if to_push:
-                    self._redis.rpush(__class__._COMMAND_QUEUE_KEY, to_push)
-                    self.publish()
         finally:
             self._command_queue = None
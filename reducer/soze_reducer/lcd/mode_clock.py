@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 
 from soze_reducer.core.mode import register
@@ -7,6 +8,13 @@ from .mode import LcdMode
 
 @register("clock", LcdMode.MODES)
 class ClockMode(LcdMode):
+    """
+    Shows the date and seconds on the first line, and the time in big text
+    below. The big digits only change once a minute, and the seconds once a
+    second, so the rendered text is cached by second, and the parts that
+    only depend on the minute are cached by minute. Most ticks are just a
+    cache lookup.
+    """
 
     # This won't work for any other size LCD so fuck it just hardcode it
     _LCD_WIDTH = 20
@@ -17,25 +25,59 @@ class ClockMode(LcdMode):
 
     def __init__(self):
         super().__init__("clock")
+        # Timestamp of the start of the cached minute, and the text before
+        # and after the seconds for that minute
+        self._minute = None
+        self._day_str = None
+        self._time_str = None
+        # Timestamp of the cached second, and the full text for it
+        self._second = None
+        self._text = None
 
-    def get_text(self, settings):
-        lines = []  # This will we populated as we go along
+    def get_text(self, settings, now=None):
+        if now is None:
+            now = time.time()
+        second = int(now)
+        if second != self._second:
+            self._second = second
+            self._text = self._render(datetime.fromtimestamp(second))
+        return self._text
 
-        now = datetime.now()
-        day_str = __class__._LONG_DAY_FORMAT.format(d=now)
-        seconds_str = __class__._SECONDS_FORMAT.format(d=now)
+    def _render(self, d):
+        """
+        @brief      Render the text for the given time, rebuilding the parts
+                    that only change with the minute if they're stale.
+
+        @param      d     The time to render, as a datetime
+
+        @return     The full text for the LCD
+        """
+        seconds_str = __class__._SECONDS_FORMAT.format(d=d)
+        # Keyed by timestamp rather than d.minute, so DST changes (which
+        # repeat minutes) still invalidate the cache
+        minute = self._second - d.second
+        if minute != self._minute:
+            self._minute = minute
+            self._day_str = self._make_day_str(d, len(seconds_str))
+            self._time_str = self._make_time_str(d)
+        return self._day_str + seconds_str + self._time_str
+
+    def _make_day_str(self, d, seconds_len):
+        day_str = __class__._LONG_DAY_FORMAT.format(d=d)
 
         # If the line is too long, shorten the day name
-        if len(day_str) + len(seconds_str) > __class__._LCD_WIDTH:
-            day_str = __class__._SHORT_DAY_FORMAT.format(d=now)
+        if len(day_str) + seconds_len > __class__._LCD_WIDTH:
+            day_str = __class__._SHORT_DAY_FORMAT.format(d=d)
 
         # Pad the day string with spaces to make it the right length
-        day_str = day_str.ljust(__class__._LCD_WIDTH - len(seconds_str))
-        lines.append(day_str + seconds_str)  # First line
+        return day_str.ljust(__class__._LCD_WIDTH - seconds_len)
 
-        time_str = __class__._TIME_FORMAT.format(d=now).rjust(5)
+    def _make_time_str(self, d):
+        time_str = __class__._TIME_FORMAT.format(d=d).rjust(5)
         time_lines = helper.make_big_text(time_str)  # Rest of the fucking lines
-        # Pad each line with a space then add it to the list of lines
-        lines += (f" {line}" for line in time_lines)
+        # Put each line on its own row, padded with a space
+        return "".join(f"\n {line}" for line in time_lines)
 
-        return "\n".join(lines)
+    def get_next_update(self, settings):
+        # The finest thing we show is seconds, so wait for the next one
+        return 1.0 - time.time() % 1.0
@@ -13,3 +13,6 @@ class OffMode(LcdMode):
 
     def get_text(self, settings):
         return ""
+
+    def get_next_update(self, settings):
+        return None
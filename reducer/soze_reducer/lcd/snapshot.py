@@ -0,0 +1,82 @@
+import struct
+from collections import namedtuple
+
+from soze_reducer.core.color import Color
+from .glyphs import NUM_SLOTS
+
+# Width, height, backlight, color, then a bit mask of which glyph slots are
+# loaded. That's followed by 8 bytes for each loaded slot, then one byte per
+# cell.
+_HEADER = struct.Struct("<BB?3sB")
+_GLYPH_SIZE = 8
+
+Snapshot = namedtuple(
+    "Snapshot", ("width", "height", "backlight", "color", "glyphs", "cells")
+)
+
+
+def pack_snapshot(snapshot):
+    """
+    @brief      Packs everything on the LCD into a compact binary blob.
+
+    @param      snapshot  The Snapshot. glyphs is a list of rows (or None for
+                          an empty slot), one for each slot.
+
+    @return     The packed snapshot, as bytes
+    """
+    mask = 0
+    glyph_bytes = bytearray()
+    for slot, rows in enumerate(snapshot.glyphs):
+        if rows is not None:
+            mask |= 1 << slot
+            glyph_bytes += bytes(rows)
+    return (
+        _HEADER.pack(
+            snapshot.width,
+            snapshot.height,
+            snapshot.backlight,
+            bytes(snapshot.color),
+            mask,
+        )
+        + glyph_bytes
+        + snapshot.cells
+    )
+
+
+def unpack_snapshot(data):
+    """
+    @brief      Unpacks a snapshot made by pack_snapshot.
+
+    @param      data  The packed snapshot
+
+    @return     The Snapshot
+
+    @raise      ValueError if the data is malformed
+    """
+    try:
+        width, height, backlight, color, mask = _HEADER.unpack_from(data)
+    except struct.error as e:
+        raise ValueError(f"Invalid snapshot header: {e}")
+
+    glyphs = []
+    offset = _HEADER.size
+    for slot in range(NUM_SLOTS):
+        if mask & 1 << slot:
+            glyphs.append(tuple(data[offset : offset + _GLYPH_SIZE]))
+            offset += _GLYPH_SIZE
+        else:
+            glyphs.append(None)
+
+    cells = bytes(data[offset:])
+    if len(cells) != width * height:
+        raise ValueError(
+            f"Expected {width * height} cells in snapshot, got {len(cells)}"
+        )
+    return Snapshot(
+        width=width,
+        height=height,
+        backlight=backlight,
+        color=Color.from_hexcode(int.from_bytes(color, "big")),
+        glyphs=glyphs,
+        cells=cells,
+    )
@@ -1 +1,9 @@
-from . import mode_off, mode_static, mode_fade
+from . import (
+    mode_off,
+    mode_static,
+    mode_fade,
+    mode_sequence,
+    mode_rainbow,
+    mode_breathe,
+    mode_strobe,
+)
@@ -0,0 +1,100 @@
+"""
+The LED's color pipeline. Modes work in sRGB, like the colors that users
+pick, but the LED's PWM is linear in duty cycle. Mixing sRGB values directly
+makes fades look uneven, so interpolation is done in linear light instead.
+Then, on the way out, each color is gamma corrected and scaled per channel to
+calibrate the LED.
+
+Everything here uses precomputed tables, so no pow() is needed per frame.
+"""
+
+from soze_reducer.core.color import Color
+
+# Linear light values are stored as 12-bit ints, so they're precise enough
+# that converting back to sRGB doesn't lose any levels
+LINEAR_MAX = 4095
+
+
+def _srgb_to_linear(val):
+    if val <= 0.04045:
+        return val / 12.92
+    return ((val + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(val):
+    if val <= 0.0031308:
+        return val * 12.92
+    return 1.055 * val ** (1 / 2.4) - 0.055
+
+
+# sRGB byte => linear light [0, LINEAR_MAX]
+SRGB_TO_LINEAR = tuple(
+    round(_srgb_to_linear(i / 255) * LINEAR_MAX) for i in range(256)
+)
+# Linear light [0, LINEAR_MAX] => sRGB byte
+LINEAR_TO_SRGB = tuple(
+    round(_linear_to_srgb(i / LINEAR_MAX) * 255) for i in range(LINEAR_MAX + 1)
+)
+
+
+def _make_lut(gamma, scale):
+    return bytes(round(255 * scale * (i / 255) ** gamma) for i in range(256))
+
+
+class Calibration:
+    """
+    The output stage for the LED. It gamma corrects and scales each channel
+    of the output from the mode, using one 256-entry table per channel. The
+    tables are rebuilt only when the settings change.
+    """
+
+    _CALIBRATION_KEY = "calibration"
+    _DEFAULT_GAMMA = 2.2
+    _DEFAULT_SCALE = 1.0
+
+    def __init__(self):
+        # The settings that the current tables were built from
+        self._settings = None
+        self._luts = None
+
+    def apply(self, settings, color):
+        """
+        Calibrate the given color, according to the given LED settings.
+        """
+        red, green, blue = self._get_luts(settings)
+        return Color.from_hexcode(
+            red[color.red] << 16 | green[color.green] << 8 | blue[color.blue]
+        )
+
+    def apply_frame(self, settings, frame):
+        """
+        Calibrate every zone of the given frame (raw RGB bytes), according to
+        the given LED settings. The tables are applied with bytes.translate,
+        so this is one pass in C per channel.
+        """
+        red, green, blue = self._get_luts(settings)
+        if red == green == blue:
+            return frame.translate(red)
+        calibrated = bytearray(frame)
+        calibrated[0::3] = frame[0::3].translate(red)
+        calibrated[1::3] = frame[1::3].translate(green)
+        calibrated[2::3] = frame[2::3].translate(blue)
+        return bytes(calibrated)
+
+    def _get_luts(self, settings):
+        if settings is not self._settings:
+            self._luts = __class__._compile(
+                settings.get(__class__._CALIBRATION_KEY, {})
+            )
+            self._settings = settings
+        return self._luts
+
+    @staticmethod
+    def _compile(calibration):
+        gamma = float(calibration.get("gamma", __class__._DEFAULT_GAMMA))
+        return tuple(
+            _make_lut(
+                gamma, float(calibration.get(channel, __class__._DEFAULT_SCALE))
+            )
+            for channel in ("red", "green", "blue")
+        )
@@ -1,39 +1,82 @@
 from soze_reducer.core.color import BLACK
 from soze_reducer.core.resource import ReducerResource
+from . import spans
+from .calibration import Calibration
 from .mode import LedMode
 
 
 class Led(ReducerResource):
+    """
+    The LED, which is split into one or more zones (e.g. the pixels of an
+    addressable strip). Each frame is the raw RGB bytes for every zone. The
+    full frame is kept in Redis, but each write only touches the zones that
+    changed, and the pub carries just those spans.
+    """
 
     _COLOR_KEY = "reducer:led_color"
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, zones=1, **kwargs):
         super().__init__(
             *args,
             name="LED",
             settings_key="led",
             sub_channel="a2r:led",
             pub_channel="r2d:led",
+            stream_key="reducer:led_stream",
             mode_class=LedMode,
             **kwargs,
         )
+        self._zones = zones
+        self._calibration = Calibration()
+        # The last frame that was written to Redis
+        self._frame = None
 
-    def set_color(self, color):
-        # Push the new color to Redis
-        self._redis.set(__class__._COLOR_KEY, bytes(color))
-        self.publish()
+    @property
+    def zones(self):
+        return self._zones
 
-    def off(self):
-        self.set_color(BLACK)
+    def set_frame(self, pipe, frame):
+        """
+        Push the given frame to Redis, and publish the spans of zones that
+        changed since the last frame.
+        """
+        changed = spans.diff_spans(self._frame, frame)
+        if not changed:
+            return
+        if self._frame is None:
+            pipe.set(__class__._COLOR_KEY, frame)
+        else:
+            for zone, count in changed:
+                start = zone * spans.ZONE_SIZE
+                end = start + count * spans.ZONE_SIZE
+                pipe.setrange(__class__._COLOR_KEY, start, frame[start:end])
+        self.publish(pipe, spans.pack_spans(frame, changed))
+        self._frame = frame
 
-    def _before_stop(self):
-        self.off()
+    def set_color(self, pipe, color):
+        self.set_frame(pipe, bytes(color) * self._zones)
+
+    def off(self, pipe):
+        self.set_color(pipe, BLACK)
+
+    def _after_init(self, pipe):
+        # Start from scratch, in case the key was changed while we were gone
+        self._frame = None
+
+    def _before_stop(self, pipe):
+        self.off(pipe)
+
+    def handle_error(self):
+        super().handle_error()
+        # Our last frame may not have made it, so write the whole next one
+        self._frame = None
 
     def _get_default_values(self):
-        return (BLACK,)
+        return (bytes(BLACK) * self._zones,)
 
     def _get_values(self):
-        return (self._mode.get_color(self._settings),)
+        frame = self._mode.get_frame(self._settings, self._zones)
+        return (self._calibration.apply_frame(self._settings, frame),)
 
-    def _apply_values(self, color):
-        self.set_color(color)
+    def _apply_values(self, pipe, frame):
+        self.set_frame(pipe, frame)
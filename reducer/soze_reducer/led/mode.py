@@ -1,4 +1,5 @@
 import abc
+import time
 
 from soze_reducer.core.mode import Mode
 
@@ -7,10 +8,61 @@ class LedMode(Mode):
 
     MODES = {}
 
+    def __init__(self, name):
+        super().__init__(name)
+        # The settings that the current plan was compiled from
+        self._plan_settings = None
+        self._plan = None
+
+    def get_color(self, settings, now=None):
+        """
+        Get the color for the given settings, at the given monotonic time
+        (the current time by default).
+        """
+        if now is None:
+            now = time.monotonic()
+        return self._get_color(self._get_plan(settings), now)
+
+    def get_frame(self, settings, zones, now=None):
+        """
+        Get the RGB bytes for every zone of the LED, for the given settings,
+        at the given monotonic time (the current time by default).
+        """
+        if now is None:
+            now = time.monotonic()
+        return self._get_frame(self._get_plan(settings), zones, now)
+
+    def _get_plan(self, settings):
+        """
+        Get the compiled plan for the given settings. The resource replaces
+        its settings dict whenever the settings change, and never mutates it,
+        so we only need to recompile when we get a different dict.
+        """
+        if settings is not self._plan_settings:
+            self._plan = self._compile(settings)
+            self._plan_settings = settings
+        return self._plan
+
+    def _compile(self, settings):
+        """
+        Pre-process the given settings into whatever form is needed to
+        compute colors quickly. This is only called once per settings change,
+        and the result is passed to _get_color. The result should be treated
+        as immutable.
+        """
+        return settings
+
     @abc.abstractmethod
-    def get_color(self, settings):
+    def _get_color(self, plan, now):
         pass
 
+    def _get_frame(self, plan, zones, now):
+        """
+        Compute the whole frame in one pass. By default, every zone gets the
+        same color.
+        """
+        return bytes(self._get_color(plan, now)) * zones
+
     @classmethod
     def _get_modes(cls):
         return cls.MODES
@@ -0,0 +1,33 @@
+from soze_reducer.core.color import BLACK, Color
+from soze_reducer.core.mode import register
+from . import tables
+from .mode import LedMode
+
+
+@register("breathe", LedMode.MODES)
+class BreatheMode(LedMode):
+    """
+    Pulses one color smoothly between off and full brightness.
+    """
+
+    def __init__(self):
+        super().__init__("breathe")
+
+    def _compile(self, settings):
+        """
+        Scale the color by every level of the pulse curve up front, so each
+        tick is just a table lookup.
+        """
+        try:
+            breathe_settings = settings["breathe"]
+            color = Color.from_hexcode(breathe_settings["color"])
+            period = float(breathe_settings["period"])
+        except KeyError:
+            return None
+        table = tuple(tables.scale(color, level) for level in tables.PULSE)
+        return tables.make_cycle(period, table)
+
+    def _get_color(self, plan, now):
+        if plan is None:
+            return BLACK
+        return tables.get_entry(plan, now)
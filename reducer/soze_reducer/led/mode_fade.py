@@ -1,49 +1,47 @@
-import time
-
 from soze_reducer.core.color import BLACK, Color
 from soze_reducer.core.mode import register
+from . import timeline
 from .mode import LedMode
 
 
 @register("fade", LedMode.MODES)
 class FadeMode(LedMode):
+    """
+    Fades through a list of colors on a loop. The fade has no state besides
+    the time it started at, so the color for any point in time can be
+    computed directly, and late ticks never throw it off.
+    """
 
     _FADE_COLORS_KEY = "fade:colors"
     _FADE_TIME_KEY = "fade:fade_time"
 
     def __init__(self):
         super().__init__("fade")
-        self._color_index = 0
-        self._fade_start_time = 0
 
-    def get_color(self, settings):
+    def _compile(self, settings):
+        """
+        Parse the fade colors, and build a timeline with one segment for each
+        color, which fades into the next color (wrapping around at the end).
+        The fade starts over from the first color whenever the settings
+        change. Returns None if there's nothing to fade between.
+        """
         try:
             fade_settings = settings["fade"]
-            fade_colors = [
+            colors = [
                 Color.from_hexcode(color_bytes)
                 for color_bytes in fade_settings["colors"]
             ]
             fade_time = float(fade_settings["fade_time"])
         except KeyError:
             # One or more key is missing from Redis
-            return BLACK
-
-        if len(fade_colors) == 0:
-            return BLACK
-
-        def get_fade_color(index):
-            return fade_colors[index % len(fade_colors)]
+            return None
 
-        now = time.time()
-        if now - self._fade_start_time >= fade_time:
-            # Reached the next color
-            self._color_index += 1
-            self._color_index %= len(fade_colors)
-            self._fade_start_time = now
+        return timeline.make_timeline(
+            timeline.make_segment(fade_time, start, end)
+            for start, end in zip(colors, colors[1:] + colors[:1])
+        )
 
-        # Interpolate between the two boundary colors based on time
-        last_color = get_fade_color(self._color_index)
-        next_color = get_fade_color(self._color_index + 1)
-        bias = (now - self._fade_start_time) / fade_time
-        current_color = last_color * (1 - bias) + next_color * bias
-        return current_color
+    def _get_color(self, plan, now):
+        if plan is None:
+            return BLACK
+        return timeline.get_color(plan, now)
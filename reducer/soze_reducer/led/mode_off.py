@@ -8,5 +8,8 @@ class OffMode(LedMode):
     def __init__(self):
         super().__init__("off")
 
-    def get_color(self, settings):
+    def _get_color(self, plan, now):
         return BLACK
+
+    def get_next_update(self, settings):
+        return None
@@ -0,0 +1,39 @@
+from soze_reducer.core.color import BLACK
+from soze_reducer.core.mode import register
+from . import tables
+from .mode import LedMode
+from .spans import ZONE_SIZE
+
+
+@register("rainbow", LedMode.MODES)
+class RainbowMode(LedMode):
+    """
+    Cycles around the hue wheel, at full saturation. On a strip, the whole
+    wheel is spread across the zones, so the rainbow moves along it.
+    """
+
+    def __init__(self):
+        super().__init__("rainbow")
+
+    def _compile(self, settings):
+        try:
+            cycle_time = float(settings["rainbow"]["cycle_time"])
+        except KeyError:
+            return None
+        return tables.make_cycle(cycle_time, tables.HUE_WHEEL)
+
+    def _get_color(self, plan, now):
+        if plan is None:
+            return BLACK
+        return tables.get_entry(plan, now)
+
+    def _get_frame(self, plan, zones, now):
+        if plan is None:
+            return bytes(ZONE_SIZE * zones)
+        wheel = tables.HUE_WHEEL_BYTES
+        size = tables.TABLE_SIZE
+        start = int((now - plan.epoch) * plan.rate)
+        step = size / zones
+        return b"".join(
+            [wheel[(start + int(zone * step)) % size] for zone in range(zones)]
+        )
@@ -0,0 +1,56 @@
+from soze_reducer.core.color import BLACK, Color
+from soze_reducer.core.mode import register
+from . import timeline
+from .mode import LedMode
+
+
+@register("sequence", LedMode.MODES)
+class SequenceMode(LedMode):
+    """
+    Plays a looping program of keyframes. Each keyframe holds its color for a
+    while, then transitions into the next keyframe's color (wrapping around
+    at the end), with an easing curve.
+    """
+
+    def __init__(self):
+        super().__init__("sequence")
+
+    def _compile(self, settings):
+        """
+        Compile the keyframes into a timeline, with a hold segment and a
+        transition segment for each keyframe. The sequence starts over from
+        the first keyframe whenever the settings change. Returns None if
+        there's nothing to play.
+        """
+        try:
+            keyframes = settings["sequence"]["keyframes"]
+            colors = [
+                Color.from_hexcode(keyframe["color"]) for keyframe in keyframes
+            ]
+            segments = []
+            for keyframe, start, end in zip(
+                keyframes, colors, colors[1:] + colors[:1]
+            ):
+                segments.append(
+                    timeline.make_segment(
+                        float(keyframe["hold_time"]), start, start
+                    )
+                )
+                segments.append(
+                    timeline.make_segment(
+                        float(keyframe["transition_time"]),
+                        start,
+                        end,
+                        keyframe["easing"],
+                    )
+                )
+        except KeyError:
+            # One or more key is missing from Redis
+            return None
+
+        return timeline.make_timeline(segments)
+
+    def _get_color(self, plan, now):
+        if plan is None:
+            return BLACK
+        return timeline.get_color(plan, now)
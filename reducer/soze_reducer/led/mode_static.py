@@ -8,8 +8,14 @@ class StaticMode(LedMode):
     def __init__(self):
         super().__init__("static")
 
-    def get_color(self, settings):
+    def _compile(self, settings):
         try:
             return Color.from_hexcode(settings["static"]["color"])
         except KeyError:
             return BLACK
+
+    def _get_color(self, plan, now):
+        return plan
+
+    def get_next_update(self, settings):
+        return None
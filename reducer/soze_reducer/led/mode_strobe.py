@@ -0,0 +1,56 @@
+import time
+from collections import namedtuple
+
+from soze_reducer.core.color import BLACK, Color
+from soze_reducer.core.mode import register
+from .mode import LedMode
+
+# Flash period and how long the color is on for in each period, in seconds
+_StrobePlan = namedtuple("_StrobePlan", ["epoch", "period", "on_time", "color"])
+# We get updated right at each edge, so a time that's this close to an edge
+# (in seconds) counts as past it. Otherwise float error could put us a hair
+# before the edge, with another update due immediately.
+_EDGE_TOLERANCE = 1e-6
+
+
+@register("strobe", LedMode.MODES)
+class StrobeMode(LedMode):
+    """
+    Flashes one color on and off at a fixed frequency.
+    """
+
+    def __init__(self):
+        super().__init__("strobe")
+
+    def _compile(self, settings):
+        try:
+            strobe_settings = settings["strobe"]
+            color = Color.from_hexcode(strobe_settings["color"])
+            period = 1.0 / float(strobe_settings["frequency"])
+            on_time = period * float(strobe_settings["duty"])
+        except (KeyError, ZeroDivisionError):
+            return None
+        return _StrobePlan(time.monotonic(), period, on_time, color)
+
+    def _get_color(self, plan, now):
+        if plan is None:
+            return BLACK
+        offset = self._get_offset(plan, now)
+        return plan.color if offset < plan.on_time else BLACK
+
+    def get_next_update(self, settings):
+        # We only need an update when the strobe flips on or off
+        plan = self._get_plan(settings)
+        if plan is None:
+            return None
+        offset = self._get_offset(plan, time.monotonic())
+        edge = plan.on_time if offset < plan.on_time else plan.period
+        # The offset is pushed forward by the tolerance, so take it back out
+        # to get the time until the actual edge
+        return edge - offset + _EDGE_TOLERANCE
+
+    def _get_offset(self, plan, now):
+        """
+        Get how far into the current period the given time is.
+        """
+        return (now - plan.epoch + _EDGE_TOLERANCE) % plan.period
@@ -0,0 +1,55 @@
+"""
+Diffing for LED frames. A frame is the raw RGB bytes for every zone, in
+order. Only the spans of zones that changed are written and published, which
+keeps each frame cheap even for a long strip.
+"""
+
+import struct
+
+ZONE_SIZE = 3  # RGB
+# Each span in a pub is a header of (first zone, number of zones), followed
+# by the RGB bytes for those zones
+_SPAN_HEADER = struct.Struct("<HH")
+# Unchanged runs up to this many zones long are sent as part of the
+# surrounding span, because that's cheaper than the header for a new span
+_MAX_GAP = (_SPAN_HEADER.size - 1) // ZONE_SIZE
+
+
+def diff_spans(old, new):
+    """
+    Get the spans of zones that differ between the two frames, as a list of
+    (first zone, number of zones). If there is no old frame, or it's a
+    different size, the whole new frame is one span.
+    """
+    num_zones = len(new) // ZONE_SIZE
+    if old is None or len(old) != len(new):
+        return [(0, num_zones)]
+    if old == new:
+        return []
+
+    spans = []
+    start = None  # First zone of the current span
+    end = None  # Last changed zone of the current span, plus one
+    for zone in range(num_zones):
+        i = zone * ZONE_SIZE
+        if old[i : i + ZONE_SIZE] == new[i : i + ZONE_SIZE]:
+            continue
+        if start is not None and zone - end > _MAX_GAP:
+            spans.append((start, end - start))
+            start = None
+        if start is None:
+            start = zone
+        end = zone + 1
+    spans.append((start, end - start))
+    return spans
+
+
+def pack_spans(frame, spans):
+    """
+    Pack the given spans of the frame into a pub payload.
+    """
+    return b"".join(
+        _SPAN_HEADER.pack(zone, count)
+        + frame[zone * ZONE_SIZE : (zone + count) * ZONE_SIZE]
+        for zone, count in spans
+    )
@@ -0,0 +1,60 @@
+"""
+Precomputed lookup tables for the procedural LED modes. These are built once
+at import, so that modes never need float trig or HSV conversion on a tick,
+which is slow on the Pi's weak FPU. Each periodic effect is evaluated by
+indexing into a table with its current phase.
+"""
+
+import colorsys
+import math
+import time
+from collections import namedtuple
+
+from soze_reducer.core.color import Color
+
+TABLE_SIZE = 256
+
+# Fully saturated colors, all the way around the hue wheel
+HUE_WHEEL = tuple(
+    Color(*(int(c * 255) for c in colorsys.hsv_to_rgb(i / TABLE_SIZE, 1, 1)))
+    for i in range(TABLE_SIZE)
+)
+# The same, as raw RGB bytes, to build frames from
+HUE_WHEEL_BYTES = tuple(bytes(color) for color in HUE_WHEEL)
+# One period of a raised cosine, scaled to [0, 255]. Starts and ends at 0,
+# peaking halfway through.
+PULSE = tuple(
+    int(round(127.5 - 127.5 * math.cos(2 * math.pi * i / TABLE_SIZE)))
+    for i in range(TABLE_SIZE)
+)
+
+# A table that's played on a loop, starting at the monotonic time epoch.
+# rate is in table entries per second.
+Cycle = namedtuple("Cycle", ["epoch", "rate", "table"])
+
+
+def scale(color, level):
+    """
+    Scale the given color by a level in [0, 255], using integer math.
+    """
+    return Color(
+        color.red * level // 255,
+        color.green * level // 255,
+        color.blue * level // 255,
+    )
+
+
+def make_cycle(period, table):
+    """
+    Make a cycle that plays the given table once every period seconds,
+    starting now.
+    """
+    return Cycle(time.monotonic(), len(table) / period, table)
+
+
+def get_entry(cycle, now):
+    """
+    Get the entry of the given cycle's table at the given monotonic time.
+    """
+    index = int((now - cycle.epoch) * cycle.rate) % len(cycle.table)
+    return cycle.table[index]
@@ -0,0 +1,96 @@
+"""
+Helpers for modes that play a looping timeline of color transitions. A
+timeline is compiled once per settings change, into a list of segments with
+cumulative start times. Evaluating it at any point in time is then a bisect
+plus one interpolation, no matter how long the timeline is. Interpolation is
+done in linear light, so that fades look even.
+"""
+
+import bisect
+import time
+from collections import namedtuple
+
+from soze_reducer.core.color import Color
+from .calibration import LINEAR_TO_SRGB, SRGB_TO_LINEAR
+
+# Easing curves, which map linear progress through a transition to eased
+# progress. All of them map 0 to 0 and 1 to 1.
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: t * (2.0 - t),
+    "ease_in_out": lambda t: t * t * (3.0 - 2.0 * t),
+}
+
+# One transition from one color to another. The start channels and
+# per-channel deltas are precomputed in linear light, so that each tick is
+# just a multiply-add.
+Segment = namedtuple(
+    "Segment",
+    ["duration", "red", "green", "blue", "d_red", "d_green", "d_blue", "ease"],
+)
+# A compiled timeline. It started at the monotonic time epoch, and repeats
+# every cycle seconds. starts holds the offset of each segment into the cycle.
+Timeline = namedtuple("Timeline", ["epoch", "cycle", "starts", "segments"])
+
+
+def make_segment(duration, start, end, easing="linear"):
+    """
+    Make a segment that transitions from the start color to the end color
+    over the given duration. A hold is just a segment with the same start and
+    end color.
+    """
+    red, green, blue = (
+        SRGB_TO_LINEAR[start.red],
+        SRGB_TO_LINEAR[start.green],
+        SRGB_TO_LINEAR[start.blue],
+    )
+    return Segment(
+        duration,
+        red,
+        green,
+        blue,
+        SRGB_TO_LINEAR[end.red] - red,
+        SRGB_TO_LINEAR[end.green] - green,
+        SRGB_TO_LINEAR[end.blue] - blue,
+        EASINGS[easing],
+    )
+
+
+def make_timeline(segments):
+    """
+    Compile the given segments into a timeline, which starts now. Segments
+    with no duration are skipped, since they'd never be visible. Returns None
+    if that leaves nothing to play.
+    """
+    segments = tuple(segment for segment in segments if segment.duration > 0)
+    if not segments:
+        return None
+
+    starts = []
+    cycle = 0.0
+    for segment in segments:
+        starts.append(cycle)
+        cycle += segment.duration
+    return Timeline(time.monotonic(), cycle, tuple(starts), segments)
+
+
+def get_color(timeline, now):
+    """
+    Get the color of the given timeline at the given monotonic time.
+    """
+    # Figure out where we are in the cycle, then find the segment that covers
+    # that point
+    offset = (now - timeline.epoch) % timeline.cycle
+    index = bisect.bisect_right(timeline.starts, offset) - 1
+    segment = timeline.segments[index]
+
+    # Interpolate between the two boundary colors based on time
+    t = segment.ease(
+        min((offset - timeline.starts[index]) / segment.duration, 1.0)
+    )
+    return Color.from_hexcode(
+        LINEAR_TO_SRGB[int(segment.red + segment.d_red * t)] << 16
+        | LINEAR_TO_SRGB[int(segment.green + segment.d_green * t)] << 8
+        | LINEAR_TO_SRGB[int(segment.blue + segment.d_blue * t)]
+    )
@@ -0,0 +1,38 @@
+import unittest
+
+from soze_reducer.core.color import BLACK, WHITE, Color
+from soze_reducer.led.calibration import (
+    LINEAR_TO_SRGB,
+    SRGB_TO_LINEAR,
+    Calibration,
+)
+
+
+class CalibrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calibration = Calibration()
+
+    def test_round_trip(self):
+        for val in range(256):
+            self.assertEqual(val, LINEAR_TO_SRGB[SRGB_TO_LINEAR[val]])
+
+    def test_gamma(self):
+        settings = {"calibration": {"gamma": 2.0}}
+        self.assertEqual(BLACK, self.calibration.apply(settings, BLACK))
+        self.assertEqual(WHITE, self.calibration.apply(settings, WHITE))
+        self.assertEqual(
+            Color(64, 0, 255),
+            self.calibration.apply(settings, Color(128, 0, 255)),
+        )
+
+    def test_scale(self):
+        settings = {
+            "calibration": {"gamma": 1.0, "red": 1.0, "green": 0.5, "blue": 0}
+        }
+        self.assertEqual(
+            Color(255, 128, 0), self.calibration.apply(settings, WHITE)
+        )
+
+        # New settings rebuild the tables
+        settings = {"calibration": {"gamma": 1.0}}
+        self.assertEqual(WHITE, self.calibration.apply(settings, WHITE))
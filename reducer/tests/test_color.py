@@ -0,0 +1,61 @@
+import pickle
+import unittest
+
+from soze_reducer.core.color import BLACK, WHITE, Color
+
+
+class ColorTestCase(unittest.TestCase):
+    def test_check(self):
+        self.assertRaises(ValueError, Color, 256, 0, 0)
+        self.assertRaises(ValueError, Color, 0, -1, 0)
+        self.assertRaises(TypeError, Color, 0, 0, 1.0)
+
+    def test_channels(self):
+        color = Color(1, 2, 3)
+        self.assertEqual((1, 2, 3), (color.red, color.green, color.blue))
+        self.assertEqual(b"\x01\x02\x03", bytes(color))
+        self.assertEqual(Color(0x12, 0x34, 0x56), Color.from_hexcode(0x123456))
+
+    def test_immutable(self):
+        color = Color(1, 2, 3)
+        with self.assertRaises(AttributeError):
+            color._value = 0
+        with self.assertRaises(AttributeError):
+            color.red = 0
+
+    def test_equality(self):
+        self.assertEqual(Color(1, 2, 3), Color(1, 2, 3))
+        self.assertNotEqual(Color(1, 2, 3), Color(3, 2, 1))
+        self.assertNotEqual(Color(0, 0, 0), (0, 0, 0))
+        self.assertEqual(1, len({Color(1, 2, 3), Color(1, 2, 3)}))
+        color = Color(1, 2, 3)
+        self.assertEqual(color, pickle.loads(pickle.dumps(color)))
+
+    def test_interned(self):
+        self.assertIs(BLACK, Color.from_hexcode(0))
+        self.assertIs(BLACK, Color(10, 20, 30) * 0)
+
+    def test_arithmetic(self):
+        self.assertEqual(
+            Color(255, 30, 3), Color(200, 10, 1) + Color(100, 20, 2)
+        )
+        self.assertEqual(
+            Color(127, 0, 255), Color(255, 0, 200) * 0.5 + Color(0, 0, 155)
+        )
+        self.assertEqual(BLACK, Color(10, 20, 30) * -1)
+        self.assertEqual(Color(255, 2, 255), Color(200, 1, 128) * 2.0)
+
+    def test_lerp(self):
+        red = Color(255, 0, 0)
+        blue = Color(0, 0, 255)
+        self.assertEqual(red, red.lerp(blue, 0.0))
+        self.assertEqual(blue, red.lerp(blue, 1.0))
+        self.assertEqual(Color(191, 0, 64), red.lerp(blue, 0.25))
+        self.assertEqual(red.lerp(blue, 0.25), blue.blend(red, 0.25))
+        self.assertRaises(ValueError, red.lerp, blue, 1.5)
+
+    def test_lerp_same(self):
+        # A fade between two copies of the same color should hold steady
+        for color in [WHITE, BLACK, Color(1, 128, 254)]:
+            for t in [0.0, 0.07, 0.1, 0.3, 0.5, 0.77, 0.99, 1.0]:
+                self.assertEqual(color, color.lerp(color, t))
@@ -0,0 +1,82 @@
+import redis
+import unittest
+from unittest import mock
+
+from soze_reducer.core.frame import Frame, get_sleep_time
+
+
+def make_resource(time_until_due):
+    res = mock.Mock()
+    res.is_due.return_value = time_until_due == 0.0
+    res.get_time_until_due.return_value = time_until_due
+    return res
+
+
+class FrameTestCase(unittest.TestCase):
+    def setUp(self):
+        self.redis = mock.MagicMock()
+        self.pipe = self.redis.pipeline.return_value
+
+    def test_update(self):
+        due, not_due = make_resource(0.0), make_resource(0.5)
+        frame = Frame(self.redis)
+        frame.update([due, not_due])
+        frame.commit()
+
+        self.redis.pipeline.assert_called_once_with(transaction=True)
+        due.update.assert_called_once_with(self.pipe)
+        not_due.update.assert_not_called()
+        self.pipe.execute.assert_called_once_with()
+
+    def test_handle_replies(self):
+        due, not_due = make_resource(0.0), make_resource(0.5)
+        frame = Frame(self.redis)
+        frame.update([due, not_due])
+        frame.handle_replies([1])
+
+        # Only resources that queued commands get the replies
+        due.handle_replies.assert_called_once_with([1])
+        not_due.handle_replies.assert_not_called()
+
+    def test_update_error(self):
+        def fail(pipe):
+            pipe.set("bad", 1)
+            raise ValueError("oops")
+
+        bad, good = make_resource(0.0), make_resource(0.0)
+        bad.update.side_effect = fail
+        good.update.side_effect = lambda pipe: pipe.set("good", 1)
+        redis_client = mock.Mock()
+        redis_client.pipeline.return_value = redis.Redis().pipeline()
+        frame = Frame(redis_client)
+        frame.update([bad, good])
+
+        # The good resource still gets committed, without the bad one's
+        # half-finished writes
+        self.assertEqual(
+            [("SET", "good", 1)],
+            [args for args, _ in frame._pipe.command_stack],
+        )
+        bad.handle_error.assert_called_once_with()
+        good.handle_error.assert_not_called()
+        frame.handle_replies([True])
+        bad.handle_replies.assert_not_called()
+        good.handle_replies.assert_called_once_with([True])
+
+    def test_commit_error(self):
+        due, not_due = make_resource(0.0), make_resource(0.5)
+        frame = Frame(self.redis)
+        frame.update([due, not_due])
+        frame.handle_error()
+        due.handle_error.assert_called_once_with()
+        not_due.handle_error.assert_not_called()
+
+    def test_get_sleep_time(self):
+        self.assertIsNone(get_sleep_time([]))
+        self.assertIsNone(get_sleep_time([make_resource(None)]))
+        self.assertEqual(
+            0.5,
+            get_sleep_time(
+                [make_resource(None), make_resource(1.0), make_resource(0.5)]
+            ),
+        )
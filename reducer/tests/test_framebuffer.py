@@ -0,0 +1,56 @@
+import unittest
+
+from soze_reducer.lcd.framebuffer import FrameBuffer
+
+
+def cursor_pos(x, y):
+    return bytes([0xFE, 0x47, x, y])
+
+
+class FrameBufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fb = FrameBuffer(10, 2)
+
+    def update(self, text):
+        return self.fb.update(self.fb.render(text))
+
+    def test_render(self):
+        self.assertEqual(b"abc       " + b" " * 10, self.fb.render("abc"))
+        self.assertEqual(
+            b"0123456789" + b"x\x00        ",
+            self.fb.render("0123456789abc\nx\x00\nignored"),
+        )
+
+    def test_unchanged(self):
+        self.update("hello")
+        self.assertEqual((b"", 0), self.update("hello"))
+
+    def test_runs(self):
+        self.update("aaaaaaaaaa\naaaaaaaaaa")
+        # Short gaps are rewritten instead of moving the cursor
+        data, saved = self.update("baabaaaaab\naaaaaaaaaa")
+        self.assertEqual(
+            cursor_pos(1, 1) + b"baab" + cursor_pos(10, 1) + b"b", data
+        )
+        # One cursor move saved, at the cost of rewriting two cells
+        self.assertEqual(2, saved)
+
+        # The cursor is already where the next run starts
+        data, _ = self.update("baabaaaaab\nbaaaaaaaaa")
+        self.assertEqual(cursor_pos(1, 2) + b"b", data)
+        data, _ = self.update("baabaaaaab\nbbaaaaaaaa")
+        self.assertEqual(b"b", data)
+
+    def test_redraw(self):
+        self.update("abcdefghij\nabcdefghij")
+        # Clearing and writing one char beats writing every cell
+        data, saved = self.update("x")
+        self.assertEqual(b"\xfe\x58" + cursor_pos(1, 1) + b"x", data)
+        self.assertEqual(4 + 10 + 4 + 10 - 7, saved)
+        self.assertEqual(b"x" + b" " * 19, self.fb.cells)
+
+    def test_clear(self):
+        self.update("abc")
+        self.fb.clear()
+        data, _ = self.update("abc")
+        self.assertEqual(cursor_pos(1, 1) + b"abc", data)
@@ -0,0 +1,64 @@
+import unittest
+
+from soze_reducer.lcd.glyphs import NUM_SLOTS, GlyphAllocator, define_glyph
+
+
+def make_rows(i):
+    # Offset from the glyphs in GlyphTestCase, so every glyph here is new and
+    # they're defined in order
+    return (i + 16,) * 8
+
+
+class GlyphTestCase(unittest.TestCase):
+    def test_define(self):
+        glyph = define_glyph([1] * 8)
+        self.assertEqual(glyph, define_glyph([1] * 8))
+        self.assertNotEqual(glyph, define_glyph([2] * 8))
+        with self.assertRaises(ValueError):
+            define_glyph([0] * 7)
+        with self.assertRaises(ValueError):
+            define_glyph([0b100000] * 8)
+
+
+class GlyphAllocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.glyphs = GlyphAllocator()
+        self.chars = [
+            define_glyph(make_rows(i), fallback="?")
+            for i in range(NUM_SLOTS + 1)
+        ]
+
+    def test_plain_text(self):
+        self.assertEqual(("abc", []), self.glyphs.allocate("abc"))
+
+    def test_upload_once(self):
+        a, b = self.chars[:2]
+        text, uploads = self.glyphs.allocate(f"{a}x{b}{a}")
+        self.assertEqual("\x00x\x01\x00", text)
+        self.assertEqual([(0, make_rows(0)), (1, make_rows(1))], uploads)
+        # Already loaded, so nothing to upload
+        self.assertEqual(("\x01", []), self.glyphs.allocate(b))
+
+    def test_evict_lru(self):
+        # Fill every slot, then use the first one again
+        self.glyphs.allocate("".join(self.chars[:NUM_SLOTS]))
+        self.glyphs.allocate(self.chars[0])
+        # The second glyph is now the least recently used
+        text, uploads = self.glyphs.allocate(self.chars[NUM_SLOTS])
+        self.assertEqual("\x01", text)
+        self.assertEqual([(1, make_rows(NUM_SLOTS))], uploads)
+        # The evicted glyph has to be loaded again
+        _, uploads = self.glyphs.allocate(self.chars[1])
+        self.assertEqual(1, len(uploads))
+
+    def test_overflow(self):
+        # Too many glyphs at once, so the last one falls back
+        text, uploads = self.glyphs.allocate("".join(self.chars))
+        self.assertEqual("\x00\x01\x02\x03\x04\x05\x06\x07?", text)
+        self.assertEqual(NUM_SLOTS, len(uploads))
+
+    def test_reset(self):
+        self.glyphs.allocate(self.chars[0])
+        self.glyphs.reset()
+        _, uploads = self.glyphs.allocate(self.chars[0])
+        self.assertEqual([(0, make_rows(0))], uploads)
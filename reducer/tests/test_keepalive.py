@@ -0,0 +1,37 @@
+import struct
+import unittest
+from unittest import mock
+
+from soze_reducer.core.keepalive import Keepalive
+
+
+def payload(is_alive, seq):
+    return struct.pack("<?I", is_alive, seq)
+
+
+class KeepaliveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.keepalive = Keepalive(redis_client=None)
+        self.statuses = []
+        self.keepalive.register_listener(self.statuses.append)
+
+    def test_update(self):
+        self.assertEqual("sleep", self.keepalive.status)
+        self.keepalive.update(payload(True, 1))
+        self.keepalive.update(payload(True, 2))
+        self.assertEqual("normal", self.keepalive.status)
+        self.keepalive.update(payload(False, 3))
+        self.keepalive.update(None)  # Expired key
+        self.assertEqual(["normal", "sleep"], self.statuses)
+
+    @mock.patch("soze_reducer.core.keepalive.time")
+    def test_check_timeout(self, mock_time):
+        mock_time.monotonic.return_value = 100.0
+        self.keepalive.update(payload(True, 1))
+        mock_time.monotonic.return_value = 110.0
+        self.keepalive.check_timeout()
+        self.assertEqual("normal", self.keepalive.status)
+        mock_time.monotonic.return_value = 116.0
+        self.keepalive.check_timeout()
+        self.assertEqual("sleep", self.keepalive.status)
+        self.assertEqual(["normal", "sleep"], self.statuses)
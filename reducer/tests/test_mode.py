@@ -0,0 +1,185 @@
+import unittest
+from datetime import datetime
+
+from soze_reducer.core.color import BLACK, WHITE, Color
+from soze_reducer.lcd.mode_clock import ClockMode
+from soze_reducer.lcd.mode_off import OffMode as LcdOffMode
+from soze_reducer.led.mode_breathe import BreatheMode
+from soze_reducer.led.mode_fade import FadeMode
+from soze_reducer.led.mode_off import OffMode as LedOffMode
+from soze_reducer.led.mode_rainbow import RainbowMode
+from soze_reducer.led.mode_sequence import SequenceMode
+from soze_reducer.led.mode_static import StaticMode
+from soze_reducer.led.mode_strobe import StrobeMode
+
+
+class NextUpdateTestCase(unittest.TestCase):
+    def test_static(self):
+        settings = {"mode": "static", "static": {"color": 0xFF0000}}
+        self.assertIsNone(StaticMode().get_next_update(settings))
+        self.assertIsNone(LedOffMode().get_next_update(settings))
+        self.assertIsNone(LcdOffMode().get_next_update(settings))
+
+    def test_fade(self):
+        settings = {"fade": {"colors": [0xFF0000, 0x0000FF], "fade_time": 5.0}}
+        self.assertEqual(0, FadeMode().get_next_update(settings))
+
+    def test_clock(self):
+        next_update = ClockMode().get_next_update({})
+        self.assertGreater(next_update, 0.0)
+        self.assertLessEqual(next_update, 1.0)
+
+
+class PlanTestCase(unittest.TestCase):
+    def test_static(self):
+        mode = StaticMode()
+        settings = {"mode": "static", "static": {"color": 0xFF0000}}
+        self.assertEqual(Color(255, 0, 0), mode.get_color(settings))
+        self.assertEqual(BLACK, mode.get_color({"mode": "static"}))
+
+    def test_fade_cached(self):
+        mode = FadeMode()
+        settings = {"fade": {"colors": [0xFF0000, 0x0000FF], "fade_time": 5.0}}
+        mode.get_color(settings)
+        plan = mode._plan
+        mode.get_color(settings)
+        self.assertIs(plan, mode._plan)
+
+        # A new settings dict means the settings changed
+        settings = {"fade": {"colors": [0x00FF00], "fade_time": 5.0}}
+        self.assertEqual(Color(0, 255, 0), mode.get_color(settings))
+        self.assertIsNot(plan, mode._plan)
+
+    def test_fade_segments(self):
+        settings = {"fade": {"colors": [0xFF0000, 0x0000FF], "fade_time": 2.0}}
+        plan = FadeMode()._compile(settings)
+        self.assertEqual(4.0, plan.cycle)
+        self.assertEqual((0.0, 2.0), plan.starts)
+        first, second = plan.segments
+        # Channels are in linear light
+        self.assertEqual((2.0, 4095, 0, 0, -4095, 0, 4095), first[:7])
+        self.assertEqual((2.0, 0, 0, 4095, 4095, 0, -4095), second[:7])
+        self.assertIsNone(FadeMode()._compile({"fade": {"colors": []}}))
+        self.assertEqual(BLACK, FadeMode().get_color({}))
+
+    def test_fade_time_indexed(self):
+        mode = FadeMode()
+        settings = {"fade": {"colors": [0xFF0000, 0x0000FF], "fade_time": 2.0}}
+        mode.get_color(settings)
+        epoch = mode._plan.epoch
+
+        def color_at(offset):
+            return mode.get_color(settings, epoch + offset)
+
+        # Halfway points are half brightness in linear light
+        self.assertEqual(Color(255, 0, 0), color_at(0.0))
+        self.assertEqual(Color(187, 0, 187), color_at(1.0))
+        self.assertEqual(Color(0, 0, 255), color_at(2.0))
+        self.assertEqual(Color(187, 0, 187), color_at(3.0))
+        # Any point in time can be evaluated, in any order
+        self.assertEqual(Color(187, 0, 187), color_at(4001.0))
+        self.assertEqual(Color(0, 0, 255), color_at(-2.0))
+        self.assertEqual(Color(255, 0, 0), color_at(0.0))
+
+    def test_sequence(self):
+        mode = SequenceMode()
+        keyframes = [
+            {
+                "color": 0xFF0000,
+                "hold_time": 1.0,
+                "transition_time": 2.0,
+                "easing": "ease_in",
+            },
+            {
+                "color": 0x0000FF,
+                "hold_time": 0.0,
+                "transition_time": 1.0,
+                "easing": "linear",
+            },
+        ]
+        settings = {"sequence": {"keyframes": keyframes}}
+        mode.get_color(settings)
+        plan = mode._plan
+        # The empty hold is dropped
+        self.assertEqual(4.0, plan.cycle)
+        self.assertEqual((0.0, 1.0, 3.0), plan.starts)
+
+        def color_at(offset):
+            return mode.get_color(settings, plan.epoch + offset)
+
+        self.assertEqual(Color(255, 0, 0), color_at(0.0))
+        self.assertEqual(Color(255, 0, 0), color_at(0.999))
+        # Halfway through the transition, but eased in
+        self.assertEqual(Color(225, 0, 137), color_at(2.0))
+        self.assertEqual(Color(0, 0, 255), color_at(3.0))
+        self.assertEqual(Color(187, 0, 187), color_at(3.5))
+        self.assertEqual(Color(255, 0, 0), color_at(4.0))
+
+        self.assertEqual(BLACK, mode.get_color({"sequence": {"keyframes": []}}))
+
+    def test_rainbow(self):
+        mode = RainbowMode()
+        settings = {"rainbow": {"cycle_time": 4.0}}
+        mode.get_color(settings)
+        epoch = mode._plan.epoch
+        self.assertEqual(Color(255, 0, 0), mode.get_color(settings, epoch))
+        self.assertEqual(
+            Color(0, 255, 255), mode.get_color(settings, epoch + 2.0)
+        )
+        self.assertEqual(
+            Color(255, 0, 0), mode.get_color(settings, epoch + 4.0)
+        )
+        # The wheel is spread across a strip
+        self.assertEqual(
+            bytes(Color(255, 0, 0)) + bytes(Color(0, 255, 255)),
+            mode.get_frame(settings, 2, epoch),
+        )
+
+    def test_clock_cached(self):
+        mode = ClockMode()
+        now = datetime(2020, 1, 1, 12, 34, 56).timestamp()
+        text = mode.get_text({}, now)
+        self.assertTrue(text.startswith("Wednesday, Jan 1  56\n"))
+        self.assertEqual(4, len(text.splitlines()))
+        # Same second, same object
+        self.assertIs(text, mode.get_text({}, now + 0.5))
+
+        # A new second only re-renders the first line
+        time_str = mode._time_str
+        text = mode.get_text({}, now + 1)
+        self.assertTrue(text.startswith("Wednesday, Jan 1  57\n"))
+        self.assertIs(time_str, mode._time_str)
+
+        # A new minute rebuilds the big digits
+        mode.get_text({}, now + 4)
+        self.assertNotEqual(time_str, mode._time_str)
+
+    def test_solid_frame(self):
+        settings = {"mode": "static", "static": {"color": 0x010203}}
+        self.assertEqual(
+            b"\x01\x02\x03" * 3, StaticMode().get_frame(settings, 3)
+        )
+
+    def test_breathe(self):
+        mode = BreatheMode()
+        settings = {"breathe": {"color": 0xFF8000, "period": 2.0}}
+        mode.get_color(settings)
+        epoch = mode._plan.epoch
+        self.assertEqual(BLACK, mode.get_color(settings, epoch))
+        self.assertEqual(
+            Color(255, 128, 0), mode.get_color(settings, epoch + 1.0)
+        )
+        self.assertEqual(BLACK, mode.get_color(settings, epoch + 2.0))
+
+    def test_strobe(self):
+        mode = StrobeMode()
+        settings = {
+            "strobe": {"color": 0xFFFFFF, "frequency": 2.0, "duty": 0.25}
+        }
+        mode.get_color(settings)
+        epoch = mode._plan.epoch
+        self.assertEqual(WHITE, mode.get_color(settings, epoch))
+        self.assertEqual(WHITE, mode.get_color(settings, epoch + 0.1))
+        self.assertEqual(BLACK, mode.get_color(settings, epoch + 0.2))
+        self.assertEqual(WHITE, mode.get_color(settings, epoch + 0.5))
+        self.assertLessEqual(mode.get_next_update(settings), 0.5)
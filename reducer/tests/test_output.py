@@ -0,0 +1,23 @@
+import unittest
+
+from soze_reducer.core.color import Color
+from soze_reducer.core.output import OutputTracker
+
+
+class OutputTrackerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tracker = OutputTracker()
+
+    def test_submit(self):
+        self.assertTrue(self.tracker.submit((Color(1, 2, 3), "a")))
+        self.assertFalse(self.tracker.submit((Color(1, 2, 3), "a")))
+        self.assertTrue(self.tracker.submit((Color(1, 2, 3), "b")))
+        self.assertFalse(self.tracker.submit((Color(1, 2, 3), "b")))
+        self.assertEqual(2, self.tracker.emitted)
+        self.assertEqual(2, self.tracker.suppressed)
+
+    def test_invalidate(self):
+        self.assertTrue(self.tracker.submit((Color(1, 2, 3),)))
+        self.tracker.invalidate()
+        self.assertTrue(self.tracker.submit((Color(1, 2, 3),)))
+        self.assertEqual(0, self.tracker.suppressed)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from soze_reducer.core.profiler import SamplingProfiler
+
+
+class SamplingProfilerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.profiler = SamplingProfiler(
+            self.dir.name, redis_key="test:profile", name="test"
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_check_redis(self):
+        self.assertEqual("test:profile", self.profiler.redis_key)
+        with mock.patch.object(self.profiler, "start") as start:
+            self.profiler.check_redis(None)
+            self.profiler.check_redis(b"garbage")
+            start.assert_not_called()
+            self.profiler.check_redis(b"2.5")
+            start.assert_called_once_with(2.5)
+
+    def test_profile(self):
+        # Give the profiler something to sample
+        stop = threading.Event()
+        worker = threading.Thread(name="Worker", target=stop.wait)
+        worker.start()
+        try:
+            self.assertTrue(self.profiler.start(0.05))
+            self.assertFalse(self.profiler.start(0.05))
+            self.profiler._thread.join()
+        finally:
+            stop.set()
+            worker.join()
+        self.assertFalse(self.profiler.is_running)
+
+        (filename,) = os.listdir(self.dir.name)
+        self.assertTrue(filename.startswith("test-"))
+        self.assertTrue(filename.endswith(".collapsed"))
+        with open(os.path.join(self.dir.name, filename)) as f:
+            lines = f.read().splitlines()
+        # Each line is a stack from the root down, then a sample count
+        stacks = [line.rsplit(" ", 1) for line in lines]
+        self.assertTrue(all(count.isdigit() for _, count in stacks))
+        self.assertTrue(
+            any(stack.startswith("Worker;") for stack, _ in stacks)
+        )
@@ -0,0 +1,305 @@
+import msgpack
+import redis
+import unittest
+from unittest import mock
+
+from soze_reducer.core.color import BLACK, Color
+from soze_reducer.core.keepalive import Keepalive
+from soze_reducer.lcd.helper import CMD_BACKLIGHT_ON, SIG_COMMAND
+from soze_reducer.lcd.lcd import Lcd
+from soze_reducer.led.led import Led
+
+
+def pub(status, version):
+    return {"data": msgpack.dumps({"status": status, "version": version})}
+
+
+class SettingsCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        # Keepalive starts down, so the status is sleep
+        self.led = Led(redis_client=None, keepalive=Keepalive(redis_client=None))
+        self.led.set_settings(
+            "sleep", msgpack.dumps({"mode": "off", "_version": 2})
+        )
+        self.led.set_settings(
+            "normal", msgpack.dumps({"mode": "static", "_version": 3})
+        )
+
+    def test_get_stale_statuses(self):
+        self.assertEqual([], self.led.get_stale_statuses(pub("sleep", 2)))
+        self.assertEqual([], self.led.get_stale_statuses(pub("normal", 3)))
+        self.assertEqual(
+            ["normal"], self.led.get_stale_statuses(pub("normal", 4))
+        )
+        # Pubs without a version make everything stale
+        self.assertEqual(
+            ["normal", "sleep"], self.led.get_stale_statuses({"data": b""})
+        )
+
+    def test_version_reset(self):
+        # The API's version counter started over, so the reducer has to pick
+        # up writes with lower versions than what it has cached
+        self.assertEqual(
+            ["normal"], self.led.get_stale_statuses(pub("normal", 1))
+        )
+        self.led.set_settings(
+            "normal", msgpack.dumps({"mode": "fade", "_version": 1})
+        )
+        self.assertEqual([], self.led.get_stale_statuses(pub("normal", 1)))
+        self.assertEqual(
+            ["normal"], self.led.get_stale_statuses(pub("normal", 2))
+        )
+
+    def test_set_settings(self):
+        self.assertEqual("off", self.led._mode.name)
+        self.assertFalse(
+            self.led.set_settings("normal", msgpack.dumps({"mode": "fade"}))
+        )
+        self.assertEqual("off", self.led._mode.name)
+        self.assertTrue(self.led.set_settings("sleep", None))
+        self.assertEqual({}, self.led._settings)
+
+    def test_apply_status(self):
+        self.led.apply_status("normal")
+        self.assertEqual("static", self.led._mode.name)
+        self.assertEqual({"mode": "static"}, self.led._settings)
+
+
+class LedFrameTestCase(unittest.TestCase):
+    def setUp(self):
+        self.led = Led(
+            redis_client=None, keepalive=Keepalive(redis_client=None), zones=4
+        )
+        self.pipe = mock.Mock()
+
+    def test_set_frame(self):
+        black = bytes(12)
+        self.led.set_frame(self.pipe, black)
+        self.pipe.set.assert_called_once_with("reducer:led_color", black)
+        self.pipe.publish.assert_called_once_with(
+            "r2d:led", b"\x00\x00\x04\x00" + black
+        )
+
+        # Only the changed zones are written and published
+        self.pipe.reset_mock()
+        self.led.set_frame(self.pipe, bytes(9) + b"\x01\x02\x03")
+        self.pipe.set.assert_not_called()
+        self.pipe.setrange.assert_called_once_with(
+            "reducer:led_color", 9, b"\x01\x02\x03"
+        )
+        self.pipe.publish.assert_called_once_with(
+            "r2d:led", b"\x03\x00\x01\x00\x01\x02\x03"
+        )
+
+        # Nothing changed, so nothing to do
+        self.pipe.reset_mock()
+        self.led.set_frame(self.pipe, bytes(9) + b"\x01\x02\x03")
+        self.assertEqual([], self.pipe.method_calls)
+
+    def test_default_values(self):
+        self.assertEqual((bytes(12),), self.led._get_default_values())
+
+
+class LcdQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lcd = Lcd(
+            redis_client=None, keepalive=Keepalive(redis_client=None)
+        )
+        self.lcd.init(self.make_pipe())
+
+    def make_pipe(self):
+        # Commands are queued without connecting, as long as we never execute
+        return redis.Redis().pipeline(transaction=True)
+
+    def push_text(self, text):
+        pipe = self.make_pipe()
+        self.lcd._apply_values(pipe, BLACK, text)
+        return pipe
+
+    def get_commands(self, pipe):
+        return [args[:2] for args, _ in pipe.command_stack]
+
+    def test_under_cap(self):
+        self.push_text("hello")
+        self.lcd.handle_replies([2, 1])
+        self.assertFalse(self.lcd._resync)
+
+    def test_overflow_bytes(self):
+        # Each of these rewrites the whole screen
+        for char in "abcdefghijk":
+            self.push_text("\n".join([char * 20] * 4))
+            # Only the pushes still in the queue count
+            self.lcd.handle_replies([1, 1])
+            self.assertFalse(self.lcd._resync)
+        self.push_text("\n".join(["l" * 20] * 4))
+        self.lcd.handle_replies([12, 1])
+        self.assertTrue(self.lcd._resync)
+        self.assertEqual(1, self.lcd.stats.counters["queue_overflows"])
+
+    def test_overflow_length(self):
+        self.push_text("x")
+        self.lcd.handle_replies([Lcd._MAX_QUEUE_LENGTH + 1, 1])
+        self.assertTrue(self.lcd._resync)
+
+    def test_keyframe(self):
+        self.push_text("hello\nworld")
+        self.lcd.request_resync()
+        pipe = self.make_pipe()
+        self.lcd.update(pipe)
+        # The backlog is dropped, then the whole screen is drawn
+        commands = self.get_commands(pipe)
+        self.assertEqual(("DEL", "reducer:lcd_commands"), commands[0])
+        self.assertEqual(("RPUSH", "reducer:lcd_commands"), commands[1])
+        keyframe = pipe.command_stack[1][0][2]
+        self.assertTrue(keyframe.startswith(b"\xfe\xd1\x14\x04\xfe\x58"))
+        self.assertIn(b"hello", keyframe)
+        self.assertIn(b"world", keyframe)
+        self.assertFalse(self.lcd._resync)
+        self.assertEqual(1, self.lcd.stats.counters["keyframes"])
+
+
+class LcdSnapshotTestCase(unittest.TestCase):
+    def make_lcd(self):
+        return Lcd(redis_client=None, keepalive=Keepalive(redis_client=None))
+
+    def make_pipe(self):
+        return redis.Redis().pipeline(transaction=True)
+
+    def get_snapshot(self, pipe):
+        # The last SET in the pipeline
+        sets = [args for args, _ in pipe.command_stack if args[0] == "SET"]
+        self.assertEqual("reducer:lcd_snapshot", sets[-1][1])
+        return sets[-1][2]
+
+    def test_restore(self):
+        lcd = self.make_lcd()
+        lcd.init(self.make_pipe())
+        pipe = self.make_pipe()
+        lcd._apply_values(pipe, Color(1, 2, 3), "hello")
+        snapshot = self.get_snapshot(pipe)
+
+        # A new reducer picks up where the old one left off, without
+        # clearing or redrawing the screen. The old queue is dropped, since
+        # its sizes wouldn't count towards the queue's caps.
+        lcd = self.make_lcd()
+        lcd.restore_state(snapshot)
+        pipe = self.make_pipe()
+        lcd.init(pipe)
+        self.assertEqual(
+            [("DEL", "reducer:lcd_commands")],
+            [args[:2] for args, _ in pipe.command_stack],
+        )
+        self.assertEqual([], list(lcd._queue_sizes))
+        # Nothing changed since the snapshot, so nothing more to draw
+        pipe = self.make_pipe()
+        lcd._apply_values(pipe, Color(1, 2, 3), "hello")
+        self.assertEqual([], pipe.command_stack)
+
+    def test_restore_backlight_off(self):
+        lcd = self.make_lcd()
+        lcd.init(self.make_pipe())
+        pipe = self.make_pipe()
+        lcd._apply_values(pipe, Color(1, 2, 3), "hello")
+        pipe = self.make_pipe()
+        lcd.cleanup(pipe)
+        snapshot = self.get_snapshot(pipe)
+
+        # The last run turned the backlight off when it stopped. That's all
+        # we send, no CLEAR or SIZE.
+        lcd = self.make_lcd()
+        lcd.restore_state(snapshot)
+        pipe = self.make_pipe()
+        lcd.init(pipe)
+        pushes = [
+            args[2] for args, _ in pipe.command_stack if args[0] == "RPUSH"
+        ]
+        self.assertEqual([bytes([SIG_COMMAND, CMD_BACKLIGHT_ON, 0])], pushes)
+        self.assertEqual([len(pushes[0])], list(lcd._queue_sizes))
+
+    def test_restore_invalid(self):
+        lcd = self.make_lcd()
+        lcd.restore_state(b"garbage")
+        pipe = self.make_pipe()
+        lcd.init(pipe)
+        # Started from scratch
+        self.assertEqual("DEL", pipe.command_stack[0][0][0])
+
+
+class StreamsTestCase(unittest.TestCase):
+    def test_led(self):
+        led = Led(
+            redis_client=None,
+            keepalive=Keepalive(redis_client=None),
+            zones=4,
+            streams=True,
+        )
+        pipe = mock.Mock()
+        led.set_frame(pipe, bytes(12))
+        led.set_frame(pipe, bytes(9) + b"\x01\x02\x03")
+        pipe.publish.assert_not_called()
+        # Entries are numbered so displays can tell if they missed any
+        self.assertEqual(
+            [
+                mock.call(
+                    "reducer:led_stream",
+                    {"seq": 1, "data": b"\x00\x00\x04\x00" + bytes(12)},
+                    maxlen=1000,
+                    approximate=True,
+                ),
+                mock.call(
+                    "reducer:led_stream",
+                    {"seq": 2, "data": b"\x03\x00\x01\x00\x01\x02\x03"},
+                    maxlen=1000,
+                    approximate=True,
+                ),
+            ],
+            pipe.xadd.call_args_list,
+        )
+
+    def test_lcd(self):
+        lcd = Lcd(
+            redis_client=None,
+            keepalive=Keepalive(redis_client=None),
+            streams=True,
+        )
+        lcd.init(redis.Redis().pipeline(transaction=True))
+        pipe = redis.Redis().pipeline(transaction=True)
+        lcd._apply_values(pipe, BLACK, "hello")
+        commands = [args[:2] for args, _ in pipe.command_stack]
+        self.assertEqual(
+            [("XADD", "reducer:lcd_stream"), ("SET", "reducer:lcd_snapshot")],
+            commands,
+        )
+        # Nothing goes through the command queue
+        self.assertIsNone(lcd._push_reply_index)
+
+
+class StrobeScheduleTestCase(unittest.TestCase):
+    def test_fast_strobe(self):
+        # Edges are 50ms apart, which is less than the LED's pause
+        led = Led(redis_client=None, keepalive=Keepalive(redis_client=None))
+        led.set_settings(
+            "sleep",
+            msgpack.dumps(
+                {
+                    "mode": "strobe",
+                    "strobe": {
+                        "color": 0xFFFFFF,
+                        "frequency": 10.0,
+                        "duty": 0.5,
+                    },
+                    "calibration": {"gamma": 1.0},
+                }
+            ),
+        )
+        now = 1000.0
+        colors = []
+        with mock.patch("time.monotonic", lambda: now), mock.patch.object(
+            led, "_apply_values", lambda pipe, frame: colors.append(frame)
+        ):
+            # Run each update when it's scheduled, like the runtime would
+            while now < 1000.3:
+                led.update(mock.Mock())
+                now = led._next_update_time
+        # Every update flips the color, one edge every 50ms
+        self.assertEqual([b"\xff\xff\xff", bytes(3)] * 3, colors)
@@ -0,0 +1,31 @@
+import unittest
+
+from soze_reducer.core.color import Color
+from soze_reducer.lcd.snapshot import Snapshot, pack_snapshot, unpack_snapshot
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        glyphs = [None] * 8
+        glyphs[2] = (1, 2, 3, 4, 5, 6, 7, 8)
+        self.snapshot = Snapshot(
+            width=4,
+            height=2,
+            backlight=True,
+            color=Color(1, 2, 3),
+            glyphs=glyphs,
+            cells=b"ab\x02 cdef",
+        )
+
+    def test_round_trip(self):
+        data = pack_snapshot(self.snapshot)
+        # 7 byte header, one glyph, then the cells
+        self.assertEqual(7 + 8 + 8, len(data))
+        self.assertEqual(self.snapshot, unpack_snapshot(data))
+
+    def test_invalid(self):
+        data = pack_snapshot(self.snapshot)
+        with self.assertRaises(ValueError):
+            unpack_snapshot(data[:5])
+        with self.assertRaises(ValueError):
+            unpack_snapshot(data[:-1])
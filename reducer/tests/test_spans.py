@@ -0,0 +1,33 @@
+import unittest
+
+from soze_reducer.led.spans import diff_spans, pack_spans
+
+
+def frame(*colors):
+    return bytes(channel for color in colors for channel in color)
+
+
+class SpansTestCase(unittest.TestCase):
+    def test_diff_spans(self):
+        black = frame(*[(0, 0, 0)] * 6)
+        self.assertEqual([(0, 6)], diff_spans(None, black))
+        self.assertEqual([(0, 6)], diff_spans(frame((0, 0, 0)), black))
+        self.assertEqual([], diff_spans(black, black))
+
+        new = frame(
+            (1, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 1), (0, 1, 0)
+        )
+        self.assertEqual([(0, 1), (4, 2)], diff_spans(black, new))
+        # Small gaps are cheaper to send than a new header
+        new = frame(
+            (1, 0, 0), (0, 0, 0), (0, 0, 1), (0, 0, 0), (0, 0, 0), (0, 0, 0)
+        )
+        self.assertEqual([(0, 3)], diff_spans(black, new))
+
+    def test_pack_spans(self):
+        new = frame((1, 2, 3), (4, 5, 6), (7, 8, 9))
+        self.assertEqual(
+            b"\x00\x00\x01\x00\x01\x02\x03\x02\x00\x01\x00\x07\x08\x09",
+            pack_spans(new, [(0, 1), (2, 1)]),
+        )
+        self.assertEqual(b"", pack_spans(new, []))
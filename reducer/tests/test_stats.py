@@ -0,0 +1,36 @@
+import unittest
+
+from soze_reducer.core.stats import BUCKET_BOUNDS, Histogram, ResourceStats
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_record(self):
+        histogram = Histogram()
+        histogram.record(0.0001)
+        histogram.record(0.001)  # Bounds are inclusive
+        histogram.record(0.0011)
+        histogram.record(5.0)  # Overflow
+
+        d = histogram.to_dict()
+        self.assertEqual(len(BUCKET_BOUNDS) + 1, len(d["counts"]))
+        self.assertEqual([1, 1, 1], d["counts"][:3])
+        self.assertEqual(1, d["counts"][-1])
+        self.assertEqual(4, d["count"])
+        self.assertEqual(5.0, d["max"])
+
+
+class ResourceStatsTestCase(unittest.TestCase):
+    def test_overruns(self):
+        stats = ResourceStats(budget=0.1)
+        stats.record_tick(0.05)
+        stats.record_tick(0.15)
+        self.assertEqual(1, stats.overruns)
+        self.assertEqual(2, stats.ticks.count)
+
+    def test_counters(self):
+        stats = ResourceStats(budget=0.1)
+        stats.count("bytes", 10)
+        stats.count("bytes", 5)
+        stats.count("writes")
+        self.assertEqual({"bytes": 15, "writes": 1}, stats.counters)
+        self.assertEqual(stats.counters, stats.to_dict()["counters"])
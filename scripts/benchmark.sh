@@ -0,0 +1,20 @@
+#!/bin/sh
+
+# Run the microbenchmarks for the reducer and the API. Results for each
+# component are written as JSON to .benchmarks/, so runs can be diffed with
+# `pytest-benchmark compare`. Any extra args are passed through to pytest,
+# e.g. `--benchmark-compare` to compare against the last saved run.
+
+set -e
+
+cd $(dirname $0)/..
+for component in reducer api; do
+    (
+        cd $component
+        python -m pytest benchmarks \
+            -o python_files='bench_*.py' \
+            --benchmark-autosave \
+            --benchmark-storage=file://../.benchmarks/$component \
+            $@
+    )
+done
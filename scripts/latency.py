@@ -0,0 +1,271 @@
+"""
+End-to-end latency harness. Runs the API (via the Flask test client), the
+reducer and a headless display consumer in one process, all against the same
+Redis. Scripted settings changes are POSTed to the API at a series of rates,
+and we measure the time from each POST until the display sees the new color
+on r2d:led/r2d:lcd.
+
+By default everything runs against fakeredis, so no server is needed. Pass
+--redis to use a real server instead (this will overwrite its settings!).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import signal
+import statistics
+import struct
+import sys
+import time
+from threading import Lock, Thread
+
+import redis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "api"), os.path.join(ROOT, "reducer")]
+
+LED_COLOR_KEY = "reducer:led_color"
+LCD_COMMAND_QUEUE_KEY = "reducer:lcd_commands"
+KEEPALIVE_KEY = "reducer:keepalive"
+KEEPALIVE_CHANNEL = "r2d:keepalive"
+KEEPALIVE_FORMAT = "<?I"
+SIG_COMMAND = 0xFE
+CMD_COLOR = 0xD0
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    index = max(int(round(pct / 100 * len(values))) - 1, 0)
+    return values[index]
+
+
+class DisplayConsumer:
+    """
+    A headless display. It keeps the reducer in the normal status, and
+    records when each color arrives on the LED and LCD.
+    """
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._pubsub = redis_client.pubsub()
+        self._pubsub_thread = None
+        self._lock = Lock()
+        # Resource name => {color bytes: send time}
+        self._pending = {"led": {}, "lcd": {}}
+        # Resource name => list of latencies, in seconds
+        self._latencies = {"led": [], "lcd": []}
+
+    def start(self):
+        # Tell the reducer we're alive, so that it uses the normal settings
+        payload = struct.pack(KEEPALIVE_FORMAT, True, 1)
+        p = self._redis.pipeline()
+        p.set(KEEPALIVE_KEY, payload)
+        p.publish(KEEPALIVE_CHANNEL, payload)
+        p.execute()
+
+        self._pubsub.subscribe(
+            **{"r2d:led": self._on_led_pub, "r2d:lcd": self._on_lcd_pub}
+        )
+        self._pubsub_thread = self._pubsub.run_in_thread(sleep_time=0.001)
+
+    def stop(self):
+        self._pubsub_thread.stop()
+        self._redis.delete(KEEPALIVE_KEY)
+
+    def expect(self, resource_name, color):
+        with self._lock:
+            self._pending[resource_name][bytes(color)] = time.perf_counter()
+
+    def collect(self):
+        """
+        Get the latencies recorded since the last collect, and the number of
+        updates that never arrived (e.g. because the reducer coalesced them).
+        """
+        with self._lock:
+            latencies, self._latencies = (
+                self._latencies,
+                {"led": [], "lcd": []},
+            )
+            dropped = {name: len(p) for name, p in self._pending.items()}
+            for pending in self._pending.values():
+                pending.clear()
+        return latencies, dropped
+
+    def _received(self, resource_name, color):
+        now = time.perf_counter()
+        with self._lock:
+            try:
+                sent = self._pending[resource_name].pop(color)
+            except KeyError:
+                return  # Not one of ours, e.g. black on startup
+            self._latencies[resource_name].append(now - sent)
+
+    def _on_led_pub(self, msg):
+        self._received("led", self._redis.get(LED_COLOR_KEY))
+
+    def _on_lcd_pub(self, msg):
+        p = self._redis.pipeline()
+        p.lrange(LCD_COMMAND_QUEUE_KEY, 0, -1)
+        p.delete(LCD_COMMAND_QUEUE_KEY)
+        data, _ = p.execute()
+
+        # Pick the color commands out of the byte stream
+        data = b"".join(data)
+        start = 0
+        while True:
+            start = data.find(bytes([SIG_COMMAND, CMD_COLOR]), start)
+            if start < 0:
+                break
+            self._received("lcd", data[start + 2 : start + 5])
+            start += 5
+
+
+def make_redis_factory(redis_url):
+    if redis_url:
+        from_url = redis.from_url
+        return lambda url: from_url(redis_url)
+
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    return lambda url: fakeredis.FakeRedis(server=server)
+
+
+def run_rate(client, consumer, colors, resource_name, rate, count):
+    settings = {
+        "led": lambda color: {"mode": "static", "static": {"color": color}},
+        "lcd": lambda color: {"mode": "clock", "color": color},
+    }[resource_name]
+
+    interval = 1.0 / rate
+    start_time = time.perf_counter()
+    for i in range(count):
+        # Pace the POSTs against the start time, so slow requests don't
+        # drag the rate down
+        delay = start_time + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        color = next(colors)
+        consumer.expect(resource_name, color)
+        resp = client.post(
+            f"/{resource_name}/normal", json=settings(list(color))
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"POST failed: {resp.get_json()}")
+    elapsed = time.perf_counter() - start_time
+
+    # Give the last updates time to land
+    time.sleep(0.5)
+    latencies, dropped = consumer.collect()
+    latencies = sorted(latencies[resource_name])
+    return {
+        "resource": resource_name,
+        "rate": rate,
+        "sent": count,
+        "delivered": len(latencies),
+        "dropped": dropped[resource_name],
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else None,
+        "mean": statistics.mean(latencies) if latencies else None,
+    }
+
+
+def format_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "--redis",
+        "-r",
+        help="URL for a Redis server to use, instead of fakeredis",
+    )
+    parser.add_argument(
+        "--rates",
+        default="5,10,20,50,100",
+        help="Comma-separated update rates to test, in POSTs per second",
+    )
+    parser.add_argument(
+        "--count", type=int, default=100, help="Number of POSTs per rate"
+    )
+    parser.add_argument(
+        "--resources",
+        default="led,lcd",
+        help="Comma-separated resources to POST to",
+    )
+    parser.add_argument("--json", help="File to write the results to")
+    args = parser.parse_args()
+
+    # Everything has to share one Redis, so hook the client factory that
+    # the API and reducer both use, before either of them is loaded
+    redis_factory = make_redis_factory(args.redis)
+    redis.from_url = redis_factory
+    os.environ.setdefault("REDIS_HOST", "redis://localhost:6379")
+
+    from soze_api import api
+    from soze_reducer.core.reducer import SozeReducer
+
+    logging.getLogger("soze_reducer").setLevel(logging.WARNING)
+
+    consumer = DisplayConsumer(redis_factory(None))
+    consumer.start()
+    # The reducer's signal handlers have to be registered from the main
+    # thread, but it can run anywhere
+    reducer = SozeReducer(None, profile_dir="/tmp")
+    reducer_thread = Thread(name="Reducer", target=reducer.run)
+    reducer_thread.start()
+    time.sleep(0.5)  # Let the reducer settle in
+
+    # Every POST gets a unique (non-black) color, so we can match them up
+    colors = (
+        (i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF)
+        for i in itertools.count(0x010101, 7)
+    )
+    client = api.app.test_client()
+    # Turn off gamma correction, so the LED shows exactly the colors we send
+    client.post("/led/normal", json={"calibration": {"gamma": 1.0}})
+    results = []
+    try:
+        print(
+            f"{'resource':<8} {'rate':>6} {'sent':>5} {'recv':>5}"
+            f" {'tput/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for resource_name in args.resources.split(","):
+            for rate in map(float, args.rates.split(",")):
+                result = run_rate(
+                    client, consumer, colors, resource_name, rate, args.count
+                )
+                results.append(result)
+                print(
+                    f"{resource_name:<8} {rate:>6g} {result['sent']:>5}"
+                    f" {result['delivered']:>5}"
+                    f" {result['throughput']:>7.1f}"
+                    f" {format_ms(result['p50']):>8}"
+                    f" {format_ms(result['p95']):>8}"
+                    f" {format_ms(result['p99']):>8}"
+                )
+    finally:
+        # This hits the reducer's stop handler
+        os.kill(os.getpid(), signal.SIGINT)
+        reducer_thread.join()
+        consumer.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"redis": args.redis or "fakeredis", "results": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,24 @@ export enum LedMode {
   Off = 'off',
   Static = 'static',
   Fade = 'fade',
+  Sequence = 'sequence',
+  Rainbow = 'rainbow',
+  Breathe = 'breathe',
+  Strobe = 'strobe',
+}
+
+export enum Easing {
+  Linear = 'linear',
+  EaseIn = 'ease_in',
+  EaseOut = 'ease_out',
+  EaseInOut = 'ease_in_out',
+}
+
+export interface Keyframe {
+  color: Color;
+  hold_time: number;
+  transition_time: number;
+  easing: Easing;
 }
 
 export interface LedSettings {
@@ -19,4 +37,25 @@ export interface LedSettings {
     };
     fade_time: number;
   };
+  sequence: {
+    keyframes: Keyframe[];
+  };
+  rainbow: {
+    cycle_time: number;
+  };
+  breathe: {
+    color: Color;
+    period: number;
+  };
+  strobe: {
+    color: Color;
+    frequency: number;
+    duty: number;
+  };
+  calibration: {
+    gamma: number;
+    red: number;
+    green: number;
+    blue: number;
+  };
 }